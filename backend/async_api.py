@@ -0,0 +1,122 @@
+"""Async API: endpoints served from AsyncSession and the async Ollama client"""
+import logging
+import uuid
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.database import get_async_db
+from backend.models import Session as DBSession, Event
+from backend.recommendation_engine import CHAT_SYSTEM_PROMPT, AsyncRecommendationEngine
+from backend.schemas import (
+    RecommendationRequest, RecommendationResponse, ItemInfo,
+    ItemDetailRequest, ItemDetailResponse,
+    ConversationRequest, ConversationResponse
+)
+from backend.ollama_client import async_ollama_client
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+async def _get_or_create_session(db: AsyncSession, session_id: str, user_id: str = None):
+    """Load the conversation session, creating it on first use"""
+    result = await db.execute(select(DBSession).where(DBSession.session_id == session_id))
+    db_session = result.scalars().first()
+    if not db_session:
+        db_session = DBSession(session_id=session_id, user_id=user_id)
+        db.add(db_session)
+        await db.commit()
+    return db_session
+
+
+@router.post("/api/recommend", response_model=RecommendationResponse)
+async def get_recommendations(
+    request: RecommendationRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get recommendations based on user query"""
+    try:
+        session_id = request.session_id or str(uuid.uuid4())
+        await _get_or_create_session(db, session_id, request.user_id)
+        
+        rec_engine = AsyncRecommendationEngine(db)
+        plan = await rec_engine.plan_query(request.query)
+        plan.vector_overfetch = request.vector_overfetch
+        recommendations = await rec_engine.generate_recommendations(request.query, plan)
+        
+        db.add(Event(
+            session_id=session_id,
+            user_id=request.user_id,
+            event_type="query",
+            payload=plan.to_event_payload()
+        ))
+        await db.commit()
+        
+        items = [ItemInfo(**item) for item in recommendations]
+        return RecommendationResponse(
+            query=request.query,
+            intent=plan.intent,
+            detected_category=plan.category,
+            recommendations=items,
+            session_id=session_id
+        )
+    except Exception as e:
+        logger.error(f"Error getting recommendations: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/item-details", response_model=ItemDetailResponse)
+async def get_item_details(
+    request: ItemDetailRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get detailed information about an item"""
+    try:
+        details = await AsyncRecommendationEngine(db).get_item_details(request.asin)
+        if not details:
+            raise HTTPException(status_code=404, detail="Item not found")
+        
+        return ItemDetailResponse(**details)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting item details: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/chat", response_model=ConversationResponse)
+async def chat(
+    request: ConversationRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Chat endpoint for multi-turn conversation"""
+    try:
+        await _get_or_create_session(db, request.session_id)
+        
+        rec_engine = AsyncRecommendationEngine(db)
+        plan = await rec_engine.plan_query(request.message)
+        recommendations = await rec_engine.generate_recommendations(request.message, plan)
+        
+        assistant_message = await async_ollama_client.generate_text(request.message, CHAT_SYSTEM_PROMPT)
+        
+        db.add(Event(
+            session_id=request.session_id,
+            event_type="chat",
+            payload={
+                "user_message": request.message,
+                "intent": plan.intent
+            }
+        ))
+        await db.commit()
+        
+        items = [ItemInfo(**item) for item in recommendations]
+        return ConversationResponse(
+            session_id=request.session_id,
+            assistant_response=assistant_message,
+            recommendations=items
+        )
+    except Exception as e:
+        logger.error(f"Error in chat: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,402 @@
+"""In-process BM25 inverted index over item titles.
+
+An alternative keyword recall backend for deployments where PostgreSQL is the
+bottleneck. Postings are stored in compressed-sparse-row form (one offsets
+array plus flat doc-id and term-frequency arrays), with a small append-only
+delta for incremental updates and a tombstone mask for removed documents.
+
+The loader upserts the items it inserts into the saved snapshot instead of
+rebuilding it, and API processes reload the snapshot once the file changes
+(checked every bm25_check_interval_s).
+
+Usage:
+    python -m backend.bm25_index build      # build from lmrc.items and save a snapshot
+    python -m backend.bm25_index stats      # load the snapshot and print its footprint
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sqlalchemy import text
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[0-9a-z]+|[一-鿿]")
+
+# Term frequencies and document lengths are capped to fit uint16
+_MAX_U16 = 65535
+
+
+def tokenize(value: str) -> List[str]:
+    """Lowercased alphanumeric words; CJK characters become single-character terms"""
+    return _TOKEN.findall(value.lower()) if value else []
+
+
+class BM25Index:
+    """BM25 inverted index with array-backed postings lists"""
+
+    def __init__(self, k1: Optional[float] = None, b: Optional[float] = None):
+        self.k1 = settings.bm25_k1 if k1 is None else k1
+        self.b = settings.bm25_b if b is None else b
+        # Documents
+        self.asins: List[str] = []
+        self.asin_to_doc: Dict[str, int] = {}
+        self.category_names: List[Optional[str]] = []
+        self.category_codes: Dict[Optional[str], int] = {}
+        self.doc_category = array("H")
+        self.doc_len = array("H")
+        self.live = bytearray()
+        self.live_docs = 0
+        self.total_len = 0
+        # Postings: frozen CSR base plus an append-only delta per term id
+        self.vocab: Dict[str, int] = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.post_docs = np.zeros(0, dtype=np.uint32)
+        self.post_tfs = np.zeros(0, dtype=np.uint16)
+        self.delta: Dict[int, Tuple[array, array]] = {}
+        self.build_seconds = 0.0
+        # Modification time of the snapshot this index was loaded from, and when it was last checked
+        self.snapshot_mtime: Optional[int] = None
+        self.checked_at = 0.0
+        self._lock = threading.RLock()
+
+    # -- building ---------------------------------------------------------
+
+    def _category_code(self, category: Optional[str]) -> int:
+        code = self.category_codes.get(category)
+        if code is None:
+            code = self.category_codes[category] = len(self.category_names)
+            self.category_names.append(category)
+        return code
+
+    def _term_id(self, term: str) -> int:
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            term_id = self.vocab[term] = len(self.vocab)
+        return term_id
+
+    def _add_document(self, asin: str, title: str, category: Optional[str]) -> Counter:
+        """Register a document and return its term counts"""
+        doc_id = len(self.asins)
+        terms = Counter(tokenize(title))
+        length = min(sum(terms.values()), _MAX_U16)
+        self.asins.append(asin)
+        self.asin_to_doc[asin] = doc_id
+        self.doc_category.append(self._category_code(category))
+        self.doc_len.append(length)
+        self.live.append(1)
+        self.live_docs += 1
+        self.total_len += length
+        return terms
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[str, str, Optional[str]]]) -> "BM25Index":
+        """Build an index from (asin, title, category) rows"""
+        start = time.perf_counter()
+        index = cls()
+        postings: Dict[int, Tuple[array, array]] = {}
+        for asin, title, category in rows:
+            if asin in index.asin_to_doc:
+                continue
+            doc_id = len(index.asins)
+            for term, tf in index._add_document(asin, title, category).items():
+                docs, tfs = postings.setdefault(index._term_id(term), (array("I"), array("H")))
+                docs.append(doc_id)
+                tfs.append(min(tf, _MAX_U16))
+        index.delta = postings
+        index.compact()
+        index.build_seconds = time.perf_counter() - start
+        logger.info(
+            f"BM25 index built: {index.live_docs} docs, {len(index.vocab)} terms "
+            f"in {index.build_seconds:.1f}s"
+        )
+        return index
+
+    @classmethod
+    def from_db(cls, db) -> "BM25Index":
+        """Build from lmrc.items, streaming rows"""
+        result = db.execute(
+            text("SELECT asin, title, category FROM lmrc.items"),
+            execution_options={"yield_per": 10000}
+        )
+        return cls.build((row.asin, row.title, row.category) for row in result)
+
+    def compact(self):
+        """Merge the delta postings into the frozen CSR arrays, dropping removed documents"""
+        with self._lock:
+            n_terms = len(self.vocab)
+            base_counts = np.diff(self.offsets)
+            counts = np.zeros(n_terms, dtype=np.int64)
+            counts[:len(base_counts)] = base_counts
+            for term_id, (docs, _) in self.delta.items():
+                counts[term_id] += len(docs)
+
+            offsets = np.zeros(n_terms + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+            post_docs = np.empty(offsets[-1], dtype=np.uint32)
+            post_tfs = np.empty(offsets[-1], dtype=np.uint16)
+            for term_id in range(n_terms):
+                pos = offsets[term_id]
+                if term_id < len(base_counts):
+                    lo, hi = self.offsets[term_id], self.offsets[term_id + 1]
+                    post_docs[pos:pos + hi - lo] = self.post_docs[lo:hi]
+                    post_tfs[pos:pos + hi - lo] = self.post_tfs[lo:hi]
+                    pos += hi - lo
+                extra = self.delta.get(term_id)
+                if extra:
+                    post_docs[pos:pos + len(extra[0])] = np.frombuffer(extra[0], dtype=np.uint32)
+                    post_tfs[pos:pos + len(extra[1])] = np.frombuffer(extra[1], dtype=np.uint16)
+
+            live = np.frombuffer(self.live, dtype=np.uint8)[post_docs].astype(bool)
+            if not live.all():
+                term_of = np.repeat(np.arange(n_terms), np.diff(offsets))
+                np.cumsum(np.bincount(term_of[live], minlength=n_terms), out=offsets[1:])
+                post_docs, post_tfs = post_docs[live], post_tfs[live]
+
+            self.offsets, self.post_docs, self.post_tfs = offsets, post_docs, post_tfs
+            self.delta = {}
+
+    # -- incremental updates ----------------------------------------------
+
+    def remove(self, asin: str):
+        """Tombstone a document; its postings are skipped at query time"""
+        with self._lock:
+            doc_id = self.asin_to_doc.pop(asin, None)
+            if doc_id is not None and self.live[doc_id]:
+                self.live[doc_id] = 0
+                self.live_docs -= 1
+                self.total_len -= self.doc_len[doc_id]
+
+    def upsert(self, asin: str, title: str, category: Optional[str]):
+        """Add or replace a document; new postings go to the delta"""
+        with self._lock:
+            self.remove(asin)
+            doc_id = len(self.asins)
+            for term, tf in self._add_document(asin, title, category).items():
+                docs, tfs = self.delta.setdefault(self._term_id(term), (array("I"), array("H")))
+                docs.append(doc_id)
+                tfs.append(min(tf, _MAX_U16))
+
+    # -- querying ---------------------------------------------------------
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        lo, hi = (self.offsets[term_id], self.offsets[term_id + 1]) if term_id + 1 < len(self.offsets) else (0, 0)
+        docs, tfs = self.post_docs[lo:hi], self.post_tfs[lo:hi]
+        extra = self.delta.get(term_id)
+        if extra:
+            docs = np.concatenate([docs, np.frombuffer(extra[0], dtype=np.uint32)])
+            tfs = np.concatenate([tfs, np.frombuffer(extra[1], dtype=np.uint16)])
+        return docs, tfs
+
+    def search(self, keywords: List[str], limit: int, category: Optional[str] = None) -> List[Tuple[str, float, Optional[str]]]:
+        """Top documents by BM25 score as (asin, score, category)"""
+        with self._lock:
+            if not self.live_docs:
+                return []
+            term_ids = {self.vocab[t] for kw in keywords for t in tokenize(kw) if t in self.vocab}
+            if not term_ids:
+                return []
+
+            doc_len = np.frombuffer(self.doc_len, dtype=np.uint16)
+            live = np.frombuffer(self.live, dtype=np.uint8)
+            avg_len = self.total_len / self.live_docs
+            all_docs, all_scores = [], []
+            for term_id in term_ids:
+                docs, tfs = self._postings(term_id)
+                # Tombstoned postings stay until compact(); they must not count
+                df = int(np.count_nonzero(live[docs]))
+                if not df:
+                    continue
+                idf = math.log(1 + (self.live_docs - df + 0.5) / (df + 0.5))
+                tf = tfs.astype(np.float32)
+                norm = self.k1 * (1 - self.b + self.b * doc_len[docs] / avg_len)
+                all_docs.append(docs)
+                all_scores.append(idf * tf * (self.k1 + 1) / (tf + norm))
+            if not all_docs:
+                return []
+
+            docs = np.concatenate(all_docs)
+            doc_ids, inverse = np.unique(docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(all_scores))
+
+            keep = live[doc_ids].astype(bool)
+            if category is not None:
+                code = self.category_codes.get(category)
+                if code is None:
+                    return []
+                keep &= np.frombuffer(self.doc_category, dtype=np.uint16)[doc_ids] == code
+            doc_ids, scores = doc_ids[keep], scores[keep]
+
+            if len(scores) > limit:
+                top = np.argpartition(-scores, limit)[:limit]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind="stable")]
+            categories = np.frombuffer(self.doc_category, dtype=np.uint16)
+            return [
+                (self.asins[doc_ids[i]], float(scores[i]), self.category_names[categories[doc_ids[i]]])
+                for i in top
+            ]
+
+    # -- persistence and stats --------------------------------------------
+
+    def save(self, path: str):
+        """Write a snapshot (postings are compacted first); replaced atomically for readers"""
+        self.compact()
+        with self._lock:
+            meta = json.dumps({
+                "k1": self.k1,
+                "b": self.b,
+                "terms": sorted(self.vocab, key=self.vocab.get),
+                "asins": self.asins,
+                "categories": self.category_names
+            }).encode("utf-8")
+            staging = f"{path}.tmp"
+            with open(staging, "wb") as f:
+                np.savez(
+                    f,
+                    meta=np.frombuffer(meta, dtype=np.uint8),
+                    offsets=self.offsets,
+                    post_docs=self.post_docs,
+                    post_tfs=self.post_tfs,
+                    doc_len=np.frombuffer(self.doc_len, dtype=np.uint16),
+                    doc_category=np.frombuffer(self.doc_category, dtype=np.uint16),
+                    live=np.frombuffer(self.live, dtype=np.uint8)
+                )
+            os.replace(staging, path)
+        logger.info(f"BM25 snapshot written to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load a snapshot written by save()"""
+        start = time.perf_counter()
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+            index = cls(k1=meta["k1"], b=meta["b"])
+            index.vocab = {term: i for i, term in enumerate(meta["terms"])}
+            index.asins = meta["asins"]
+            index.category_names = meta["categories"]
+            index.category_codes = {name: i for i, name in enumerate(index.category_names)}
+            index.offsets = data["offsets"]
+            index.post_docs = data["post_docs"]
+            index.post_tfs = data["post_tfs"]
+            index.doc_len = array("H", data["doc_len"].tobytes())
+            index.doc_category = array("H", data["doc_category"].tobytes())
+            index.live = bytearray(data["live"].tobytes())
+        index.snapshot_mtime = os.stat(path).st_mtime_ns
+        index.asin_to_doc = {asin: i for i, asin in enumerate(index.asins) if index.live[i]}
+        index.live_docs = len(index.asin_to_doc)
+        doc_len = np.frombuffer(index.doc_len, dtype=np.uint16)
+        index.total_len = int(doc_len[np.frombuffer(index.live, dtype=np.uint8).astype(bool)].sum())
+        index.build_seconds = time.perf_counter() - start
+        logger.info(f"BM25 snapshot loaded from {path} in {index.build_seconds:.1f}s")
+        return index
+
+    def stats(self) -> Dict[str, Any]:
+        """Size, memory footprint and build time"""
+        with self._lock:
+            array_bytes = (
+                self.offsets.nbytes + self.post_docs.nbytes + self.post_tfs.nbytes
+                + len(self.doc_len) * 2 + len(self.doc_category) * 2 + len(self.live)
+                + sum(d.itemsize * len(d) + t.itemsize * len(t) for d, t in self.delta.values())
+            )
+            # Rough size of the Python-level vocabulary and ASIN maps
+            dict_bytes = sys.getsizeof(self.vocab) + sys.getsizeof(self.asin_to_doc) + sum(
+                sys.getsizeof(term) for term in self.vocab
+            ) + sum(sys.getsizeof(asin) for asin in self.asins)
+            return {
+                "docs": self.live_docs,
+                "terms": len(self.vocab),
+                "postings": int(len(self.post_docs)),
+                "delta_terms": len(self.delta),
+                "postings_bytes": int(array_bytes),
+                "approx_total_bytes": int(array_bytes + dict_bytes),
+                "build_seconds": round(self.build_seconds, 3)
+            }
+
+
+_index: Optional[BM25Index] = None
+_index_lock = threading.Lock()
+
+
+def _snapshot_changed(index: BM25Index, path: Optional[str]) -> bool:
+    """Whether the snapshot file was rewritten after `index` was loaded from it"""
+    if not path or index.snapshot_mtime is None:
+        return False
+    try:
+        return os.stat(path).st_mtime_ns != index.snapshot_mtime
+    except FileNotFoundError:
+        return False
+
+
+def get_bm25_index() -> BM25Index:
+    """Process-wide index: loaded from the snapshot if present, else built from the DB.
+
+    Reloaded when the loader has saved a newer snapshot.
+    """
+    global _index
+    index = _index
+    if index is not None and time.monotonic() - index.checked_at < settings.bm25_check_interval_s:
+        return index
+    with _index_lock:
+        path = settings.bm25_snapshot_path
+        if _index is None or _snapshot_changed(_index, path):
+            if path and Path(path).exists():
+                _index = BM25Index.load(path)
+            else:
+                from backend.database import SessionLocal
+                db = SessionLocal()
+                try:
+                    _index = BM25Index.from_db(db)
+                finally:
+                    db.close()
+                if path:
+                    _index.save(path)
+                    _index.snapshot_mtime = os.stat(path).st_mtime_ns
+        _index.checked_at = time.monotonic()
+        return _index
+
+
+def loaded_bm25_index() -> Optional[BM25Index]:
+    """The index if it has been loaded, without triggering a build"""
+    return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the BM25 keyword index")
+    parser.add_argument("command", choices=["build", "stats"])
+    parser.add_argument("--path", default=settings.bm25_snapshot_path, help="snapshot file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "build":
+        from backend.database import SessionLocal
+        db = SessionLocal()
+        try:
+            index = BM25Index.from_db(db)
+        finally:
+            db.close()
+        if args.path:
+            index.save(args.path)
+    else:
+        index = BM25Index.load(args.path)
+    print(json.dumps(index.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""In-process caches"""
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+import numpy as np
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used in cache keys: NFKC, trimmed, single spaces"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def prompt_version(prompt: str) -> str:
+    """Short digest of a prompt; changing the prompt text changes every cache key"""
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a TTL"""
+
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl_s:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """Insert a value, evicting the least recently used entries if full"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+class EmbeddingCache:
+    """Embedding cache keyed on model name plus normalized text.
+
+    Vectors are stored as read-only float32 arrays in a bounded in-memory
+    LRU+TTL tier, backed by an optional SQLite file so restarts don't start
+    cold. The file is pruned of expired rows, and down to `persist_max_entries`
+    newest rows, on open and every PRUNE_EVERY writes.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, max_entries: int, ttl_s: float, persist_path: Optional[str] = None,
+                 persist_max_entries: int = 200000):
+        self.memory = TTLCache(max_entries, ttl_s)
+        self.ttl_s = ttl_s
+        self.persist_path = persist_path
+        self.persist_max_entries = persist_max_entries
+        self.persistent_hits = 0
+        self.pruned = 0
+        self._writes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if persist_path:
+            try:
+                self._db = sqlite3.connect(persist_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings "
+                    "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, stored_at REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_stored_at ON embeddings (stored_at)")
+                self._db.commit()
+                with self._db_lock:
+                    self._prune()
+            except sqlite3.Error as e:
+                logger.warning(f"Persistent embedding cache disabled ({persist_path}): {e}")
+                self._db = None
+
+    def _prune(self):
+        """Delete expired rows, then the oldest rows beyond persist_max_entries (caller holds _db_lock)"""
+        expired = self._db.execute("DELETE FROM embeddings WHERE stored_at < ?", (time.time() - self.ttl_s,))
+        overflow = self._db.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.persist_max_entries,)
+        )
+        self._db.commit()
+        self.pruned += expired.rowcount + overflow.rowcount
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return f"{model}\x00{normalize_text(text)}"
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """Look up a vector in memory, then in the persistent tier"""
+        key = self.key(model, text)
+        vector = self.memory.get(key)
+        if vector is not None or self._db is None:
+            return vector
+        
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT vector, stored_at FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_s:
+            return None
+        vector = np.frombuffer(row[0], dtype=np.float32)  # read-only view of the blob
+        self.persistent_hits += 1
+        self.memory.set(key, vector)
+        return vector
+
+    def put(self, model: str, text: str, vector: List[float]) -> np.ndarray:
+        """Store a vector in both tiers and return the cached float32 array.
+
+        The cache keeps its own read-only copy, shared by every later hit, so an
+        in-place change by any caller raises instead of corrupting the entry.
+        """
+        key = self.key(model, text)
+        vector = np.array(vector, dtype=np.float32)
+        vector.flags.writeable = False
+        self.memory.set(key, vector)
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO embeddings (key, vector, stored_at) VALUES (?, ?, ?)",
+                        (key, vector.tobytes(), time.time())
+                    )
+                    self._db.commit()
+                    self._writes += 1
+                    if self._writes % self.PRUNE_EVERY == 0:
+                        self._prune()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not persist embedding: {e}")
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats["persistent"] = self._db is not None
+        stats["persistent_hits"] = self.persistent_hits
+        stats["persistent_pruned"] = self.pruned
+        return stats
+
+
+class StaleWhileRevalidateCache:
+    """Cache for expensive computed results that serves stale entries while refreshing.
+
+    Entries younger than `ttl_s` are fresh. Entries up to `ttl_s + stale_ttl_s` old
+    are returned immediately while one background refresh recomputes them; older
+    entries are recomputed inline. Failed computations are never cached.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float, stale_ttl_s: float, refresh_workers: int = 2):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.stale_ttl_s = stale_ttl_s
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_pool = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="cache-refresh")
+        self._refresh_tasks = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.evictions = 0
+
+    def _lookup(self, key: Hashable):
+        """Return (value, needs_refresh) for a usable entry, else None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age > self.ttl_s + self.stale_ttl_s:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            if age <= self.ttl_s:
+                self.hits += 1
+                return value, False
+            self.stale_hits += 1
+            if key in self._refreshing:
+                return value, False
+            self._refreshing.add(key)
+            return value, True
+
+    def _store(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def _refresh_done(self, key: Hashable, error: Optional[BaseException]):
+        with self._lock:
+            self._refreshing.discard(key)
+            if error is None:
+                self.refreshes += 1
+            else:
+                self.refresh_failures += 1
+        if error is not None:
+            logger.warning(f"Background cache refresh failed: {error}")
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for key, computing it on a miss"""
+        found = self._lookup(key)
+        if found is None:
+            value = compute()
+            self._store(key, value)
+            return value
+        value, needs_refresh = found
+        if needs_refresh:
+            def refresh():
+                try:
+                    self._store(key, compute())
+                    self._refresh_done(key, None)
+                except Exception as e:
+                    self._refresh_done(key, e)
+            self._refresh_pool.submit(refresh)
+        return value
+
+    async def aget_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant: `compute` returns a coroutine, refreshes run as tasks"""
+        found = self._lookup(key)
+        if found is None:
+            value = await compute()
+            self._store(key, value)
+            return value
+        value, needs_refresh = found
+        if needs_refresh:
+            async def refresh():
+                try:
+                    self._store(key, await compute())
+                    self._refresh_done(key, None)
+                except Exception as e:
+                    self._refresh_done(key, e)
+            task = asyncio.ensure_future(refresh())
+            # Keep a reference so the task isn't garbage collected mid-flight
+            self._refresh_tasks.add(task)
+            task.add_done_callback(self._refresh_tasks.discard)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "evictions": self.evictions
+            }
+
+
+# Global embedding cache shared by the sync and async Ollama clients
+embedding_cache = EmbeddingCache(
+    max_entries=settings.embed_cache_size,
+    ttl_s=settings.embed_cache_ttl_s,
+    persist_path=settings.embed_cache_path,
+    persist_max_entries=settings.embed_cache_persist_size
+)
+
+# Global cache for structured LLM results (query understanding, category detection)
+llm_result_cache = StaleWhileRevalidateCache(
+    max_entries=settings.llm_cache_size,
+    ttl_s=settings.llm_cache_ttl_s,
+    stale_ttl_s=settings.llm_cache_stale_ttl_s
+)
@@ -0,0 +1,60 @@
+"""Compact recall candidate.
+
+Recall paths return only (asin, category, score) per result, wrapped in a
+Candidate. After fusion the few winners are hydrated with their full item row
+(RecommendationEngine.hydrate_candidates), and field conversion (float price,
+JSON defaults, review summary) happens in one place, to_dict(), which is only
+called for the final top-N results.
+"""
+from typing import Any, Dict, List, Optional
+
+
+class Candidate:
+    """One recalled item: id, category and recall metadata, plus the item row once hydrated"""
+
+    __slots__ = ("asin", "category", "similarity", "recall_path", "score", "row")
+
+    def __init__(self, asin: str, category: Optional[str], similarity: float, recall_path: str, row=None):
+        self.asin = asin
+        self.category = category
+        self.similarity = similarity
+        self.recall_path = recall_path
+        self.score: Optional[float] = None
+        self.row = row
+
+    @classmethod
+    def from_row(cls, row, similarity: float, recall_path: str) -> "Candidate":
+        """Shared mapper for recall result rows (asin, category, score columns)"""
+        return cls(row.asin, row.category, similarity, recall_path)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Materialize the result dict returned by the API layer"""
+        row = self.row
+        if row is None:
+            raise ValueError(f"Candidate {self.asin} has not been hydrated")
+        item = {
+            "asin": row.asin,
+            "title": row.title,
+            "category": row.category,
+            "brand": row.brand,
+            "price": float(row.price) if row.price else None,
+            "rating_avg": float(row.rating_avg) if row.rating_avg else None,
+            "rating_count": row.rating_count,
+            "category_path": row.category_path if row.category_path else [],
+            "attributes": row.attributes if row.attributes else {},
+            "similarity": self.similarity,
+            "recall_path": self.recall_path
+        }
+        if self.score is not None:
+            item["score"] = self.score
+        if self.recall_path == "review_embedding" and hasattr(row, "summary_text"):
+            item["review_summary"] = {
+                "pros": row.pros if row.pros else [],
+                "cons": row.cons if row.cons else [],
+                "text": row.summary_text[:200] if row.summary_text else ""
+            }
+        return item
+
+
+def candidates_to_dicts(candidates: List[Candidate]) -> List[Dict[str, Any]]:
+    return [candidate.to_dict() for candidate in candidates]
@@ -0,0 +1,130 @@
+"""In-memory catalog of item categories and their sizes.
+
+Replaces per-request existence checks against lmrc.items: category names and
+item counts are loaded with one GROUP BY, refreshed in the background once
+they are older than category_registry_ttl_s, and looked up in O(1).
+"""
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_COUNTS_SQL = text("""
+    SELECT category, COUNT(*) as item_count
+    FROM lmrc.items
+    WHERE category IS NOT NULL
+    GROUP BY category
+""")
+
+
+def category_key(name: str) -> str:
+    """Case- and separator-insensitive lookup key ("HOME AND KITCHEN" ~ "Home_and_Kitchen")"""
+    return re.sub(r"[^0-9a-z]+", "_", name.lower()).strip("_")
+
+
+class CategoryRegistry:
+    """Category names, item counts and their distribution"""
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._keys: Dict[str, str] = {}
+        self.total_items = 0
+        self.loaded_at: Optional[float] = None
+        self.failed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded_at is not None
+
+    def refresh(self, db=None):
+        """Reload the catalog; on failure the previous catalog stays in place"""
+        from backend.database import SessionLocal
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            counts = {row.category: row.item_count for row in db.execute(CATEGORY_COUNTS_SQL)}
+            # Swap whole structures so readers never see a partial catalog
+            self._keys = {category_key(name): name for name in counts}
+            self._counts = counts
+            self.total_items = sum(counts.values())
+            self.loaded_at = time.time()
+            self.failed_at = None
+            logger.info(f"Category registry loaded: {len(counts)} categories, {self.total_items} items")
+        except Exception as e:
+            self.failed_at = time.time()
+            logger.error(f"Error loading category registry: {e}")
+            if own_session:
+                db.rollback()
+        finally:
+            if own_session:
+                db.close()
+            self._refreshing = False
+
+    def _backing_off(self) -> bool:
+        """A load failed less than one refresh interval ago"""
+        return self.failed_at is not None and time.time() - self.failed_at < settings.category_registry_ttl_s
+
+    def ensure_fresh(self):
+        """Load the catalog on first use (blocking) and start a background reload once stale.
+
+        After a failed load, callers get the current (possibly empty) catalog
+        until the refresh interval has passed instead of retrying on every call.
+        """
+        if self._backing_off():
+            return
+        if self.loaded_at is None:
+            with self._lock:
+                if self.loaded_at is None and not self._backing_off():
+                    self.refresh()
+        elif time.time() - self.loaded_at > settings.category_registry_ttl_s and not self._refreshing:
+            # Serve the current catalog while a background thread reloads it
+            self._refreshing = True
+            threading.Thread(target=self.refresh, name="category-registry", daemon=True).start()
+
+    def resolve(self, name: Optional[str]) -> Optional[str]:
+        """Canonical category name, or None if no item has that category"""
+        if not name:
+            return None
+        self.ensure_fresh()
+        if name in self._counts:
+            return name
+        return self._keys.get(category_key(name))
+
+    def exists(self, name: Optional[str]) -> bool:
+        return self.resolve(name) is not None
+
+    def count(self, name: str) -> int:
+        """Number of items in a category (0 if unknown)"""
+        canonical = self.resolve(name)
+        return self._counts.get(canonical, 0) if canonical else 0
+
+    def names(self) -> List[str]:
+        self.ensure_fresh()
+        return sorted(self._counts)
+
+    def distribution(self) -> Dict[str, float]:
+        """Share of all items in each category"""
+        self.ensure_fresh()
+        total = self.total_items or 1
+        return {name: count / total for name, count in self._counts.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "categories": len(self._counts),
+            "items": self.total_items,
+            "age_s": round(time.time() - self.loaded_at, 1) if self.loaded_at else None,
+            "failed_age_s": round(time.time() - self.failed_at, 1) if self.failed_at else None
+        }
+
+
+# Global registry instance
+category_registry = CategoryRegistry()
@@ -1,19 +1,147 @@
 """Database connection and session management"""
-from sqlalchemy import create_engine, text
+import time
+from typing import Optional
+import psycopg
+from pgvector.psycopg import register_vector, register_vector_async
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from backend.config import settings
+from backend.metrics import metrics
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Use NullPool to avoid connection pooling issues
+
+class _CheckoutTimerMixin:
+    """Records how long each pool checkout waits for a connection.
+
+    Checkout wait is tracked separately from statement time, so pool starvation
+    shows up as high `db_pool_checkout_wait` rather than as slow queries.
+    """
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            metrics.incr("db_pool_timeouts")
+            raise
+        finally:
+            metrics.observe("db_pool_checkout_wait", time.perf_counter() - start)
+
+
+class TimedQueuePool(_CheckoutTimerMixin, QueuePool):
+    """QueuePool with checkout wait timing"""
+
+
+class TimedAsyncQueuePool(_CheckoutTimerMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout wait timing"""
+
+
+def _engine_options(async_mode: bool = False) -> dict:
+    """Pool options for the configured pool mode"""
+    if settings.db_pool_mode == "null":
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": TimedAsyncQueuePool if async_mode else TimedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_s,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle_s
+    }
+
+
 engine = create_engine(
     settings.database_url,
-    poolclass=NullPool,
-    echo=False
+    echo=False,
+    **_engine_options()
 )
 
+
+def _register_vector_types(dbapi_connection, driver_connection):
+    """Send NumPy embeddings in pgvector's binary format and load vectors as NumPy arrays"""
+    try:
+        if isinstance(driver_connection, psycopg.AsyncConnection):
+            dbapi_connection.run_async(register_vector_async)
+        else:
+            register_vector(driver_connection)
+    except psycopg.ProgrammingError as e:
+        # Fresh database: the extension is created by init_db, which then resets the pool
+        logger.warning(f"pgvector types not registered on this connection: {e}")
+
+
+def _configure_connection(dbapi_connection, connection_record):
+    """Enable psycopg server-side prepared statements and the pgvector adapters"""
+    # The async dialect wraps the psycopg connection in an adapter
+    driver_connection = connection_record.driver_connection
+    driver_connection.prepare_threshold = settings.db_prepare_threshold
+    driver_connection.prepared_max = settings.db_prepared_max
+    _register_vector_types(dbapi_connection, driver_connection)
+
+
+# The start time lives on the per-statement execution context, so a statement
+# that fails (no after_cursor_execute) leaves nothing behind on the connection
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_start", None)
+    if started is not None:
+        metrics.observe("db_query", time.perf_counter() - started)
+
+
+def _instrument(sync_engine):
+    """Attach connection setup and query timing to an engine"""
+    event.listen(sync_engine, "connect", _configure_connection)
+    event.listen(sync_engine, "before_cursor_execute", _start_query_timer)
+    event.listen(sync_engine, "after_cursor_execute", _stop_query_timer)
+
+
+_instrument(engine)
+
+# Async engine mode: AsyncSession over async psycopg, used by the async API
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+if settings.db_async:
+    async_engine = create_async_engine(
+        settings.database_url,
+        echo=False,
+        **_engine_options(async_mode=True)
+    )
+    _instrument(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+def _pool_state(pool) -> dict:
+    if not isinstance(pool, QueuePool):
+        return {"mode": settings.db_pool_mode}
+    return {
+        "mode": settings.db_pool_mode,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow()
+    }
+
+
+def get_pool_stats() -> dict:
+    """Connection pool state"""
+    stats = _pool_state(engine.pool)
+    if async_engine is not None:
+        stats["async"] = _pool_state(async_engine.pool)
+    return stats
+
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
@@ -32,6 +160,12 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Get async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
     """Initialize database - ensure extensions"""
     with engine.connect() as conn:
@@ -46,10 +180,12 @@ def init_db():
         
         # Enable pgvector extension
         try:
+            created = conn.execute(text("SELECT to_regtype('vector') IS NULL")).scalar()
             conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
             conn.commit()
             logger.info("pgvector extension enabled")
         except Exception as e:
+            created = False
             logger.warning(f"pgvector extension may already exist: {e}")
         
         # Enable pg_trgm for text search
@@ -59,3 +195,7 @@ def init_db():
             logger.info("pg_trgm extension enabled")
         except Exception as e:
             logger.warning(f"pg_trgm extension may already exist: {e}")
+    
+    if created:
+        # Pooled connections opened before the extension existed have no vector adapters
+        engine.dispose()
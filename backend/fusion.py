@@ -0,0 +1,126 @@
+"""Candidate merging and score fusion for multi-path recall.
+
+Recall paths add their results to a CandidatePool, which keys candidates by
+ASIN (O(1) duplicate detection) and records every appearance as flat arrays.
+A fusion function turns those arrays into one score per candidate with NumPy,
+and the top-N is taken by partial selection instead of a full sort.
+"""
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+from backend.candidate import Candidate
+from backend.config import settings
+
+# (similarity weight, rank weight, boost for an item another path already recalled)
+PATH_WEIGHTS: Dict[str, Tuple[float, float, float]] = {
+    "vector": (0.6, 0.4, 0.0),
+    "keyword": (0.7, 0.3, 0.3),
+    # Category of the top vector hit, or of the top keyword hits when vector recall is empty
+    "category": (0.2, 0.1, 0.0),
+    "keyword_category": (0.4, 0.2, 0.0),
+    "review_embedding": (0.5, 0.3, 0.2),
+    "category_fallback": (0.0, 0.3, 0.0),
+    "popular": (0.1, 0.05, 0.0),
+}
+
+
+class CandidatePool:
+    """Candidates keyed by ASIN plus one record per (path, result) appearance"""
+
+    def __init__(self):
+        self.items: List[Candidate] = []
+        self._index: Dict[str, int] = {}
+        # Per-path arrays, concatenated at fusion time
+        self._rows: List[np.ndarray] = []
+        self._ranks: List[np.ndarray] = []
+        self._base: List[np.ndarray] = []
+        self._bonus: List[np.ndarray] = []
+        self._path_weight: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, results: List[Candidate], sim_weight: float, rank_weight: float, boost: float = 0.0):
+        """Add one path's ranked results.
+
+        A first appearance scores similarity * sim_weight plus the linear rank
+        score * rank_weight; a repeat appearance adds `boost` to the candidate.
+        """
+        n = len(results)
+        if not n:
+            return
+        rows = np.empty(n, dtype=np.int64)
+        first = np.zeros(n, dtype=bool)
+        for pos, item in enumerate(results):
+            row = self._index.get(item.asin)
+            if row is None:
+                row = self._index[item.asin] = len(self.items)
+                self.items.append(item)
+                first[pos] = True
+            rows[pos] = row
+
+        ranks = np.arange(n, dtype=np.float64)
+        similarity = np.fromiter((item.similarity or 0.0 for item in results), dtype=np.float64, count=n)
+        base = similarity * sim_weight + (1 - ranks / n) * rank_weight
+        self._rows.append(rows)
+        self._ranks.append(ranks)
+        self._base.append(np.where(first, base, 0.0))
+        self._bonus.append(np.where(first, 0.0, boost))
+        self._path_weight.append(np.full(n, sim_weight + rank_weight))
+
+    def _column(self, parts: List[np.ndarray]) -> np.ndarray:
+        return np.concatenate(parts) if parts else np.zeros(0)
+
+    def fuse(self, limit: int, method: str = None) -> List[Candidate]:
+        """Score every candidate with the fusion function and return the top `limit`"""
+        if not self.items:
+            return []
+        scores = FUSION_FUNCTIONS[method or settings.fusion_method](self)
+        top = top_n(scores, limit)
+        selected = []
+        for row in top:
+            item = self.items[row]
+            item.score = float(scores[row])
+            selected.append(item)
+        return selected
+
+    def path_counts(self) -> Dict[str, int]:
+        """Candidates per originating recall path"""
+        counts: Dict[str, int] = {}
+        for item in self.items:
+            path = item.recall_path
+            counts[path] = counts.get(path, 0) + 1
+        return counts
+
+
+def weighted_fusion(pool: CandidatePool) -> np.ndarray:
+    """Score of the first appearance plus capped boosts for repeat appearances"""
+    rows = pool._column(pool._rows).astype(np.int64)
+    base = np.bincount(rows, weights=pool._column(pool._base), minlength=len(pool))
+    bonus = np.bincount(rows, weights=pool._column(pool._bonus), minlength=len(pool))
+    return np.where(bonus > 0, np.minimum(1.0, base + bonus), base)
+
+
+def rrf_fusion(pool: CandidatePool) -> np.ndarray:
+    """Reciprocal rank fusion over every appearance, weighted per path"""
+    rows = pool._column(pool._rows).astype(np.int64)
+    contributions = pool._column(pool._path_weight) / (settings.rrf_k + pool._column(pool._ranks) + 1)
+    return np.bincount(rows, weights=contributions, minlength=len(pool))
+
+
+FUSION_FUNCTIONS: Dict[str, Callable[[CandidatePool], np.ndarray]] = {
+    "weighted": weighted_fusion,
+    "rrf": rrf_fusion,
+}
+
+
+def top_n(scores: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the n best scores, best first; ties keep insertion order"""
+    if len(scores) > n:
+        # Everything above the n-th best score, then the earliest of the tied ones
+        kth = -np.partition(-scores, n - 1)[n - 1]
+        above = np.flatnonzero(scores > kth)
+        selected = np.concatenate([above, np.flatnonzero(scores == kth)[:n - len(above)]])
+    else:
+        selected = np.arange(len(scores))
+    return selected[np.lexsort((selected, -scores[selected]))]
@@ -0,0 +1,244 @@
+"""Connection-pooled, keep-alive HTTP transport"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: the server is overloaded or restarting
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+def _backoff_delay(backoff_s: float, attempt: int) -> float:
+    """Exponential backoff randomized by +/-50% so retries don't synchronize"""
+    return backoff_s * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+class PooledTransport:
+    """JSON-over-HTTP transport backed by one keep-alive connection pool.
+
+    Connections are reused across calls instead of opening a new TCP connection
+    per request. Failed connects and retryable statuses are retried a bounded
+    number of times with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 10,
+        pool_block: bool = True,
+        max_retries: int = 2,
+        backoff_s: float = 0.2,
+        connect_timeout_s: float = 3.0
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.connect_timeout_s = connect_timeout_s
+        
+        self.session = requests.Session()
+        # Retries are handled here (with jitter), not by urllib3
+        self.adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            pool_block=pool_block,
+            max_retries=0
+        )
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._waits = 0
+        self._requests = 0
+        self._retries = 0
+        self._errors = 0
+    
+    @contextmanager
+    def _checkout(self):
+        """Track in-flight requests; a checkout beyond pool_size has to wait"""
+        with self._lock:
+            if self._in_use >= self.pool_size:
+                self._waits += 1
+            self._in_use += 1
+            self._requests += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_use -= 1
+    
+    def _sleep_before_retry(self, attempt: int):
+        """Exponential backoff with jitter"""
+        with self._lock:
+            self._retries += 1
+        time.sleep(_backoff_delay(self.backoff_s, attempt))
+    
+    def post_json(self, path: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """POST a JSON payload and return the decoded JSON response"""
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._checkout():
+                    response = self.session.post(
+                        url,
+                        json=payload,
+                        timeout=(self.connect_timeout_s, timeout)
+                    )
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    logger.warning(f"{url} returned {response.status_code}, retrying")
+                    self._sleep_before_retry(attempt)
+                    continue
+                response.raise_for_status()
+                return response.json()
+            except (requests.ConnectionError, requests.ConnectTimeout) as e:
+                # Only connection-level failures are retried; a read timeout on a
+                # long LLM call would just double the latency
+                if attempt >= self.max_retries:
+                    with self._lock:
+                        self._errors += 1
+                    raise
+                logger.warning(f"Connection to {url} failed ({e}), retrying")
+                self._sleep_before_retry(attempt)
+            except Exception:
+                with self._lock:
+                    self._errors += 1
+                raise
+    
+    def _idle_connections(self) -> int:
+        """Count idle keep-alive connections parked in the urllib3 pools"""
+        idle = 0
+        try:
+            pools = self.adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None and pool.pool is not None:
+                    idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+        except Exception as e:
+            logger.debug(f"Could not inspect connection pool: {e}")
+        return idle
+    
+    def stats(self) -> Dict[str, Any]:
+        """Pool statistics for sizing: in-use, idle and waits"""
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "in_use": self._in_use,
+                "idle": self._idle_connections(),
+                "waits": self._waits,
+                "requests": self._requests,
+                "retries": self._retries,
+                "errors": self._errors
+            }
+    
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+class AsyncPooledTransport:
+    """Asyncio counterpart of PooledTransport built on an httpx connection pool"""
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 10,
+        max_retries: int = 2,
+        backoff_s: float = 0.2,
+        connect_timeout_s: float = 3.0
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.connect_timeout_s = connect_timeout_s
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        self._in_use = 0
+        self._waits = 0
+        self._requests = 0
+        self._retries = 0
+        self._errors = 0
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the client on first use, inside the running event loop"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size
+                )
+            )
+        return self._client
+    
+    async def post_json(self, path: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """POST a JSON payload and return the decoded JSON response"""
+        client = self._get_client()
+        request_timeout = httpx.Timeout(timeout, connect=self.connect_timeout_s)
+        for attempt in range(self.max_retries + 1):
+            # All bookkeeping runs on the event loop thread, so no lock is needed
+            if self._in_use >= self.pool_size:
+                self._waits += 1
+            self._in_use += 1
+            self._requests += 1
+            try:
+                response = await client.post(path, json=payload, timeout=request_timeout)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                if attempt >= self.max_retries:
+                    self._errors += 1
+                    raise
+                logger.warning(f"Connection to {self.base_url}{path} failed ({e}), retrying")
+                self._retries += 1
+                await asyncio.sleep(_backoff_delay(self.backoff_s, attempt))
+                continue
+            except Exception:
+                self._errors += 1
+                raise
+            finally:
+                self._in_use -= 1
+            
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                logger.warning(f"{self.base_url}{path} returned {response.status_code}, retrying")
+                self._retries += 1
+                await asyncio.sleep(_backoff_delay(self.backoff_s, attempt))
+                continue
+            try:
+                response.raise_for_status()
+            except Exception:
+                self._errors += 1
+                raise
+            return response.json()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Pool statistics for sizing: in-use, idle and waits"""
+        idle = 0
+        if self._client is not None:
+            try:
+                connections = self._client._transport._pool.connections
+                idle = sum(1 for conn in connections if conn.is_idle())
+            except Exception as e:
+                logger.debug(f"Could not inspect connection pool: {e}")
+        return {
+            "pool_size": self.pool_size,
+            "in_use": self._in_use,
+            "idle": idle,
+            "waits": self._waits,
+            "requests": self._requests,
+            "retries": self._retries,
+            "errors": self._errors
+        }
+    
+    async def close(self):
+        """Close all pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
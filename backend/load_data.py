@@ -3,6 +3,7 @@ import json
 import logging
 import sys
 from pathlib import Path
+from typing import List, Optional, Tuple
 from tqdm import tqdm
 from datetime import datetime
 from sqlalchemy.orm import Session
@@ -15,6 +16,10 @@ from backend.database import SessionLocal, engine, Base, init_db
 from backend.models import Item, ItemEmbedding, ReviewSummary
 from backend.ollama_client import ollama_client
 from backend.config import settings
+from backend.migrations import apply_migrations
+from backend.bm25_index import BM25Index
+from backend.category_registry import category_registry
+from backend.vector_index import INDEX_KINDS, VectorIndex
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,14 +29,26 @@ init_db()
 Base.metadata.create_all(bind=engine)
 
 
-def load_metadata(db: Session, meta_dir: Path):
-    """Load item metadata from meta_categories files"""
+def load_metadata(db: Session, meta_dir: Path, bm25: Optional[BM25Index] = None):
+    """Load item metadata from meta_categories files.
+    
+    Committed items are also upserted into `bm25`, if given.
+    """
     logger.info(f"Loading metadata from {meta_dir}")
     
     meta_files = list(meta_dir.glob("meta_*.jsonl"))
     logger.info(f"Found {len(meta_files)} metadata files")
     
     total_items = 0
+    # (asin, title, category) added since the last commit; indexed once committed
+    pending: List[Tuple[str, str, Optional[str]]] = []
+    
+    def commit():
+        db.commit()
+        if bm25 is not None:
+            for asin, title, category in pending:
+                bm25.upsert(asin, title, category)
+        pending.clear()
     for meta_file in meta_files:
         category = meta_file.stem.replace("meta_", "")
         logger.info(f"Processing {category}...")
@@ -84,23 +101,25 @@ def load_metadata(db: Session, meta_dir: Path):
                         )
                         
                         db.add(item)
+                        pending.append((asin, title, category))
                         total_items += 1
                         
                         # Commit in batches
                         if total_items % 1000 == 0:
-                            db.commit()
+                            commit()
                             logger.info(f"Committed {total_items} items")
                     
                     except Exception as e:
                         logger.error(f"Error processing line in {category}: {e}")
                         db.rollback()
+                        pending.clear()
                         continue
         
         except Exception as e:
             logger.error(f"Error processing {meta_file}: {e}")
             continue
     
-    db.commit()
+    commit()
     logger.info(f"Metadata loading completed: {total_items} items")
     return total_items
 
@@ -337,12 +356,29 @@ def main():
     db = SessionLocal()
     
     try:
+        # Bring an existing database's schema current before writing to it; an
+        # empty one gets its indexes after the bulk load below instead
+        has_items = db.query(Item.asin).first() is not None
+        # Migrations run DDL on their own connection; an open read transaction
+        # here would hold a lock on lmrc.items that their ALTERs wait behind
+        db.rollback()
+        if has_items:
+            apply_migrations()
+        
         # Load metadata
         data_dir = Path("/home/lucas/ucsc/yi/dataset/raw")
         meta_dir = data_dir / "meta_categories"
         
+        # Newly inserted items are added to an existing BM25 snapshot rather than rebuilding it
+        bm25 = None
+        if settings.bm25_snapshot_path and Path(settings.bm25_snapshot_path).exists():
+            bm25 = BM25Index.load(settings.bm25_snapshot_path)
+        
         if meta_dir.exists():
-            load_metadata(db, meta_dir)
+            load_metadata(db, meta_dir, bm25)
+            category_registry.refresh(db)
+            for name in category_registry.names():
+                logger.info(f"Category {name}: {category_registry.count(name)} items")
         else:
             logger.warning(f"Metadata directory not found: {meta_dir}")
         
@@ -359,6 +395,18 @@ def main():
         # Load embeddings for reviews
         load_review_embeddings(db)
         
+        # Build indexes after the bulk load rather than maintaining them row by row;
+        # the embedding loaders can return with their read transaction still open
+        db.rollback()
+        apply_migrations()
+        
+        # Save the BM25 snapshot; API processes reload it once the file changes
+        if settings.bm25_snapshot_path:
+            (bm25 or BM25Index.from_db(db)).save(settings.bm25_snapshot_path)
+        if settings.vector_index_dir:
+            for kind in INDEX_KINDS:
+                VectorIndex.build(db, kind, settings.vector_index_dir)
+        
         logger.info("Data loading completed successfully!")
     
     except Exception as e:
@@ -1,20 +1,27 @@
 """FastAPI main application"""
 import logging
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import APIRouter, FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 import uuid
 from datetime import datetime
 
-from backend.database import get_db, init_db
+from backend.bm25_index import get_bm25_index, loaded_bm25_index
+from backend.cache import embedding_cache, llm_result_cache
+from backend.category_registry import category_registry
+from backend.database import async_engine, get_db, get_pool_stats, init_db
+from backend.metrics import metrics
 from backend.models import Session as DBSession, Event
-from backend.recommendation_engine import RecommendationEngine
+from backend.recommendation_engine import CHAT_SYSTEM_PROMPT, RecommendationEngine
 from backend.schemas import (
     RecommendationRequest, RecommendationResponse, ItemInfo,
     ItemDetailRequest, ItemDetailResponse,
     ConversationRequest, ConversationResponse
 )
-from backend.ollama_client import ollama_client
+from backend.topn_store import topn_store
+from backend.vector_index import get_vector_index, loaded_vector_indexes
+from backend.ollama_client import async_ollama_client, ollama_client
+from backend.config import settings
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -36,6 +43,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Synchronous API: handlers are plain functions, so FastAPI runs them on its
+# threadpool instead of blocking the event loop
+router = APIRouter()
+
 
 @app.on_event("startup")
 async def startup_event():
@@ -43,8 +54,34 @@ async def startup_event():
     try:
         init_db()
         logger.info("Database initialized successfully")
+        category_registry.refresh()
+        if settings.auto_migrate:
+            from backend.migrations import apply_migrations
+            apply_migrations()
+        if settings.keyword_backend == "bm25":
+            # Load or build the index now rather than on the first keyword query
+            get_bm25_index()
+        if settings.vector_backend == "memory":
+            get_vector_index("items")
+            get_vector_index("reviews")
+        if settings.topn_store_enabled:
+            topn_store.start()
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
+    
+    # Outside the try: recall cannot work against unconverted embedding columns
+    from backend.migrations import check_embedding_storage
+    check_embedding_storage()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled connections"""
+    topn_store.stop()
+    await async_ollama_client.close()
+    ollama_client.transport.close()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 
 @app.get("/health")
@@ -56,8 +93,25 @@ async def health_check():
     }
 
 
-@app.post("/api/recommend", response_model=RecommendationResponse)
-async def get_recommendations(
+@app.get("/api/metrics")
+async def get_metrics():
+    """Runtime statistics for capacity planning"""
+    return {
+        "ollama_pool": ollama_client.pool_stats(),
+        "async_ollama_pool": async_ollama_client.pool_stats(),
+        "db_pool": get_pool_stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "llm_result_cache": llm_result_cache.stats(),
+        "bm25_index": loaded_bm25_index().stats() if loaded_bm25_index() else None,
+        "vector_indexes": loaded_vector_indexes(),
+        "topn_store": topn_store.stats(),
+        "category_registry": category_registry.stats(),
+        **metrics.snapshot()
+    }
+
+
+@router.post("/api/recommend", response_model=RecommendationResponse)
+def get_recommendations(
     request: RecommendationRequest,
     db: Session = Depends(get_db)
 ):
@@ -75,26 +129,19 @@ async def get_recommendations(
         # Initialize recommendation engine
         rec_engine = RecommendationEngine(db)
         
-        # Understand query and get intent
-        intent, keywords = rec_engine.understand_query(request.query)
-        
-        # Detect product category
-        detected_category = rec_engine.detect_category(request.query, keywords)
+        # Understand query, detect category and embed once for the whole request
+        plan = rec_engine.plan_query(request.query)
+        plan.vector_overfetch = request.vector_overfetch
         
         # Generate recommendations
-        recommendations = rec_engine.generate_recommendations(request.query)
+        recommendations = rec_engine.generate_recommendations(request.query, plan)
         
         # Log event
         event = Event(
             session_id=session_id,
             user_id=request.user_id,
             event_type="query",
-            payload={
-                "query": request.query,
-                "intent": intent,
-                "keywords": keywords,
-                "detected_category": detected_category
-            }
+            payload=plan.to_event_payload()
         )
         db.add(event)
         db.commit()
@@ -104,8 +151,8 @@ async def get_recommendations(
         
         return RecommendationResponse(
             query=request.query,
-            intent=intent,
-            detected_category=detected_category,
+            intent=plan.intent,
+            detected_category=plan.category,
             recommendations=items,
             session_id=session_id
         )
@@ -114,8 +161,8 @@ async def get_recommendations(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/item-details", response_model=ItemDetailResponse)
-async def get_item_details(
+@router.post("/api/item-details", response_model=ItemDetailResponse)
+def get_item_details(
     request: ItemDetailRequest,
     db: Session = Depends(get_db)
 ):
@@ -135,8 +182,8 @@ async def get_item_details(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/chat", response_model=ConversationResponse)
-async def chat(
+@router.post("/api/chat", response_model=ConversationResponse)
+def chat(
     request: ConversationRequest,
     db: Session = Depends(get_db)
 ):
@@ -153,14 +200,11 @@ async def chat(
         rec_engine = RecommendationEngine(db)
         
         # Generate response and recommendations
-        intent, keywords = rec_engine.understand_query(request.message)
-        recommendations = rec_engine.generate_recommendations(request.message)
+        plan = rec_engine.plan_query(request.message)
+        recommendations = rec_engine.generate_recommendations(request.message, plan)
         
         # Create assistant response
-        system_prompt = """你是一个专业的电商推荐助手。根据用户的需求，提供友好、有帮助的回复。
-        你会获得推荐的商品列表，可以在回复中描述这些商品。"""
-        
-        assistant_message = ollama_client.generate_text(request.message, system_prompt)
+        assistant_message = ollama_client.generate_text(request.message, CHAT_SYSTEM_PROMPT)
         
         # Log event
         event = Event(
@@ -168,7 +212,7 @@ async def chat(
             event_type="chat",
             payload={
                 "user_message": request.message,
-                "intent": intent
+                "intent": plan.intent
             }
         )
         db.add(event)
@@ -187,6 +231,14 @@ async def chat(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Async engine mode serves the same endpoints from AsyncSession coroutines
+if settings.db_async:
+    from backend.async_api import router as async_router
+    app.include_router(async_router)
+else:
+    app.include_router(router)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
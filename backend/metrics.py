@@ -0,0 +1,81 @@
+"""In-process runtime metrics"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict
+
+
+class LatencyStats:
+    """Count/total/max plus percentiles over a window of recent observations"""
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        recent = sorted(self.recent)
+
+        def pct(p: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(p * len(recent)))] * 1000
+
+        return {
+            "count": self.count,
+            "avg_ms": (self.total / self.count * 1000) if self.count else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": self.max * 1000
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe registry of latency timers and counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, LatencyStats] = {}
+        self._counters: Dict[str, int] = {}
+
+    def observe(self, name: str, seconds: float):
+        """Record one latency observation"""
+        with self._lock:
+            stats = self._latencies.get(name)
+            if stats is None:
+                stats = self._latencies[name] = LatencyStats()
+            stats.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time the enclosed block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def incr(self, name: str, value: int = 1):
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All latencies and counters"""
+        with self._lock:
+            return {
+                "latencies": {name: stats.snapshot() for name, stats in self._latencies.items()},
+                "counters": dict(self._counters)
+            }
+
+
+# Global registry
+metrics = MetricsRegistry()
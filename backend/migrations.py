@@ -0,0 +1,418 @@
+"""Index and schema migrations for existing databases.
+
+`Base.metadata.create_all` only creates missing tables, so indexes and derived
+columns added after a database was loaded are applied here. Each migration runs
+once and is recorded in lmrc.schema_migrations. Statements run in autocommit
+mode so indexes can be built CONCURRENTLY without blocking writes; a step can
+also be a Python callable taking the connection, for batched backfills.
+
+Usage:
+    python -m backend.migrations            # apply pending migrations
+    python -m backend.migrations --list     # show migration status
+    python -m backend.migrations --verify   # EXPLAIN recall queries, check index usage
+"""
+import argparse
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from backend.config import settings
+from backend.database import engine
+from backend.models import (
+    EMBEDDING_OPS, EMBEDDING_SQL_TYPE, ITEM_SEARCH_TSV_EXPR,
+    POPULAR_ITEMS_PREDICATE, RATED_ITEMS_PREDICATE
+)
+
+logger = logging.getLogger(__name__)
+
+# Tables whose `embedding` column follows settings.vector_storage
+EMBEDDING_TABLES = ("item_embeddings", "reviews_summary")
+
+# Statements that take an ACCESS EXCLUSIVE lock give up after this long instead
+# of queueing behind a long-running transaction (and blocking everything after them)
+MIGRATION_LOCK_TIMEOUT = "5s"
+
+
+@dataclass
+class Migration:
+    """One named, ordered schema change"""
+    id: str
+    description: str
+    statements: List[Union[str, Callable[[Connection], None]]]
+    # Disabled migrations are skipped and stay pending until configuration enables them
+    enabled: bool = True
+
+
+def _item_ann_index(column: str) -> str:
+    return f"USING hnsw ({column} {EMBEDDING_OPS})"
+
+
+def _item_binary_index(column: str) -> str:
+    # Same expression as BINARY_EXPR in the recall SQL
+    return f"USING hnsw ((CAST(binary_quantize({column}) AS bit({settings.embed_dim}))) bit_hamming_ops)"
+
+
+def _review_ann_index(column: str) -> str:
+    """Partial ANN index definition for review embeddings, from Settings"""
+    if settings.review_index_type == "ivfflat":
+        method = f"ivfflat ({column} {EMBEDDING_OPS}) WITH (lists = {settings.review_ivfflat_lists})"
+    else:
+        method = (
+            f"hnsw ({column} {EMBEDDING_OPS}) "
+            f"WITH (m = {settings.review_hnsw_m}, ef_construction = {settings.review_hnsw_ef_construction})"
+        )
+    # Matches the `embedding IS NOT NULL` predicate of the review recall SQL
+    return f"USING {method} WHERE {column} IS NOT NULL"
+
+
+def _with_lock_timeout(statement: str) -> Callable[[Connection], None]:
+    """Run a statement in its own transaction under MIGRATION_LOCK_TIMEOUT"""
+    def run(conn: Connection):
+        try:
+            for sql in ("BEGIN", f"SET LOCAL lock_timeout = '{MIGRATION_LOCK_TIMEOUT}'", statement, "COMMIT"):
+                conn.exec_driver_sql(sql)
+        except Exception:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+    
+    return run
+
+
+def _embedding_type(conn: Connection, table: str) -> Optional[str]:
+    """Declared type of lmrc.`table`.embedding, e.g. 'vector(768)'; None if the table doesn't exist"""
+    return conn.execute(text("""
+        SELECT format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        WHERE a.attrelid = to_regclass(:table) AND a.attname = 'embedding' AND NOT a.attisdropped
+    """), {"table": f"lmrc.{table}"}).scalar()
+
+
+def check_embedding_storage(target: Engine = engine):
+    """Refuse to serve when an embedding column doesn't have the configured vector_storage type.
+
+    Recall SQL casts query embeddings to EMBEDDING_SQL_TYPE, which has no
+    distance operator against the other type, so every vector query would fail
+    until migration 0003 has run. An unreachable database is only logged here;
+    startup reports it elsewhere.
+    """
+    try:
+        with target.connect() as conn:
+            current = {table: _embedding_type(conn, table) for table in EMBEDDING_TABLES}
+    except Exception as e:
+        logger.warning(f"Could not check embedding column types: {e}")
+        return
+    mismatched = {table: kind for table, kind in current.items() if kind and kind != EMBEDDING_SQL_TYPE}
+    if mismatched:
+        columns = ", ".join(f"lmrc.{table}.embedding is {kind}" for table, kind in mismatched.items())
+        raise RuntimeError(
+            f"vector_storage={settings.vector_storage!r} expects {EMBEDDING_SQL_TYPE}, but {columns}; "
+            f"run `python -m backend.migrations` (or start with auto_migrate) before switching vector_storage"
+        )
+
+
+def _convert_embeddings(table: str, indexes: Dict[str, Callable[[str], str]], not_null: bool) -> Callable[[Connection], None]:
+    """Online conversion of `table`.embedding to the configured storage type.
+
+    A shadow column is added, kept current by a trigger, backfilled in small
+    keyset batches along the asin primary key and indexed CONCURRENTLY; only
+    the final swap takes a brief ACCESS EXCLUSIVE lock. Every index in
+    `indexes` (name -> definition over a column) that exists on the table is
+    rebuilt on the new column, since dropping the old column drops it. The old
+    column is dropped (space is reclaimed by later VACUUM FULL / pg_repack,
+    not by the migration).
+    """
+    def run(conn: Connection):
+        current = _embedding_type(conn, table)
+        if current == EMBEDDING_SQL_TYPE:
+            logger.info(f"lmrc.{table}.embedding is already {EMBEDDING_SQL_TYPE}")
+            return
+        
+        # Only rebuild the indexes the table had
+        existing = [
+            index for index in indexes
+            if conn.execute(text("SELECT to_regclass(:index) IS NOT NULL"), {"index": f"lmrc.{index}"}).scalar()
+        ]
+        conn.execute(text(f"ALTER TABLE lmrc.{table} ADD COLUMN IF NOT EXISTS embedding_new {EMBEDDING_SQL_TYPE}"))
+        conn.execute(text(f"""
+            CREATE OR REPLACE FUNCTION lmrc.{table}_embedding_new_sync() RETURNS trigger AS $$
+            BEGIN
+                NEW.embedding_new := CAST(NEW.embedding AS {EMBEDDING_SQL_TYPE});
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """))
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_embedding_new_sync ON lmrc.{table}"))
+        conn.execute(text(f"""
+            CREATE TRIGGER {table}_embedding_new_sync
+            BEFORE INSERT OR UPDATE OF embedding ON lmrc.{table}
+            FOR EACH ROW EXECUTE FUNCTION lmrc.{table}_embedding_new_sync()
+        """))
+        
+        # Keyset batches over the primary key: each batch is an index range scan
+        # and its own autocommit transaction, so row locks stay short
+        batch_end = text(f"""
+            SELECT MAX(asin) FROM (
+                SELECT asin FROM lmrc.{table}
+                WHERE asin > :after
+                ORDER BY asin
+                LIMIT :batch
+            ) b
+        """)
+        backfill = text(f"""
+            UPDATE lmrc.{table}
+            SET embedding_new = CAST(embedding AS {EMBEDDING_SQL_TYPE})
+            WHERE asin > :after AND asin <= :upto
+                AND embedding_new IS NULL AND embedding IS NOT NULL
+        """)
+        after, converted = "", 0
+        while True:
+            upto = conn.execute(batch_end, {"after": after, "batch": settings.migration_batch_size}).scalar()
+            if upto is None:
+                break
+            converted += conn.execute(backfill, {"after": after, "upto": upto}).rowcount
+            after = upto
+            logger.info(f"lmrc.{table}: {converted} embeddings converted")
+        
+        for index in existing:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS lmrc.{index}_new"))
+            conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY {index}_new ON lmrc.{table} {indexes[index]('embedding_new')}"
+            ))
+        if not_null:
+            # A validated CHECK lets SET NOT NULL skip its full-table scan under lock
+            conn.execute(text(f"ALTER TABLE lmrc.{table} DROP CONSTRAINT IF EXISTS {table}_embedding_new_not_null"))
+            conn.execute(text(
+                f"ALTER TABLE lmrc.{table} ADD CONSTRAINT {table}_embedding_new_not_null "
+                f"CHECK (embedding_new IS NOT NULL) NOT VALID"
+            ))
+            conn.execute(text(f"ALTER TABLE lmrc.{table} VALIDATE CONSTRAINT {table}_embedding_new_not_null"))
+        
+        swap = [
+            "BEGIN",
+            f"SET LOCAL lock_timeout = '{MIGRATION_LOCK_TIMEOUT}'",
+            f"DROP TRIGGER {table}_embedding_new_sync ON lmrc.{table}",
+        ]
+        swap += [f"DROP INDEX IF EXISTS lmrc.{index}" for index in indexes]
+        swap += [
+            f"ALTER TABLE lmrc.{table} DROP COLUMN embedding",
+            f"ALTER TABLE lmrc.{table} RENAME COLUMN embedding_new TO embedding",
+        ]
+        swap += [f"ALTER INDEX lmrc.{index}_new RENAME TO {index}" for index in existing]
+        if not_null:
+            swap += [
+                f"ALTER TABLE lmrc.{table} ALTER COLUMN embedding SET NOT NULL",
+                f"ALTER TABLE lmrc.{table} DROP CONSTRAINT {table}_embedding_new_not_null",
+            ]
+        swap += ["COMMIT", f"DROP FUNCTION lmrc.{table}_embedding_new_sync()"]
+        try:
+            for statement in swap:
+                conn.exec_driver_sql(statement)
+        except Exception:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        logger.info(f"lmrc.{table}.embedding converted to {EMBEDDING_SQL_TYPE}")
+    
+    return run
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        id="0001_items_title_trgm",
+        description="Trigram GIN index on item titles for keyword recall",
+        statements=[
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_items_title_trgm "
+            "ON lmrc.items USING gin (title gin_trgm_ops)",
+        ]
+    ),
+    Migration(
+        id="0002_items_search_tsv",
+        description="Stored tsvector over title/brand/category_path with a GIN index",
+        statements=[
+            # Adding a stored generated column rewrites the table once; afterwards
+            # PostgreSQL keeps it current on every write, including the loader's
+            _with_lock_timeout(
+                "ALTER TABLE lmrc.items ADD COLUMN IF NOT EXISTS search_tsv tsvector "
+                f"GENERATED ALWAYS AS ({ITEM_SEARCH_TSV_EXPR}) STORED"
+            ),
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_items_search_tsv "
+            "ON lmrc.items USING gin (search_tsv)",
+        ]
+    ),
+    Migration(
+        id="0003_embeddings_halfvec",
+        description="Convert item/review embeddings and their HNSW indexes to halfvec",
+        statements=[
+            _convert_embeddings(
+                "item_embeddings",
+                {"idx_item_embeddings_hnsw": _item_ann_index, "idx_item_embeddings_binary": _item_binary_index},
+                True
+            ),
+            _convert_embeddings("reviews_summary", {"idx_reviews_summary_embedding": _review_ann_index}, False),
+        ],
+        enabled=settings.vector_storage == "halfvec"
+    ),
+    Migration(
+        id="0004_item_embeddings_binary",
+        description="HNSW Hamming index over binary-quantized item embeddings",
+        statements=[
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_item_embeddings_binary "
+            f"ON lmrc.item_embeddings {_item_binary_index('embedding')}",
+        ],
+        enabled=settings.vector_search_mode == "binary"
+    ),
+    Migration(
+        id="0005_reviews_summary_embedding_ann",
+        description="Partial ANN index on review embeddings for review recall",
+        statements=[
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reviews_summary_embedding "
+            f"ON lmrc.reviews_summary {_review_ann_index('embedding')}",
+        ]
+    ),
+    Migration(
+        id="0006_items_category_popular",
+        description="Partial composite indexes for category and popular recall ordering",
+        statements=[
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_items_category_rating "
+            "ON lmrc.items (category, rating_avg DESC, rating_count DESC) "
+            f"WHERE {RATED_ITEMS_PREDICATE}",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_items_popular "
+            "ON lmrc.items (rating_count DESC, rating_avg DESC) "
+            f"WHERE {POPULAR_ITEMS_PREDICATE}",
+            "ANALYZE lmrc.items",
+        ]
+    ),
+]
+
+
+def _ensure_migrations_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS lmrc.schema_migrations (
+            id TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ DEFAULT now()
+        )
+    """))
+
+
+def applied_migrations(target: Engine = engine) -> List[str]:
+    """IDs of migrations already applied"""
+    with target.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        _ensure_migrations_table(conn)
+        return [row.id for row in conn.execute(text("SELECT id FROM lmrc.schema_migrations ORDER BY id"))]
+
+
+def apply_migrations(target: Engine = engine, only: Optional[List[str]] = None) -> List[str]:
+    """Apply pending migrations in order and return the IDs that ran"""
+    done = set(applied_migrations(target))
+    ran = []
+    with target.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for migration in MIGRATIONS:
+            if migration.id in done or not migration.enabled or (only and migration.id not in only):
+                continue
+            logger.info(f"Applying migration {migration.id}: {migration.description}")
+            start = time.perf_counter()
+            for statement in migration.statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(text(statement))
+            conn.execute(
+                text("INSERT INTO lmrc.schema_migrations (id) VALUES (:id) ON CONFLICT DO NOTHING"),
+                {"id": migration.id}
+            )
+            logger.info(f"Migration {migration.id} applied in {time.perf_counter() - start:.1f}s")
+            ran.append(migration.id)
+    return ran
+
+
+def explain(sql: str, params: Dict[str, Any], target: Engine = engine) -> str:
+    """EXPLAIN ANALYZE a statement and return the plan text"""
+    with target.connect() as conn:
+        rows = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params)
+        return "\n".join(row[0] for row in rows)
+
+
+def _sample_embedding(conn, table: str) -> Optional[str]:
+    return conn.execute(text(
+        f"SELECT CAST(embedding AS text) FROM lmrc.{table} WHERE embedding IS NOT NULL LIMIT 1"
+    )).scalar()
+
+
+def _plan_checks(conn) -> List[Tuple[str, str, Any, Dict[str, Any]]]:
+    """(name, expected index, statement, params) for the recall queries to verify"""
+    from backend.recommendation_engine import CATEGORY_RECALL_SQL, POPULAR_RECALL_SQL, REVIEW_RECALL_SQL
+    checks = [("popular_recall", "idx_items_popular", POPULAR_RECALL_SQL, {"limit": 20})]
+    # The largest category is the one most likely to be planned as a full sort
+    category = conn.execute(text("""
+        SELECT category FROM lmrc.items
+        WHERE category IS NOT NULL
+        GROUP BY category ORDER BY COUNT(*) DESC LIMIT 1
+    """)).scalar()
+    if category:
+        checks.append((
+            "category_recall", "idx_items_category_rating",
+            CATEGORY_RECALL_SQL, {"category": category, "limit": 20}
+        ))
+    review_embedding = _sample_embedding(conn, "reviews_summary")
+    if review_embedding:
+        checks.append((
+            "review_recall", "idx_reviews_summary_embedding",
+            REVIEW_RECALL_SQL, {"embedding": review_embedding, "limit": 30}
+        ))
+    return checks
+
+
+def verify_plans(target: Engine = engine) -> Dict[str, bool]:
+    """EXPLAIN the recall queries and check each is a top-N scan of its index.
+
+    A query passes when the plan reads its expected index and has no Sort
+    node, i.e. the LIMIT stops the index scan early. Plans are logged in full
+    when a check fails. Tiny tables may legitimately be planned as sequential
+    scans.
+    """
+    results = {}
+    with target.connect() as conn:
+        checks = _plan_checks(conn)
+    for name, index, statement, params in checks:
+        plan = explain(str(statement), params, target)
+        results[name] = index in plan and "Sort Key" not in plan
+        if results[name]:
+            logger.info(f"{name}: top-N scan of {index}")
+        else:
+            logger.warning(f"{name}: not a top-N scan of {index}\n{plan}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply database index migrations")
+    parser.add_argument("--list", action="store_true", help="show migration status and exit")
+    parser.add_argument("--verify", action="store_true", help="EXPLAIN the recall queries and check index usage")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    if args.verify:
+        results = verify_plans()
+        for name, ok in results.items():
+            print(f"{name:40s} {'top-N index scan' if ok else 'NOT USING INDEX'}")
+        sys.exit(0 if all(results.values()) else 1)
+    if args.list:
+        done = set(applied_migrations())
+        for migration in MIGRATIONS:
+            status = "applied" if migration.id in done else "pending" if migration.enabled else "disabled"
+            print(f"{migration.id:40s} {status:8s} {migration.description}")
+        return
+    
+    ran = apply_migrations()
+    logger.info(f"Applied {len(ran)} migration(s)")
+
+
+if __name__ == "__main__":
+    main()
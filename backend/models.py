@@ -1,16 +1,48 @@
 """SQLAlchemy ORM models"""
-from sqlalchemy import Column, String, Text, Integer, Float, DateTime, JSON, ForeignKey, BigInteger, Index
+from sqlalchemy import Column, String, Text, Integer, Float, DateTime, JSON, ForeignKey, BigInteger, Index, text
 from sqlalchemy.orm import relationship
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import HALFVEC, Vector
 from datetime import datetime
 from backend.database import Base
 from backend.config import settings
 
+# Expression behind items.search_tsv, added by migration 0002_items_search_tsv
+ITEM_SEARCH_TSV_EXPR = (
+    f"to_tsvector('{settings.fts_config}'::regconfig, "
+    "coalesce(title, '') || ' ' || coalesce(brand, '') || ' ' || coalesce(category_path, ''))"
+)
+
+# Predicates of the category and popular recall queries; the partial indexes
+# below are only usable while the queries use exactly these conditions
+RATED_ITEMS_PREDICATE = "rating_avg IS NOT NULL AND rating_count > 0"
+POPULAR_ITEMS_PREDICATE = "rating_avg >= 4.0 AND rating_count >= 100"
+
+# Storage type of the embedding columns and the matching HNSW operator class
+if settings.vector_storage not in ("vector", "halfvec"):
+    raise ValueError(f"Unsupported vector_storage '{settings.vector_storage}'")
+EmbeddingType = HALFVEC if settings.vector_storage == "halfvec" else Vector
+EMBEDDING_SQL_TYPE = f"{settings.vector_storage}({settings.embed_dim})"
+EMBEDDING_OPS = f"{settings.vector_storage}_cosine_ops"
+
 
 class Item(Base):
     """Product item"""
     __tablename__ = "items"
-    __table_args__ = {"schema": "lmrc"}
+    # The trigram and full-text GIN indexes and the search_tsv column are built by
+    # migrations 0001/0002 after the bulk load; search_tsv is only read by the
+    # recall SQL, so it is not mapped here
+    __table_args__ = (
+        # Top-N index scans for category_search and popular_items
+        Index(
+            "idx_items_category_rating", "category", text("rating_avg DESC"), text("rating_count DESC"),
+            postgresql_where=text(RATED_ITEMS_PREDICATE)
+        ),
+        Index(
+            "idx_items_popular", text("rating_count DESC"), text("rating_avg DESC"),
+            postgresql_where=text(POPULAR_ITEMS_PREDICATE)
+        ),
+        {"schema": "lmrc"}
+    )
     
     asin = Column(String, primary_key=True)
     parent_asin = Column(String, nullable=True)
@@ -32,12 +64,12 @@ class ItemEmbedding(Base):
     """Item embedding vector"""
     __tablename__ = "item_embeddings"
     __table_args__ = (
-        Index("idx_item_embeddings_hnsw", "embedding", postgresql_using="hnsw", postgresql_ops={"embedding": "vector_cosine_ops"}),
+        Index("idx_item_embeddings_hnsw", "embedding", postgresql_using="hnsw", postgresql_ops={"embedding": EMBEDDING_OPS}),
         {"schema": "lmrc"}
     )
     
     asin = Column(String, ForeignKey("lmrc.items.asin", ondelete="CASCADE"), primary_key=True)
-    embedding = Column(Vector(settings.embed_dim), nullable=False)
+    embedding = Column(EmbeddingType(settings.embed_dim), nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
@@ -47,6 +79,8 @@ class ItemEmbedding(Base):
 class ReviewSummary(Base):
     """Product review summary"""
     __tablename__ = "reviews_summary"
+    # The partial ANN index on embedding is built by migration
+    # 0005_reviews_summary_embedding_ann after the bulk load, not by create_all
     __table_args__ = ({
         "schema": "lmrc"
     },)
@@ -55,7 +89,7 @@ class ReviewSummary(Base):
     pros = Column(JSON, default={})
     cons = Column(JSON, default={})
     summary_text = Column(Text, nullable=True)
-    embedding = Column(Vector(settings.embed_dim), nullable=True)
+    embedding = Column(EmbeddingType(settings.embed_dim), nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
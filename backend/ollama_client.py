@@ -1,22 +1,48 @@
 """Ollama API client for LLM and embeddings"""
-import requests
-import json
 import logging
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+import numpy as np
+from backend.cache import embedding_cache
 from backend.config import settings
+from backend.http_transport import AsyncPooledTransport, PooledTransport
 
 logger = logging.getLogger(__name__)
 
 
+def to_embedding(values) -> np.ndarray:
+    """float32 embedding from Ollama's JSON floats (size 0 when there is none)"""
+    return np.asarray(values, dtype=np.float32)
+
+
 class OllamaClient:
     """Client for Ollama API"""
-    
+
     def __init__(self):
         self.base_url = settings.ollama_base_url
         self.llm_model = settings.llm_model
         self.embed_model = settings.embed_model
         self.timeout = settings.ollama_timeout_s
-    
+        self.chat_timeout = settings.ollama_chat_timeout_s or self.timeout
+        self.embed_timeout = settings.ollama_embed_timeout_s or self.timeout
+        # One keep-alive connection pool shared by every call made through this client
+        self.transport = self._make_transport()
+
+    def _make_transport(self):
+        return PooledTransport(
+            self.base_url,
+            pool_size=settings.ollama_pool_size,
+            pool_block=settings.ollama_pool_block,
+            max_retries=settings.ollama_max_retries,
+            backoff_s=settings.ollama_retry_backoff_s,
+            connect_timeout_s=settings.ollama_connect_timeout_s
+        )
+
+    def _with_keep_alive(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Ask Ollama to keep the model resident if configured"""
+        if settings.ollama_keep_alive:
+            payload["keep_alive"] = settings.ollama_keep_alive
+        return payload
+
     def generate_text(self, prompt: str, system_prompt: Optional[str] = None, temperature: float = 0.7) -> str:
         """Generate text using LLM"""
         try:
@@ -24,63 +50,142 @@ class OllamaClient:
             if system_prompt:
                 messages.append({"role": "system", "content": system_prompt})
             messages.append({"role": "user", "content": prompt})
-            
-            url = f"{self.base_url}/api/chat"
-            payload = {
+
+            payload = self._with_keep_alive({
+                "model": self.llm_model,
+                "messages": messages,
+                "temperature": temperature,
+                "stream": False
+            })
+
+            result = self.transport.post_json("/api/chat", payload, timeout=self.chat_timeout)
+            return result.get("message", {}).get("content", "")
+        except Exception as e:
+            logger.error(f"Error generating text: {e}")
+            raise
+
+    def _cached_embedding(self, text: str) -> Optional[np.ndarray]:
+        if not settings.embed_cache_enabled:
+            return None
+        # Cached vectors are read-only float32 arrays shared by every hit, not copies
+        return embedding_cache.get(self.embed_model, text)
+
+    def _cache_embedding(self, text: str, embedding: np.ndarray) -> np.ndarray:
+        if settings.embed_cache_enabled and len(embedding):
+            return embedding_cache.put(self.embed_model, text, embedding)
+        return embedding
+
+    def _parse_embedding(self, text: str, result: Dict[str, Any]) -> np.ndarray:
+        embeddings = result.get("embeddings", [])
+        embedding = to_embedding(embeddings[0] if embeddings else [])
+        # Return the cached array so a miss behaves like every later hit
+        return self._cache_embedding(text, embedding)
+
+    def embed_text(self, text: str) -> np.ndarray:
+        """Get embedding for text"""
+        cached = self._cached_embedding(text)
+        if cached is not None:
+            return cached
+        try:
+            payload = self._with_keep_alive({
+                "model": self.embed_model,
+                "input": text
+            })
+
+            result = self.transport.post_json("/api/embed", payload, timeout=self.embed_timeout)
+            return self._parse_embedding(text, result)
+        except Exception as e:
+            logger.error(f"Error embedding text: {e}")
+            raise
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Get embeddings for multiple texts, one float32 row per text"""
+        try:
+            payload = self._with_keep_alive({
+                "model": self.embed_model,
+                "input": texts
+            })
+
+            result = self.transport.post_json("/api/embed", payload, timeout=self.embed_timeout)
+            return to_embedding(result.get("embeddings", []))
+        except Exception as e:
+            logger.error(f"Error batch embedding: {e}")
+            raise
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection pool statistics"""
+        return self.transport.stats()
+
+
+class AsyncOllamaClient(OllamaClient):
+    """Non-blocking Ollama client for the async request path"""
+
+    def _make_transport(self):
+        return AsyncPooledTransport(
+            self.base_url,
+            pool_size=settings.ollama_pool_size,
+            max_retries=settings.ollama_max_retries,
+            backoff_s=settings.ollama_retry_backoff_s,
+            connect_timeout_s=settings.ollama_connect_timeout_s
+        )
+
+    async def generate_text(self, prompt: str, system_prompt: Optional[str] = None, temperature: float = 0.7) -> str:
+        """Generate text using LLM"""
+        try:
+            messages = []
+            if system_prompt:
+                messages.append({"role": "system", "content": system_prompt})
+            messages.append({"role": "user", "content": prompt})
+
+            payload = self._with_keep_alive({
                 "model": self.llm_model,
                 "messages": messages,
                 "temperature": temperature,
                 "stream": False
-            }
-            
-            response = requests.post(url, json=payload, timeout=self.timeout)
-            response.raise_for_status()
-            
-            result = response.json()
+            })
+
+            result = await self.transport.post_json("/api/chat", payload, timeout=self.chat_timeout)
             return result.get("message", {}).get("content", "")
         except Exception as e:
             logger.error(f"Error generating text: {e}")
             raise
-    
-    def embed_text(self, text: str) -> List[float]:
+
+    async def embed_text(self, text: str) -> np.ndarray:
         """Get embedding for text"""
+        cached = self._cached_embedding(text)
+        if cached is not None:
+            return cached
         try:
-            url = f"{self.base_url}/api/embed"
-            payload = {
+            payload = self._with_keep_alive({
                 "model": self.embed_model,
                 "input": text
-            }
-            
-            response = requests.post(url, json=payload, timeout=self.timeout)
-            response.raise_for_status()
-            
-            result = response.json()
-            embeddings = result.get("embeddings", [])
-            if embeddings:
-                return embeddings[0]
-            return []
+            })
+
+            result = await self.transport.post_json("/api/embed", payload, timeout=self.embed_timeout)
+            return self._parse_embedding(text, result)
         except Exception as e:
             logger.error(f"Error embedding text: {e}")
             raise
-    
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """Get embeddings for multiple texts"""
+
+    async def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Get embeddings for multiple texts, one float32 row per text"""
         try:
-            url = f"{self.base_url}/api/embed"
-            payload = {
+            payload = self._with_keep_alive({
                 "model": self.embed_model,
                 "input": texts
-            }
-            
-            response = requests.post(url, json=payload, timeout=self.timeout)
-            response.raise_for_status()
-            
-            result = response.json()
-            return result.get("embeddings", [])
+            })
+
+            result = await self.transport.post_json("/api/embed", payload, timeout=self.embed_timeout)
+            return to_embedding(result.get("embeddings", []))
         except Exception as e:
             logger.error(f"Error batch embedding: {e}")
             raise
 
+    async def close(self):
+        """Close the connection pool"""
+        await self.transport.close()
+
 
-# Global client instance
+# Global client instances
 ollama_client = OllamaClient()
+async_ollama_client = AsyncOllamaClient()
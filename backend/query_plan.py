@@ -0,0 +1,30 @@
+"""Request-scoped query plan"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Placeholder for "no query embedding" (embedding failed or is disabled)
+NO_EMBEDDING = np.zeros(0, dtype=np.float32)
+NO_EMBEDDING.flags.writeable = False
+
+
+@dataclass
+class QueryPlan:
+    """Query understanding computed once per request and reused by every consumer"""
+    query: str
+    intent: str
+    keywords: List[str] = field(default_factory=list)
+    category: Optional[str] = None
+    embedding: np.ndarray = field(default_factory=lambda: NO_EMBEDDING)
+    # Per-request over-fetch for two-stage vector search (None: configured default)
+    vector_overfetch: Optional[int] = None
+
+    def to_event_payload(self) -> Dict[str, Any]:
+        """Payload for the query event log"""
+        return {
+            "query": self.query,
+            "intent": self.intent,
+            "keywords": self.keywords,
+            "detected_category": self.category
+        }
@@ -0,0 +1,77 @@
+"""Concurrent executor for independent recall paths"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RecallExecutor:
+    """Runs independent recall paths in parallel on a shared thread pool"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or settings.recall_max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Lazily create the worker pool so importing the module stays cheap"""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="recall"
+                    )
+        return self._pool
+
+    def run(self, tasks: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+        """Run tasks and return their results keyed by task name.
+
+        Results are collected in the insertion order of `tasks`, so callers fuse
+        them deterministically no matter which path finished first. A failing path,
+        or one still running when the stage's recall_timeout_s runs out, yields
+        an empty list instead of failing the request.
+        """
+        if not tasks:
+            return {}
+
+        results: Dict[str, Any] = {}
+        if not settings.recall_concurrency or len(tasks) == 1:
+            for name, task in tasks.items():
+                try:
+                    results[name] = task()
+                except Exception as e:
+                    logger.warning(f"Recall path '{name}' failed: {e}")
+                    results[name] = []
+            return results
+
+        pool = self._get_pool()
+        futures = {name: pool.submit(task) for name, task in tasks.items()}
+        # One deadline for the whole stage, not one per path
+        _, pending = wait(futures.values(), timeout=settings.recall_timeout_s)
+        for name, future in futures.items():
+            if future in pending:
+                future.cancel()
+                logger.warning(f"Recall path '{name}' timed out after {settings.recall_timeout_s}s")
+                results[name] = []
+                continue
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.warning(f"Recall path '{name}' failed: {e}")
+                results[name] = []
+        return results
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+
+# Global executor instance
+recall_executor = RecallExecutor()
@@ -1,19 +1,694 @@
 """Recommendation engine with vector similarity search"""
+import asyncio
+import json
 import logging
-from typing import List, Tuple, Dict, Any, Optional
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import numpy as np
-from backend.models import Item, ItemEmbedding
-from backend.ollama_client import ollama_client
+from backend.bm25_index import get_bm25_index
+from backend.cache import llm_result_cache, normalize_text, prompt_version
+from backend.candidate import Candidate, candidates_to_dicts
+from backend.category_registry import category_registry
+from backend.database import AsyncSessionLocal, SessionLocal
+from backend.fusion import PATH_WEIGHTS, CandidatePool
+from backend.metrics import metrics
+from backend.models import EMBEDDING_SQL_TYPE, POPULAR_ITEMS_PREDICATE, RATED_ITEMS_PREDICATE, Item, ItemEmbedding
+from backend.ollama_client import async_ollama_client, ollama_client
+from backend.query_plan import NO_EMBEDDING, QueryPlan
+from backend.recall_executor import recall_executor
+from backend.topn_store import topn_store
+from backend.reduced_index import get_projection
+from backend.vector_index import get_vector_index
 from backend.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Recall SQL is kept as fixed statements so psycopg can prepare them server-side.
+# Query embeddings are float32 arrays bound through pgvector's binary adapter.
+# Recall statements return only (asin, category, score); the few fused winners
+# are hydrated with full item rows afterwards (late materialization).
+# The query vector is cast to the configured storage type (vector or halfvec) so
+# the distance operator matches the column and its HNSW operator class.
+EMBEDDING_PARAM = f"CAST(:embedding AS {EMBEDDING_SQL_TYPE})"
+# Must match the idx_item_embeddings_binary expression for the index to be used
+BINARY_EXPR = f"CAST(binary_quantize(ie.embedding) AS bit({settings.embed_dim}))"
+
+VECTOR_RECALL_SQL = text(f"""
+    SELECT 
+        i.asin,
+        i.category,
+        1 - (ie.embedding <=> {EMBEDDING_PARAM}) as similarity
+    FROM lmrc.items i
+    JOIN lmrc.item_embeddings ie ON i.asin = ie.asin
+    ORDER BY ie.embedding <=> {EMBEDDING_PARAM}
+    LIMIT :limit
+""")
+
+KEYWORD_RECALL_SQL = text("""
+    SELECT 
+        i.asin,
+        i.category
+    FROM lmrc.items i
+    WHERE i.title ILIKE :keyword
+    ORDER BY i.rating_avg DESC NULLS LAST, i.rating_count DESC
+    LIMIT :limit
+""")
+
+# Hydrates the fused winners in one round trip; the review summary is only
+# rendered for candidates recalled by the review path
+ITEMS_BY_ASIN_SQL = text("""
+    SELECT 
+        i.asin,
+        i.title,
+        i.category,
+        i.brand,
+        i.price,
+        i.rating_avg,
+        i.rating_count,
+        i.category_path,
+        i.attributes,
+        rs.pros,
+        rs.cons,
+        rs.summary_text
+    FROM lmrc.items i
+    LEFT JOIN lmrc.reviews_summary rs ON rs.asin = i.asin
+    WHERE i.asin = ANY(:asins)
+""")
+
+# Full-text recall over the stored items.search_tsv document (GIN indexed).
+# Normalization 32 maps ts_rank_cd into [0, 1) so it can be fused with similarities.
+FTS_RECALL_SQL = text("""
+    SELECT 
+        i.asin,
+        i.category,
+        ts_rank_cd(i.search_tsv, q.query, 32) as text_rank
+    FROM lmrc.items i,
+        websearch_to_tsquery(CAST(:fts_config AS regconfig), :query) q(query)
+    WHERE i.search_tsv @@ q.query
+    ORDER BY text_rank DESC, i.rating_count DESC
+    LIMIT :limit
+""")
+
+# Hybrid recall: vector and full-text candidates fused server-side with
+# reciprocal rank fusion, so both sides cost one round trip
+HYBRID_RECALL_SQL = text(f"""
+    WITH vec AS (
+        SELECT c.asin, ROW_NUMBER() OVER (ORDER BY c.distance) as rnk
+        FROM (
+            SELECT ie.asin, ie.embedding <=> {EMBEDDING_PARAM} as distance
+            FROM lmrc.item_embeddings ie
+            ORDER BY ie.embedding <=> {EMBEDDING_PARAM}
+            LIMIT :candidates
+        ) c
+    ),
+    lex AS (
+        SELECT t.asin, ROW_NUMBER() OVER (ORDER BY t.text_rank DESC) as rnk
+        FROM (
+            SELECT i.asin, ts_rank_cd(i.search_tsv, q.query, 32) as text_rank
+            FROM lmrc.items i,
+                websearch_to_tsquery(CAST(:fts_config AS regconfig), :query) q(query)
+            WHERE i.search_tsv @@ q.query
+            ORDER BY text_rank DESC
+            LIMIT :candidates
+        ) t
+    ),
+    fused AS (
+        SELECT u.asin, SUM(1.0 / (:rrf_k + u.rnk)) as rrf_score
+        FROM (SELECT * FROM vec UNION ALL SELECT * FROM lex) u
+        GROUP BY u.asin
+    )
+    SELECT 
+        i.asin,
+        i.category,
+        f.rrf_score
+    FROM fused f
+    JOIN lmrc.items i ON i.asin = f.asin
+    ORDER BY f.rrf_score DESC
+    LIMIT :limit
+""")
+
+# Category and popular recall are top-N scans of the partial indexes
+# idx_items_category_rating and idx_items_popular (migration 0006)
+CATEGORY_RECALL_SQL = text(f"""
+    SELECT 
+        i.asin,
+        i.category,
+        i.rating_avg / 5.0 as similarity
+    FROM lmrc.items i
+    WHERE i.category = :category
+        AND {RATED_ITEMS_PREDICATE}
+    ORDER BY i.rating_avg DESC, i.rating_count DESC
+    LIMIT :limit
+""")
+
+POPULAR_RECALL_SQL = text(f"""
+    SELECT 
+        i.asin,
+        i.category,
+        i.rating_avg / 5.0 as similarity
+    FROM lmrc.items i
+    WHERE {POPULAR_ITEMS_PREDICATE}
+    ORDER BY i.rating_count DESC, i.rating_avg DESC
+    LIMIT :limit
+""")
+
+# Category-filtered vector recall. With pgvector iterative index scans the
+# predicate runs inside the HNSW scan, which keeps going until `limit` rows in
+# the category are found; relaxed ordering is re-sorted by the outer query.
+VECTOR_RECALL_IN_CATEGORY_SQL = text(f"""
+    SELECT * FROM (
+        SELECT 
+            i.asin,
+            i.category,
+            1 - (ie.embedding <=> {EMBEDDING_PARAM}) as similarity
+        FROM lmrc.items i
+        JOIN lmrc.item_embeddings ie ON i.asin = ie.asin
+        WHERE i.category = :category
+        ORDER BY ie.embedding <=> {EMBEDDING_PARAM}
+        LIMIT :limit
+    ) t
+    ORDER BY t.similarity DESC
+""")
+
+# Filter-aware over-fetch for servers without iterative scans: take
+# `candidates` nearest neighbours from the index, then filter in SQL
+VECTOR_RECALL_OVERFETCH_SQL = text(f"""
+    SELECT 
+        i.asin,
+        i.category,
+        1 - c.distance as similarity
+    FROM (
+        SELECT ie.asin, ie.embedding <=> {EMBEDDING_PARAM} as distance
+        FROM lmrc.item_embeddings ie
+        ORDER BY ie.embedding <=> {EMBEDDING_PARAM}
+        LIMIT :candidates
+    ) c
+    JOIN lmrc.items i ON i.asin = c.asin
+    WHERE i.category = :category
+    ORDER BY c.distance
+    LIMIT :limit
+""")
+
+def _two_stage_recall_sql(coarse_order: str) -> Tuple[Any, Any, Any]:
+    """Unfiltered, in-category and over-fetch variants of a two-stage vector recall.
+    
+    The inner query over-fetches :candidates rows by a cheap index order; the
+    outer query reranks them by exact cosine distance in the same statement.
+    """
+    columns = """
+        c.asin,
+        c.category,
+        1 - (c.embedding <=> {embedding}) as similarity""".format(embedding=EMBEDDING_PARAM)
+    coarse = """
+        SELECT i.asin, i.category, ie.embedding
+        FROM lmrc.item_embeddings ie
+        JOIN lmrc.items i ON i.asin = ie.asin
+        {where}
+        ORDER BY {order}
+        LIMIT :candidates"""
+    
+    def build(where: str, outer_where: str):
+        return text(f"""
+            SELECT {columns}
+            FROM ({coarse.format(where=where, order=coarse_order)}) c
+            {outer_where}
+            ORDER BY c.embedding <=> {EMBEDDING_PARAM}
+            LIMIT :limit
+        """)
+    
+    return (
+        build("", ""),
+        build("WHERE i.category = :category", ""),
+        build("", "WHERE c.category = :category"),
+    )
+
+
+# Binary coarse search: Hamming distance over the binary_quantize() HNSW expression index
+BINARY_RECALL_SQL, BINARY_RECALL_IN_CATEGORY_SQL, BINARY_RECALL_OVERFETCH_SQL = _two_stage_recall_sql(
+    f"{BINARY_EXPR} <~> binary_quantize({EMBEDDING_PARAM})"
+)
+
+# Reduced coarse search: cosine distance over the PCA / truncated embedding_reduced
+# column (added by `python -m backend.reduced_index build`)
+REDUCED_RECALL_SQL, REDUCED_RECALL_IN_CATEGORY_SQL, REDUCED_RECALL_OVERFETCH_SQL = _two_stage_recall_sql(
+    f"ie.embedding_reduced <=> CAST(:reduced AS vector({settings.reduced_dim}))"
+)
+
+REVIEW_RECALL_SQL = text(f"""
+    SELECT 
+        rs.asin,
+        i.category,
+        1 - (rs.embedding <=> {EMBEDDING_PARAM}) as similarity
+    FROM lmrc.reviews_summary rs
+    JOIN lmrc.items i ON rs.asin = i.asin
+    WHERE rs.embedding IS NOT NULL
+    ORDER BY rs.embedding <=> {EMBEDDING_PARAM}
+    LIMIT :limit
+""")
+REVIEW_RECALL_IN_CATEGORY_SQL = text(f"""
+    SELECT * FROM (
+        SELECT 
+            rs.asin,
+            i.category,
+            1 - (rs.embedding <=> {EMBEDDING_PARAM}) as similarity
+        FROM lmrc.reviews_summary rs
+        JOIN lmrc.items i ON rs.asin = i.asin
+        WHERE rs.embedding IS NOT NULL
+            AND i.category = :category
+        ORDER BY rs.embedding <=> {EMBEDDING_PARAM}
+        LIMIT :limit
+    ) t
+    ORDER BY t.similarity DESC
+""")
+
+REVIEW_RECALL_OVERFETCH_SQL = text(f"""
+    SELECT 
+        c.asin,
+        i.category,
+        1 - c.distance as similarity
+    FROM (
+        SELECT r.asin, r.embedding <=> {EMBEDDING_PARAM} as distance
+        FROM lmrc.reviews_summary r
+        WHERE r.embedding IS NOT NULL
+        ORDER BY r.embedding <=> {EMBEDDING_PARAM}
+        LIMIT :candidates
+    ) c
+    JOIN lmrc.items i ON i.asin = c.asin
+    WHERE i.category = :category
+    ORDER BY c.distance
+    LIMIT :limit
+""")
+
+# Transaction-local probe count for an IVFFlat review index
+IVFFLAT_PROBES_SQL = text("""
+    SELECT set_config('ivfflat.probes', :probes, true)
+""")
+
+# An HNSW scan returns at most hnsw.ef_search rows, and pgvector caps the
+# setting at 1000, so over-fetching more candidates than that has no effect
+HNSW_MAX_EF_SEARCH = 1000
+EF_SEARCH_SQL = text("""
+    SELECT set_config('hnsw.ef_search', :ef_search, true)
+""")
+
+# Scan settings issued ahead of the single recall statement
+UNIFIED_SCAN_SQL = text("""
+    SELECT
+        set_config('hnsw.ef_search', :ef_search, true),
+        set_config('ivfflat.probes', :probes, true)
+""")
+
+# Iterative index scans need pgvector >= 0.8
+ITERATIVE_SCAN_MIN_VERSION = (0, 8)
+VECTOR_VERSION_SQL = text("""
+    SELECT extversion FROM pg_extension WHERE extname = 'vector'
+""")
+
+# Transaction-local pgvector scan settings for filtered recall
+ITERATIVE_SCAN_SQL = text("""
+    SELECT
+        set_config('hnsw.iterative_scan', 'relaxed_order', true),
+        set_config('hnsw.ef_search', :ef_search, true),
+        set_config('hnsw.max_scan_tuples', :max_scan_tuples, true)
+""")
+
+# Prompts are module constants so the sync and async engines share them
+INTENT_SYSTEM_PROMPT = """你是一个专业的电商推荐系统助手。分析用户的自然语言查询，理解其潜在需求。
+        
+        请以JSON格式返回（必须是有效的JSON）：
+        {
+            "intent": "用户的核心需求描述（1-2句话，中文）",
+            "keywords": ["关键词1", "关键词2", ...]
+        }
+        
+        只返回JSON，不要其他任何内容。"""
+
+CATEGORY_SYSTEM_PROMPT = """你是一个电商产品分类助手。根据用户的查询，识别出用户想要购买的产品类别。
+            
+            可能的类别包括：
+            - Electronics: 电子产品、电脑、手机等
+            - Home_and_Kitchen: 家庭和厨房用品
+            - Books: 书籍
+            - Clothing: 服装鞋帽
+            - Sports: 运动户外
+            - Toys: 玩具游戏
+            - Beauty: 美妆个护
+            - Automotive: 汽车用品
+            - Pet_Supplies: 宠物用品
+            - Software: 软件
+            - Office_Products: 办公用品
+            
+            请只返回一个类别名称，不要其他内容。如果无法确定，返回 'General'。"""
+
+CHAT_SYSTEM_PROMPT = """你是一个专业的电商推荐助手。根据用户的需求，提供友好、有帮助的回复。
+        你会获得推荐的商品列表，可以在回复中描述这些商品。"""
+
+
+# Chinese keywords expanded to English equivalents for matching English titles
+KEYWORD_EXPANSIONS = {
+    "扬声器": ["speaker"],
+    "耳机": ["headphone", "earphone"],
+    "音箱": ["speaker"],
+    "刀": ["knife"],
+    "书": ["book"],
+    "电脑": ["computer", "laptop"],
+    "手机": ["phone", "mobile"],
+    "平板": ["tablet"],
+}
+
+
+def ef_search_setting(candidates: int) -> str:
+    """hnsw.ef_search value that lets an HNSW scan return `candidates` rows"""
+    return str(min(max(candidates, settings.hnsw_ef_search), HNSW_MAX_EF_SEARCH))
+
+
+def _version_tuple(version: str) -> Tuple[int, ...]:
+    return tuple(int(part) for part in re.findall(r"\d+", version))
+
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards so keywords match literally"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _websearch_query(keywords: List[str]) -> str:
+    """OR the keywords together in websearch_to_tsquery syntax (never a syntax error)"""
+    terms = []
+    for keyword in keywords:
+        keyword = keyword.replace('"', " ").strip()
+        if keyword:
+            terms.append(f'"{keyword}"' if " " in keyword else keyword)
+    return " or ".join(terms)
+
+
+def _llm_cache_key(kind: str, system_prompt: str, user_query: str) -> tuple:
+    """Cache key for a structured LLM result.
+    
+    The prompt digest is part of the key, so editing a prompt invalidates every
+    entry produced by the old text.
+    """
+    return (kind, settings.llm_model, prompt_version(system_prompt), normalize_text(user_query))
+
+
+def _expand_keywords(keywords: List[str]) -> List[str]:
+    """Add English equivalents of Chinese keywords for matching English titles; drop duplicates"""
+    expanded_keywords = list(keywords)
+    for keyword in keywords:
+        if keyword in KEYWORD_EXPANSIONS:
+            expanded_keywords.extend(KEYWORD_EXPANSIONS[keyword])
+    # Drop duplicates, keep order
+    return list(dict.fromkeys(expanded_keywords))
+
+
+# An ILIKE pattern is only served by the trigram index if the keyword holds a
+# whole trigram; a shorter keyword anywhere in the OR makes it a full index scan
+TRIGRAM_MIN_LENGTH = 3
+
+
+def _trigram_keywords(keywords: List[str]) -> Tuple[List[str], int]:
+    """Keywords with the indexable ones first, and how many of them the ILIKE filter uses.
+    
+    Shorter keywords (e.g. two-character Chinese terms) only contribute to the
+    word_similarity ranking, unless no keyword is long enough to match on.
+    """
+    indexable = [keyword for keyword in keywords if len(keyword) >= TRIGRAM_MIN_LENGTH]
+    if not indexable:
+        return list(keywords), len(keywords)
+    short = [keyword for keyword in keywords if len(keyword) < TRIGRAM_MIN_LENGTH]
+    return indexable + short, len(indexable)
+
+
+def _trigram_terms(n_keywords: int, n_matched: int) -> Tuple[List[str], List[str]]:
+    """ILIKE match terms for the first n_matched keywords and word_similarity
+    terms for all of them, over the :kwN / :patternN parameters"""
+    match_terms = [f"i.title ILIKE :pattern{idx}" for idx in range(n_matched)]
+    similarity_terms = [f"word_similarity(:kw{idx}, i.title)" for idx in range(n_keywords)]
+    return match_terms, similarity_terms
+
+
+def _trigram_params(keywords: List[str]) -> Dict[str, Any]:
+    """Parameters for the _trigram_terms of `keywords`"""
+    params: Dict[str, Any] = {"sim_weight": settings.keyword_similarity_weight}
+    for idx, keyword in enumerate(keywords):
+        params[f"kw{idx}"] = keyword
+        params[f"pattern{idx}"] = f"%{_escape_like(keyword)}%"
+    return params
+
+
+_EMPTY_PATH = """
+        SELECT CAST(NULL AS text) as asin, CAST(NULL AS text) as category,
+            CAST(NULL AS float8) as similarity, CAST(0 AS bigint) as rnk, CAST(0 AS bigint) as n
+        WHERE false"""
+
+
+def _ranked_path(inner: str, order: str, where: str = "") -> str:
+    """Number a path's rows (0-based rank, path size) after its post-filter"""
+    return f"""
+        SELECT p.asin, p.category, p.similarity,
+            ROW_NUMBER() OVER (ORDER BY {order}) - 1 as rnk,
+            COUNT(*) OVER () as n
+        FROM ({inner}
+        ) p
+        {where}"""
+
+
+def _path_rows(cte: str, path: str, order: int, weights: Tuple[str, str, str]) -> str:
+    sim_w, rank_w, boost = weights
+    return (
+        f"SELECT asin, '{path}' as recall_path, {order} as path_order, similarity, rnk, n, "
+        f"CAST({sim_w} AS float8) as sim_w, CAST({rank_w} AS float8) as rank_w, "
+        f"CAST({boost} AS float8) as boost FROM {cte}"
+    )
+
+
+_UNIFIED_STATEMENTS: Dict[Tuple[Any, ...], Any] = {}
+
+
+def _unified_recall_sql(has_embedding: bool, n_keywords: int, in_category: bool, n_matched: int = 0):
+    """One statement running every recall path, fusing them and hydrating the top-N.
+
+    Mirrors _multi_path_stages: CTEs for vector, keyword (trigram or FTS),
+    category top-N (category of the top vector hit, else of the top keyword
+    hits), review-vector, category fallback and popular recall; the fallback
+    paths only contribute while fewer than :min_candidates items were recalled.
+    Items are deduplicated by ASIN and scored with PATH_WEIGHTS by the
+    configured fusion method. Statements are cached per shape so psycopg can
+    prepare them.
+    """
+    fts = settings.keyword_backend == "fts"
+    key = (has_embedding, n_keywords, n_matched, in_category, fts, settings.fusion_method)
+    statement = _UNIFIED_STATEMENTS.get(key)
+    if statement is not None:
+        return statement
+
+    in_category_filter = "WHERE p.category = :category" if in_category else ""
+
+    if not has_embedding:
+        vec = rev = _EMPTY_PATH
+    elif in_category:
+        # Over-fetch and filter; single_statement_recall widens hnsw.ef_search to match
+        vec = _ranked_path(f"""
+            SELECT c.asin, i.category, 1 - c.distance as similarity
+            FROM (
+                SELECT ie.asin, ie.embedding <=> {EMBEDDING_PARAM} as distance
+                FROM lmrc.item_embeddings ie
+                ORDER BY ie.embedding <=> {EMBEDDING_PARAM}
+                LIMIT :vector_candidates
+            ) c
+            JOIN lmrc.items i ON i.asin = c.asin
+            WHERE i.category = :category
+            ORDER BY c.distance
+            LIMIT :vector_limit""", "p.similarity DESC")
+        rev = _ranked_path(f"""
+            SELECT c.asin, i.category, 1 - c.distance as similarity
+            FROM (
+                SELECT r.asin, r.embedding <=> {EMBEDDING_PARAM} as distance
+                FROM lmrc.reviews_summary r
+                WHERE r.embedding IS NOT NULL
+                ORDER BY r.embedding <=> {EMBEDDING_PARAM}
+                LIMIT :review_candidates
+            ) c
+            JOIN lmrc.items i ON i.asin = c.asin
+            WHERE i.category = :category
+            ORDER BY c.distance
+            LIMIT :review_limit""", "p.similarity DESC")
+    else:
+        vec = _ranked_path(f"""
+            SELECT i.asin, i.category, 1 - (ie.embedding <=> {EMBEDDING_PARAM}) as similarity
+            FROM lmrc.item_embeddings ie
+            JOIN lmrc.items i ON i.asin = ie.asin
+            ORDER BY ie.embedding <=> {EMBEDDING_PARAM}
+            LIMIT :vector_limit""", "p.similarity DESC")
+        rev = _ranked_path(f"""
+            SELECT rs.asin, i.category, 1 - (rs.embedding <=> {EMBEDDING_PARAM}) as similarity
+            FROM lmrc.reviews_summary rs
+            JOIN lmrc.items i ON rs.asin = i.asin
+            WHERE rs.embedding IS NOT NULL
+            ORDER BY rs.embedding <=> {EMBEDDING_PARAM}
+            LIMIT :review_limit""", "p.similarity DESC")
+
+    if not n_keywords:
+        kw = _EMPTY_PATH
+    elif fts:
+        kw = _ranked_path("""
+            SELECT i.asin, i.category, i.rating_count, ts_rank_cd(i.search_tsv, q.query, 32) as similarity
+            FROM lmrc.items i,
+                websearch_to_tsquery(CAST(:fts_config AS regconfig), :query) q(query)
+            WHERE i.search_tsv @@ q.query
+            ORDER BY similarity DESC, i.rating_count DESC
+            LIMIT :keyword_limit""", "p.similarity DESC, p.rating_count DESC", in_category_filter)
+    else:
+        match_terms, similarity_terms = _trigram_terms(n_keywords, n_matched)
+        kw = _ranked_path(f"""
+            SELECT i.asin, i.category, i.rating_count,
+                GREATEST({", ".join(similarity_terms)}) * :sim_weight
+                    + COALESCE(i.rating_avg, 0) / 5.0 * (1 - :sim_weight) as similarity
+            FROM lmrc.items i
+            WHERE {" OR ".join(match_terms)}
+            ORDER BY similarity DESC, i.rating_count DESC
+            LIMIT :keyword_limit""", "p.similarity DESC, p.rating_count DESC", in_category_filter)
+
+    def top_rated(where: str, order: str, limit: str) -> str:
+        return f"""
+            SELECT i.asin, i.category, i.rating_avg, i.rating_count, i.rating_avg / 5.0 as similarity
+            FROM lmrc.items i
+            WHERE {where}
+            ORDER BY {order}
+            LIMIT {limit}"""
+
+    cat = _ranked_path(
+        top_rated(f"i.category = (SELECT category FROM pick) AND {RATED_ITEMS_PREDICATE}",
+                  "i.rating_avg DESC, i.rating_count DESC", ":category_limit"),
+        "p.rating_avg DESC, p.rating_count DESC", in_category_filter
+    )
+    fallback = _ranked_path(
+        top_rated(f"i.category = :category AND {RATED_ITEMS_PREDICATE}",
+                  "i.rating_avg DESC, i.rating_count DESC", ":fallback_limit"),
+        "p.rating_avg DESC, p.rating_count DESC",
+        "WHERE (SELECT COUNT(DISTINCT asin) FROM stage_a) < :min_candidates"
+    ) if in_category else _EMPTY_PATH
+    popular_filter = "WHERE (SELECT COUNT(DISTINCT asin) FROM stage_b) < :min_candidates"
+    if in_category:
+        popular_filter += " AND p.category = :category"
+    popular = _ranked_path(
+        top_rated(POPULAR_ITEMS_PREDICATE, "i.rating_count DESC, i.rating_avg DESC", ":popular_limit"),
+        "p.rating_count DESC, p.rating_avg DESC", popular_filter
+    )
+
+    weights = {path: tuple(str(w) for w in path_weights) for path, path_weights in PATH_WEIGHTS.items()}
+    # The category path is weighted higher when it was picked from keyword hits
+    category_weights = tuple(
+        vector_w if vector_w == keyword_w
+        else f"CASE WHEN (SELECT from_vector FROM pick) THEN {vector_w} ELSE {keyword_w} END"
+        for vector_w, keyword_w in zip(weights["category"], weights["keyword_category"])
+    )
+    if settings.fusion_method == "rrf":
+        score = "SUM((sim_w + rank_w) / (:rrf_k + rnk + 1))"
+    else:
+        score = (
+            "CASE WHEN SUM(CASE WHEN is_first THEN 0 ELSE boost END) > 0 "
+            "THEN LEAST(1.0, SUM(CASE WHEN is_first THEN base ELSE 0 END) + SUM(CASE WHEN is_first THEN 0 ELSE boost END)) "
+            "ELSE SUM(CASE WHEN is_first THEN base ELSE 0 END) END"
+        )
+
+    statement = text(f"""
+        WITH vec AS ({vec}
+        ),
+        kw AS ({kw}
+        ),
+        pick AS (
+            SELECT
+                EXISTS (SELECT 1 FROM vec) as from_vector,
+                CASE WHEN EXISTS (SELECT 1 FROM vec)
+                    THEN (SELECT category FROM vec WHERE rnk = 0)
+                    ELSE (
+                        SELECT category FROM kw
+                        WHERE rnk < 5 AND category IS NOT NULL
+                        GROUP BY category
+                        ORDER BY COUNT(*) DESC, MIN(rnk)
+                        LIMIT 1
+                    )
+                END as category
+        ),
+        cat AS ({cat}
+        ),
+        rev AS ({rev}
+        ),
+        stage_a AS (
+            {_path_rows("vec", "vector", 0, weights["vector"])}
+            UNION ALL {_path_rows("kw", "keyword", 1, weights["keyword"])}
+            UNION ALL {_path_rows("cat", "category", 2, category_weights)}
+            UNION ALL {_path_rows("rev", "review_embedding", 3, weights["review_embedding"])}
+        ),
+        fallback AS ({fallback}
+        ),
+        stage_b AS (
+            SELECT * FROM stage_a
+            UNION ALL {_path_rows("fallback", "category", 4, weights["category_fallback"])}
+        ),
+        popular AS ({popular}
+        ),
+        scored AS (
+            SELECT
+                s.*,
+                ROW_NUMBER() OVER (PARTITION BY s.asin ORDER BY s.path_order, s.rnk) = 1 as is_first,
+                COALESCE(s.similarity, 0) * s.sim_w + (1 - CAST(s.rnk AS float8) / s.n) * s.rank_w as base
+            FROM (
+                SELECT * FROM stage_b
+                UNION ALL {_path_rows("popular", "popular", 5, weights["popular"])}
+            ) s
+        ),
+        fused AS (
+            SELECT
+                asin,
+                {score} as score,
+                MIN(path_order * 1000000 + rnk) as first_seen,
+                (ARRAY_AGG(recall_path ORDER BY path_order, rnk))[1] as recall_path,
+                (ARRAY_AGG(similarity ORDER BY path_order, rnk))[1] as similarity
+            FROM scored
+            GROUP BY asin
+            ORDER BY score DESC, first_seen
+            LIMIT :limit
+        )
+        SELECT
+            i.asin,
+            i.title,
+            i.category,
+            i.brand,
+            i.price,
+            i.rating_avg,
+            i.rating_count,
+            i.category_path,
+            i.attributes,
+            rs.pros,
+            rs.cons,
+            rs.summary_text,
+            f.recall_path,
+            f.similarity,
+            f.score
+        FROM fused f
+        JOIN lmrc.items i ON i.asin = f.asin
+        LEFT JOIN lmrc.reviews_summary rs ON rs.asin = f.asin
+        ORDER BY f.score DESC, f.first_seen
+    """)
+    _UNIFIED_STATEMENTS[key] = statement
+    return statement
+
 
 class RecommendationEngine:
     """Main recommendation engine"""
     
+    # Whether the server's pgvector supports iterative scans; read once per process
+    _iterative_scan_supported: Optional[bool] = None
+    
+    # Candidates requested from the secondary recall paths
+    KEYWORD_RECALL_LIMIT = 50
+    REVIEW_RECALL_LIMIT = 30
+    CATEGORY_RECALL_LIMIT = 15
+    
     def __init__(self, db: Session):
         self.db = db
         self.topk = settings.retrieve_topk
@@ -24,303 +699,345 @@ class RecommendationEngine:
         except Exception:
             logger.setLevel(logging.WARNING)
     
-    def search_similar_items(self, query_embedding: List[float], limit: int = None) -> List[Dict[str, Any]]:
-        """Search for similar items using vector similarity"""
+    def _vector_recall_query(self, unfiltered_sql, in_category_sql, overfetch_sql, params: Dict[str, Any], category: Optional[str]):
+        """Run a vector recall statement, pushing the category predicate into SQL.
+        
+        Two-stage statements pass `candidates`, the row count of their coarse
+        index scan; over-fetch adds it for the others.
+        """
+        params = dict(params)
+        iterative = False
+        if category:
+            params["category"] = category
+            iterative = self._enable_iterative_scan()
+            if not iterative:
+                params["candidates"] = params.get("candidates", params["limit"]) * settings.vector_filter_overfetch
+        if "candidates" in params:
+            params["candidates"] = max(params["limit"], min(params["candidates"], HNSW_MAX_EF_SEARCH))
+            # Widen the HNSW scan so it can return every candidate
+            self._set_ef_search(params["candidates"])
+        
+        if not category:
+            return self.db.execute(unfiltered_sql, params)
+        return self.db.execute(in_category_sql if iterative else overfetch_sql, params)
+    
+    def _set_ef_search(self, candidates: int):
+        """Let this transaction's HNSW scans return up to `candidates` rows"""
+        self.db.execute(EF_SEARCH_SQL, {"ef_search": ef_search_setting(candidates)})
+    
+    def _memory_vector_recall(self, kind: str, query_embedding: np.ndarray, limit: int, category: Optional[str], recall_path: str) -> List[Candidate]:
+        """Score the in-process vector index; categories come from the index, so no query runs"""
+        index = get_vector_index(kind)
+        return [
+            Candidate(asin, category or index.category_of(asin), similarity, recall_path)
+            for asin, similarity in index.search(query_embedding, limit, category)
+        ]
+    
+    def _iterative_scan_available(self) -> bool:
+        """Whether the installed pgvector supports iterative index scans.
+        
+        Checked from the extension version rather than by trying the setting:
+        before the library is loaded, older servers accept hnsw.iterative_scan
+        as a placeholder without error.
+        """
+        if RecommendationEngine._iterative_scan_supported is None:
+            version = self.db.execute(VECTOR_VERSION_SQL).scalar()
+            supported = version is not None and _version_tuple(version) >= ITERATIVE_SCAN_MIN_VERSION
+            if not supported:
+                logger.warning(f"pgvector {version} has no iterative index scans, using over-fetch")
+            RecommendationEngine._iterative_scan_supported = supported
+        return RecommendationEngine._iterative_scan_supported
+    
+    def _enable_iterative_scan(self) -> bool:
+        """Turn on pgvector iterative index scans for this transaction if available"""
+        if settings.vector_filter_mode != "iterative":
+            return False
+        try:
+            if not self._iterative_scan_available():
+                return False
+            self.db.execute(ITERATIVE_SCAN_SQL, {
+                "ef_search": str(settings.hnsw_ef_search),
+                "max_scan_tuples": str(settings.hnsw_max_scan_tuples)
+            })
+            return True
+        except Exception as e:
+            # Not remembered: the error may be transient, the next request checks again
+            logger.warning(f"Could not enable iterative index scans, using over-fetch: {e}")
+            self.db.rollback()
+            return False
+    
+    def search_similar_items(self, query_embedding: np.ndarray, limit: int = None, category: Optional[str] = None, overfetch: Optional[int] = None) -> List[Candidate]:
+        """Search for similar items using vector similarity, optionally within one category.
+        
+        `overfetch` overrides the configured over-fetch of the two-stage
+        (binary / reduced) search modes.
+        """
         if limit is None:
             limit = self.topk
         
         try:
-            # Use pgvector similarity search
-            query = text(f"""
-                SELECT 
-                    i.asin,
-                    i.title,
-                    i.category,
-                    i.brand,
-                    i.price,
-                    i.rating_avg,
-                    i.rating_count,
-                    i.category_path,
-                    i.attributes,
-                    1 - (ie.embedding <=> :embedding) as similarity
-                FROM lmrc.items i
-                JOIN lmrc.item_embeddings ie ON i.asin = ie.asin
-                ORDER BY ie.embedding <=> :embedding
-                LIMIT :limit
-            """)
-            
-            # Execute with embedding as string (pgvector format)
-            embedding_str = "[" + ",".join(str(x) for x in query_embedding) + "]"
-            result = self.db.execute(
-                query,
-                {"embedding": embedding_str, "limit": limit}
-            )
-            
-            items = []
-            for row in result:
-                items.append({
-                    "asin": row.asin,
-                    "title": row.title,
-                    "category": row.category,
-                    "brand": row.brand,
-                    "price": float(row.price) if row.price else None,
-                    "rating_avg": float(row.rating_avg),
-                    "rating_count": row.rating_count,
-                    "category_path": row.category_path if row.category_path else [],
-                    "attributes": row.attributes if row.attributes else {},
-                    "similarity": float(row.similarity),
-                    "recall_path": "vector"
-                })
+            if settings.vector_backend == "memory":
+                return self._memory_vector_recall("items", query_embedding, limit, category, "vector")
+            
+            if settings.vector_search_mode == "binary":
+                result = self._vector_recall_query(
+                    BINARY_RECALL_SQL,
+                    BINARY_RECALL_IN_CATEGORY_SQL,
+                    BINARY_RECALL_OVERFETCH_SQL,
+                    {
+                        "embedding": query_embedding,
+                        "limit": limit,
+                        "candidates": limit * (overfetch or settings.binary_overfetch)
+                    },
+                    category
+                )
+            elif settings.vector_search_mode == "reduced":
+                reduced = get_projection().project(query_embedding)
+                result = self._vector_recall_query(
+                    REDUCED_RECALL_SQL,
+                    REDUCED_RECALL_IN_CATEGORY_SQL,
+                    REDUCED_RECALL_OVERFETCH_SQL,
+                    {
+                        "embedding": query_embedding,
+                        "reduced": reduced,
+                        "limit": limit,
+                        "candidates": limit * (overfetch or settings.reduced_overfetch)
+                    },
+                    category
+                )
+            else:
+                # Use pgvector similarity search
+                result = self._vector_recall_query(
+                    VECTOR_RECALL_SQL,
+                    VECTOR_RECALL_IN_CATEGORY_SQL,
+                    VECTOR_RECALL_OVERFETCH_SQL,
+                    {"embedding": query_embedding, "limit": limit},
+                    category
+                )
             
-            return items
+            return [Candidate.from_row(row, float(row.similarity), "vector") for row in result]
         except Exception as e:
             logger.error(f"Error searching similar items: {e}")
             raise
     
-    def keyword_search(self, keywords: List[str], limit: int = 50) -> List[Dict[str, Any]]:
+    def keyword_search(self, keywords: List[str], limit: int = 50) -> List[Candidate]:
         """Search items by keywords using text matching - highly tolerant to find any match"""
         try:
-            from sqlalchemy import text, or_
-            
             if not keywords:
                 return []
             
             logger.info(f"Keyword search with keywords: {keywords}")
             
-            # Expand Chinese keywords to English equivalents for better matching
-            chinese_to_english = {
-                "扬声器": ["speaker"],
-                "耳机": ["headphone", "earphone"],
-                "音箱": ["speaker"],
-                "刀": ["knife"],
-                "书": ["book"],
-                "电脑": ["computer", "laptop"],
-                "手机": ["phone", "mobile"],
-                "平板": ["tablet"],
-            }
-            
-            expanded_keywords = list(keywords)
-            for keyword in keywords:
-                if keyword in chinese_to_english:
-                    expanded_keywords.extend(chinese_to_english[keyword])
+            expanded_keywords = _expand_keywords(keywords)
             
             logger.info(f"Expanded keywords: {expanded_keywords}")
             
-            items = []
-            seen_asins = set()
-            
-            # Try multiple matching strategies for robustness
-            # Strategy 1: Match any keyword in title
-            for keyword in expanded_keywords:
-                if len(items) >= limit:
-                    break
-                    
-                query = text("""
-                    SELECT 
-                        i.asin,
-                        i.title,
-                        i.category,
-                        i.brand,
-                        i.price,
-                        i.rating_avg,
-                        i.rating_count,
-                        i.category_path,
-                        i.attributes
-                    FROM lmrc.items i
-                    WHERE i.title ILIKE :keyword
-                    ORDER BY i.rating_avg DESC NULLS LAST, i.rating_count DESC
-                    LIMIT :limit
-                """)
-                
-                keyword_param = f'%{keyword}%'
-                result = self.db.execute(
-                    query,
-                    {"keyword": keyword_param, "limit": limit}
-                )
-                
-                for row in result:
-                    if row.asin not in seen_asins:
-                        items.append({
-                            "asin": row.asin,
-                            "title": row.title,
-                            "category": row.category,
-                            "brand": row.brand,
-                            "price": float(row.price) if row.price else None,
-                            "rating_avg": float(row.rating_avg) if row.rating_avg else None,
-                            "rating_count": row.rating_count,
-                            "category_path": row.category_path if row.category_path else [],
-                            "attributes": row.attributes if row.attributes else {},
-                            "similarity": 0.8,  # Default high score for keyword matches
-                            "recall_path": "keyword"
-                        })
-                        seen_asins.add(row.asin)
-            
-            logger.info(f"Keyword search returned {len(items)} results")
+            backend = settings.keyword_backend
+            with metrics.timer(f"keyword_recall.{backend}"):
+                if backend == "ilike":
+                    items = self._keyword_search_ilike(expanded_keywords, limit)
+                elif backend == "fts":
+                    items = self._keyword_search_fts(expanded_keywords, limit)
+                elif backend == "bm25":
+                    items = self._keyword_search_bm25(expanded_keywords, limit)
+                else:
+                    items = self._keyword_search_trigram(expanded_keywords, limit)
+            
+            logger.info(f"Keyword search ({backend}) returned {len(items)} results")
             return items
         except Exception as e:
             logger.error(f"Error in keyword search: {e}")
-            import traceback
-            traceback.print_exc()
             return []
     
-    def category_search(self, category: str, limit: int = 20) -> List[Dict[str, Any]]:
-        """Search items by category"""
-        try:
-            from sqlalchemy import text
-            
-            if not category:
-                return []
-            
-            # Search by category with rating-based ranking
-            query = text("""
+    def _keyword_search_trigram(self, keywords: List[str], limit: int) -> List[Candidate]:
+        """Match all keywords in one statement served by the title trigram index"""
+        keywords, n_matched = _trigram_keywords(keywords[:settings.keyword_max_terms])
+        params = dict(_trigram_params(keywords), limit=limit)
+        match_terms, similarity_terms = _trigram_terms(len(keywords), n_matched)
+        
+        # Each ILIKE is a bitmap scan on idx_items_title_trgm; the OR combines them
+        query = text(f"""
+            SELECT * FROM (
                 SELECT 
                     i.asin,
-                    i.title,
                     i.category,
-                    i.brand,
-                    i.price,
-                    i.rating_avg,
                     i.rating_count,
-                    i.category_path,
-                    i.attributes
+                    GREATEST({", ".join(similarity_terms)}) * :sim_weight
+                        + COALESCE(i.rating_avg, 0) / 5.0 * (1 - :sim_weight) as match_score
                 FROM lmrc.items i
-                WHERE i.category = :category
-                    AND i.rating_avg IS NOT NULL
-                    AND i.rating_count > 0
-                ORDER BY i.rating_avg DESC, i.rating_count DESC
-                LIMIT :limit
-            """)
+                WHERE {" OR ".join(match_terms)}
+            ) m
+            ORDER BY m.match_score DESC, m.rating_count DESC
+            LIMIT :limit
+        """)
+        
+        result = self.db.execute(query, params)
+        return [Candidate.from_row(row, float(row.match_score), "keyword") for row in result]
+    
+    def _keyword_search_fts(self, keywords: List[str], limit: int) -> List[Candidate]:
+        """Rank the full-text index for any of the keywords"""
+        result = self.db.execute(
+            FTS_RECALL_SQL,
+            {"fts_config": settings.fts_config, "query": _websearch_query(keywords), "limit": limit}
+        )
+        return [Candidate.from_row(row, float(row.text_rank), "keyword") for row in result]
+    
+    def _keyword_search_bm25(self, keywords: List[str], limit: int) -> List[Candidate]:
+        """Score the in-process BM25 index; its hits carry their category, so no query runs"""
+        hits = get_bm25_index().search(keywords, limit)
+        if not hits:
+            return []
+        
+        # BM25 scores are unbounded; scale by the best hit so they fuse like similarities
+        top_score = hits[0][1] or 1.0
+        return [Candidate(asin, category, score / top_score, "keyword") for asin, score, category in hits]
+    
+    def hybrid_search(self, query_embedding: np.ndarray, keywords: List[str], limit: int = None) -> List[Candidate]:
+        """Vector + full-text recall fused with reciprocal rank fusion in one statement"""
+        if limit is None:
+            limit = self.topk
+        
+        try:
+            # The vector side is an HNSW scan: let it return all `candidates` rows
+            candidates = min(limit, HNSW_MAX_EF_SEARCH)
+            self._set_ef_search(candidates)
+            result = self.db.execute(HYBRID_RECALL_SQL, {
+                "embedding": query_embedding,
+                "fts_config": settings.fts_config,
+                "query": _websearch_query(keywords),
+                "candidates": candidates,
+                "rrf_k": settings.rrf_k,
+                "limit": limit
+            })
+            
+            return [Candidate.from_row(row, float(row.rrf_score), "hybrid") for row in result]
+        except Exception as e:
+            logger.error(f"Error in hybrid search: {e}")
+            self.db.rollback()
+            return []
+    
+    def _keyword_search_ilike(self, keywords: List[str], limit: int) -> List[Candidate]:
+        """Legacy backend: one ILIKE query per keyword, ordered by rating"""
+        items = []
+        seen_asins = set()
+        
+        for keyword in keywords:
+            if len(items) >= limit:
+                break
             
+            keyword_param = f'%{keyword}%'
             result = self.db.execute(
-                query,
-                {"category": category, "limit": limit}
+                KEYWORD_RECALL_SQL,
+                {"keyword": keyword_param, "limit": limit}
             )
             
-            items = []
             for row in result:
-                items.append({
-                    "asin": row.asin,
-                    "title": row.title,
-                    "category": row.category,
-                    "brand": row.brand,
-                    "price": float(row.price) if row.price else None,
-                    "rating_avg": float(row.rating_avg) if row.rating_avg else None,
-                    "rating_count": row.rating_count,
-                    "category_path": row.category_path if row.category_path else [],
-                    "attributes": row.attributes if row.attributes else {},
-                    "similarity": row.rating_avg / 5.0 if row.rating_avg else 0.0,
-                    "recall_path": "category"
-                })
+                if row.asin not in seen_asins:
+                    # Default high score for keyword matches
+                    items.append(Candidate.from_row(row, 0.8, "keyword"))
+                    seen_asins.add(row.asin)
+        
+        return items
+    
+    def category_search(self, category: str, limit: int = 20) -> List[Candidate]:
+        """Search items by category"""
+        try:
+            from sqlalchemy import text
             
-            return items
+            # Unknown categories cannot match any item
+            if not category or (category_registry.ready and not category_registry.exists(category)):
+                return []
+            
+            # Served from the precomputed lists when they cover the request
+            rows = topn_store.category(category, limit) if settings.topn_store_enabled else None
+            if rows is not None:
+                return self._stored_candidates(rows, "category")
+            
+            # Search by category with rating-based ranking
+            result = self.db.execute(
+                CATEGORY_RECALL_SQL,
+                {"category": category, "limit": limit}
+            )
+            return [Candidate.from_row(row, float(row.similarity), "category") for row in result]
         except Exception as e:
             logger.error(f"Error in category search: {e}")
             return []
     
-    def popular_items(self, limit: int = 20) -> List[Dict[str, Any]]:
+    def popular_items(self, limit: int = 20) -> List[Candidate]:
         """Get popular items as fallback"""
         try:
             from sqlalchemy import text
             
-            # Get popular items with high ratings and review counts
-            query = text("""
-                SELECT 
-                    i.asin,
-                    i.title,
-                    i.category,
-                    i.brand,
-                    i.price,
-                    i.rating_avg,
-                    i.rating_count,
-                    i.category_path,
-                    i.attributes
-                FROM lmrc.items i
-                WHERE i.rating_avg >= 4.0
-                    AND i.rating_count >= 100
-                ORDER BY i.rating_count DESC, i.rating_avg DESC
-                LIMIT :limit
-            """)
+            rows = topn_store.popular(limit) if settings.topn_store_enabled else None
+            if rows is not None:
+                return self._stored_candidates(rows, "popular")
             
+            # Get popular items with high ratings and review counts
             result = self.db.execute(
-                query,
+                POPULAR_RECALL_SQL,
                 {"limit": limit}
             )
-            
-            items = []
-            for row in result:
-                items.append({
-                    "asin": row.asin,
-                    "title": row.title,
-                    "category": row.category,
-                    "brand": row.brand,
-                    "price": float(row.price) if row.price else None,
-                    "rating_avg": float(row.rating_avg) if row.rating_avg else None,
-                    "rating_count": row.rating_count,
-                    "category_path": row.category_path if row.category_path else [],
-                    "attributes": row.attributes if row.attributes else {},
-                    "similarity": row.rating_avg / 5.0 if row.rating_avg else 0.0,
-                    "recall_path": "popular"
-                })
-            
-            return items
+            return [Candidate.from_row(row, float(row.similarity), "popular") for row in result]
         except Exception as e:
             logger.error(f"Error getting popular items: {e}")
             return []
     
-    def search_by_review_embedding(self, query_embedding: List[float], limit: int = 30) -> List[Dict[str, Any]]:
-        """Search items by similar review embeddings"""
+    def _stored_candidates(self, rows: List[Any], recall_path: str) -> List[Candidate]:
+        """Candidates for top-N store rows, which are full item rows and need no hydration"""
+        return [
+            Candidate(row.asin, row.category, row.rating_avg / 5.0 if row.rating_avg else 0.0, recall_path, row)
+            for row in rows
+        ]
+    
+    def hydrate_candidates(self, candidates: List[Candidate]) -> List[Candidate]:
+        """Attach full item rows to candidates in one batched lookup.
+        
+        Rows already held by the top-N store are reused; the rest come from a
+        single ITEMS_BY_ASIN_SQL query. Candidates whose item no longer exists
+        are dropped.
+        """
+        try:
+            missing = [candidate for candidate in candidates if candidate.row is None]
+            if missing and settings.topn_store_enabled:
+                # Store rows carry no review summary, which the review path renders
+                cached = topn_store.rows_by_asin([
+                    candidate.asin for candidate in missing if candidate.recall_path != "review_embedding"
+                ])
+                for candidate in missing:
+                    candidate.row = cached.get(candidate.asin)
+                missing = [candidate for candidate in missing if candidate.row is None]
+            if missing:
+                result = self.db.execute(ITEMS_BY_ASIN_SQL, {"asins": [candidate.asin for candidate in missing]})
+                rows = {row.asin: row for row in result}
+                for candidate in missing:
+                    candidate.row = rows.get(candidate.asin)
+            return [candidate for candidate in candidates if candidate.row is not None]
+        except Exception as e:
+            logger.error(f"Error hydrating candidates: {e}")
+            raise
+    
+    def search_by_review_embedding(self, query_embedding: np.ndarray, limit: int = 30, category: Optional[str] = None) -> List[Candidate]:
+        """Search items by similar review embeddings, optionally within one category"""
         try:
             from sqlalchemy import text
             
-            if not query_embedding:
+            if not len(query_embedding):
                 return []
             
-            # Use pgvector similarity search on review embeddings
-            query = text(f"""
-                SELECT 
-                    rs.asin,
-                    i.title,
-                    i.category,
-                    i.brand,
-                    i.price,
-                    i.rating_avg,
-                    i.rating_count,
-                    rs.pros,
-                    rs.cons,
-                    rs.summary_text,
-                    1 - (rs.embedding <=> :embedding) as similarity
-                FROM lmrc.reviews_summary rs
-                JOIN lmrc.items i ON rs.asin = i.asin
-                WHERE rs.embedding IS NOT NULL
-                ORDER BY rs.embedding <=> :embedding
-                LIMIT :limit
-            """)
-            
-            # Execute with embedding as string
-            embedding_str = "[" + ",".join(str(x) for x in query_embedding) + "]"
-            result = self.db.execute(
-                query,
-                {"embedding": embedding_str, "limit": limit}
-            )
-            
-            items = []
-            for row in result:
-                items.append({
-                    "asin": row.asin,
-                    "title": row.title,
-                    "category": row.category,
-                    "brand": row.brand,
-                    "price": float(row.price) if row.price else None,
-                    "rating_avg": float(row.rating_avg),
-                    "rating_count": row.rating_count,
-                    "similarity": float(row.similarity),
-                    "recall_path": "review_embedding",
-                    "review_summary": {
-                        "pros": row.pros if row.pros else [],
-                        "cons": row.cons if row.cons else [],
-                        "text": row.summary_text[:200] if row.summary_text else ""
-                    }
-                })
+            if settings.vector_backend == "memory":
+                items = self._memory_vector_recall("reviews", query_embedding, limit, category, "review_embedding")
+            else:
+                # Use pgvector similarity search on review embeddings
+                if settings.review_index_type == "ivfflat":
+                    self.db.execute(IVFFLAT_PROBES_SQL, {"probes": str(settings.review_ivfflat_probes)})
+                result = self._vector_recall_query(
+                    REVIEW_RECALL_SQL,
+                    REVIEW_RECALL_IN_CATEGORY_SQL,
+                    REVIEW_RECALL_OVERFETCH_SQL,
+                    {"embedding": query_embedding, "limit": limit},
+                    category
+                )
+                items = [Candidate.from_row(row, float(row.similarity), "review_embedding") for row in result]
             
             logger.info(f"Review embedding search returned {len(items)} items")
             return items
@@ -328,217 +1045,279 @@ class RecommendationEngine:
             logger.error(f"Error searching by review embedding: {e}")
             return []
     
-    def multi_path_recommend(self, user_query: str, query_embedding: List[float], keywords: List[str], target_category: Optional[str] = None) -> List[Dict[str, Any]]:
+    def _recall_task(self, method: str, *args, **kwargs) -> Callable[[], Any]:
+        """Bind a recall method to its own DB session so it can run on a worker thread"""
+        if not settings.recall_concurrency:
+            return lambda: getattr(self, method)(*args, **kwargs)
+        
+        def run():
+            db = SessionLocal()
+            try:
+                return getattr(RecommendationEngine(db), method)(*args, **kwargs)
+            finally:
+                db.close()
+        return run
+    
+    def multi_path_recommend(self, user_query: str, query_embedding: np.ndarray, keywords: List[str], target_category: Optional[str] = None, vector_overfetch: Optional[int] = None) -> List[Candidate]:
         """Multi-path recall: vector + keyword + category + popular with optional category filtering"""
+        if self._use_single_statement(vector_overfetch):
+            try:
+                return self.single_statement_recall(query_embedding, keywords, target_category)
+            except Exception as e:
+                # Degrade like multi_path does, where a failing path only loses its candidates
+                logger.warning(f"Single-statement recall failed, falling back to multi-path recall: {e}")
+                self.db.rollback()
+        
         try:
-            all_candidates = []
-            seen_asins = set()
-            
-            logger.info(f"Multi-path recommendation for category: {target_category if target_category else 'Any'}")
-            
-            # Path 1: Vector similarity search (main path)
-            logger.info("Path 1: Vector similarity search")
-            vector_results = []
-            if query_embedding:  # Only attempt if embedding is not empty
-                try:
-                    vector_results = self.search_similar_items(query_embedding, limit=self.topk)
-                    # Filter by category if specified
-                    if target_category:
-                        vector_results = [item for item in vector_results if item.get('category') == target_category]
-                    logger.info(f"Vector path returned {len(vector_results)} items")
-                except Exception as e:
-                    logger.warning(f"Vector similarity search failed: {e}")
-                    vector_results = []
-            else:
-                logger.info("Skipping vector search: no embedding available")
-            
-            # Add vector results with high weight
-            for idx, item in enumerate(vector_results):
-                if item["asin"] not in seen_asins:
-                    item["score"] = item["similarity"] * 0.6 + (1 - idx / max(len(vector_results), 1)) * 0.4
-                    all_candidates.append(item)
-                    seen_asins.add(item["asin"])
-            
-            # Path 2: Keyword search
-            if keywords:
-                logger.info(f"Path 2: Keyword search with {len(keywords)} keywords")
-                keyword_results = self.keyword_search(keywords, limit=50)
-                # Filter by category if specified
-                if target_category:
-                    keyword_results = [item for item in keyword_results if item.get('category') == target_category]
-                logger.info(f"Keyword path returned {len(keyword_results)} items")
-                
-                for idx, item in enumerate(keyword_results):
-                    if item["asin"] not in seen_asins:
-                        # Keyword search has high priority when embedding fails
-                        item["score"] = item["similarity"] * 0.7 + (1 - idx / max(len(keyword_results), 1)) * 0.3
-                        all_candidates.append(item)
-                        seen_asins.add(item["asin"])
-                    else:
-                        # If already in candidates, boost score for keyword match
-                        for candidate in all_candidates:
-                            if candidate["asin"] == item["asin"]:
-                                candidate["score"] = min(1.0, candidate["score"] + 0.3)
-                                break
-            
-            # Path 3: Category search (extract category from keyword results if no vector results)
-            if not vector_results and keyword_results:
-                # Try to extract category from keyword results
-                categories = {}
-                for item in keyword_results[:5]:
-                    cat = item.get("category")
-                    if cat:
-                        categories[cat] = categories.get(cat, 0) + 1
-                
-                if categories:
-                    top_category = max(categories, key=categories.get)
-                    logger.info(f"Path 3: Category search for {top_category}")
-                    category_results = self.category_search(top_category, limit=15)
-                    # Apply category filter if specified
-                    if target_category:
-                        category_results = [item for item in category_results if item.get('category') == target_category]
-                    logger.info(f"Category path returned {len(category_results)} items")
-                    
-                    for idx, item in enumerate(category_results):
-                        if item["asin"] not in seen_asins:
-                            item["score"] = item["similarity"] * 0.4 + (1 - idx / max(len(category_results), 1)) * 0.2
-                            all_candidates.append(item)
-                            seen_asins.add(item["asin"])
-            elif vector_results:
-                top_category = vector_results[0].get("category")
-                if top_category:
-                    logger.info(f"Path 3: Category search for {top_category}")
-                    category_results = self.category_search(top_category, limit=15)
-                    # Apply category filter if specified
-                    if target_category:
-                        category_results = [item for item in category_results if item.get('category') == target_category]
-                    logger.info(f"Category path returned {len(category_results)} items")
-                    
-                    for idx, item in enumerate(category_results):
-                        if item["asin"] not in seen_asins:
-                            item["score"] = item["similarity"] * 0.2 + (1 - idx / max(len(category_results), 1)) * 0.1
-                            all_candidates.append(item)
-                            seen_asins.add(item["asin"])
-            
-            # Path 4: Review embedding search (NEW - search by similar reviews)
-            if query_embedding:
-                logger.info("Path 4: Review embedding search")
-                review_results = self.search_by_review_embedding(query_embedding, limit=30)
-                # Filter by category if specified
-                if target_category:
-                    review_results = [item for item in review_results if item.get('category') == target_category]
-                logger.info(f"Review embedding path returned {len(review_results)} items")
-                
-                for idx, item in enumerate(review_results):
-                    if item["asin"] not in seen_asins:
-                        item["score"] = item["similarity"] * 0.5 + (1 - idx / max(len(review_results), 1)) * 0.3
-                        all_candidates.append(item)
-                        seen_asins.add(item["asin"])
-                    else:
-                        # If already in candidates, boost score for review match
-                        for candidate in all_candidates:
-                            if candidate["asin"] == item["asin"]:
-                                candidate["score"] = min(1.0, candidate["score"] + 0.2)
-                                break
-            
-            # Path 5: Category-wide fallback (before generic popular items)
-            # When specific category is detected but no good results yet, search whole category
-            if len(all_candidates) < self.topn * 2 and target_category:
-                logger.info(f"Path 5: Category fallback search for {target_category} (current candidates: {len(all_candidates)})")
-                category_fallback = self.category_search(target_category, limit=self.topn * 3)
-                logger.info(f"Category fallback returned {len(category_fallback)} items")
-                
-                for idx, item in enumerate(category_fallback):
-                    if item["asin"] not in seen_asins:
-                        item["score"] = (1 - idx / max(len(category_fallback), 1)) * 0.3
-                        all_candidates.append(item)
-                        seen_asins.add(item["asin"])
-            
-            # Path 6: Popular items (final fallback when we have very few results)
-            if len(all_candidates) < self.topn * 2:
-                logger.info(f"Path 6: Popular items fallback (current candidates: {len(all_candidates)})")
-                popular_results = self.popular_items(limit=min(20, self.topn * 2))
-                # Apply category filter if specified
-                if target_category:
-                    popular_results = [item for item in popular_results if item.get('category') == target_category]
-                logger.info(f"Popular path returned {len(popular_results)} items")
-                
-                for idx, item in enumerate(popular_results):
-                    if item["asin"] not in seen_asins:
-                        pop_weight = (1 - idx / max(len(popular_results), 1)) * 0.05
-                        item["score"] = item["similarity"] * 0.1 + pop_weight
-                        all_candidates.append(item)
-                        seen_asins.add(item["asin"])
-            
-            # Sort by final score
-            all_candidates.sort(key=lambda x: x["score"], reverse=True)
-            
-            logger.info(f"Total candidates after multi-path recall: {len(all_candidates)}")
-            logger.info(f"Recall path distribution: " + 
-                       ", ".join([f"{path}: {sum(1 for item in all_candidates if item['recall_path'] == path)}" 
-                                 for path in ['vector', 'keyword', 'category', 'popular']]))
-            
-            return all_candidates[:self.topn]
+            stages = self._multi_path_stages(user_query, query_embedding, keywords, target_category, vector_overfetch)
+            stage = next(stages)
+            while True:
+                tasks = {
+                    name: self._recall_task(method, *args, **kwargs)
+                    for name, (method, args, kwargs) in stage.items()
+                }
+                stage = stages.send(recall_executor.run(tasks))
+        except StopIteration as done:
+            return done.value
         except Exception as e:
             logger.error(f"Error in multi-path recommend: {e}")
             raise
     
+    def _use_single_statement(self, vector_overfetch: Optional[int]) -> bool:
+        """Whether recall runs as one statement; a per-request vector_overfetch tunes
+        the two-stage vector search, which only the multi-path route runs"""
+        return settings.recall_mode == "single_statement" and vector_overfetch is None
+    
+    def single_statement_recall(self, query_embedding: np.ndarray, keywords: List[str], target_category: Optional[str] = None) -> List[Candidate]:
+        """Every recall path, the fusion and the top-N hydration in one SQL round trip.
+        
+        Same paths, limits and PATH_WEIGHTS as _multi_path_stages; the vector
+        paths always search the full-precision pgvector indexes.
+        """
+        try:
+            has_embedding = len(query_embedding) > 0
+            fts = settings.keyword_backend == "fts"
+            keywords = _expand_keywords(keywords) if keywords else []
+            n_matched = 0
+            if not fts:
+                keywords, n_matched = _trigram_keywords(keywords[:settings.keyword_max_terms])
+            
+            params: Dict[str, Any] = {
+                "limit": self.topn,
+                "vector_limit": self.topk,
+                "review_limit": self.REVIEW_RECALL_LIMIT,
+                "keyword_limit": self.KEYWORD_RECALL_LIMIT,
+                "category_limit": self.CATEGORY_RECALL_LIMIT,
+                "fallback_limit": self.topn * 3,
+                "popular_limit": min(20, self.topn * 2),
+                "min_candidates": self.topn * 2,
+                "rrf_k": settings.rrf_k
+            }
+            if has_embedding:
+                params["embedding"] = query_embedding
+            if target_category:
+                params["category"] = target_category
+                params["vector_candidates"] = min(self.topk * settings.vector_filter_overfetch, HNSW_MAX_EF_SEARCH)
+                params["review_candidates"] = min(
+                    self.REVIEW_RECALL_LIMIT * settings.vector_filter_overfetch, HNSW_MAX_EF_SEARCH
+                )
+            if keywords and fts:
+                params.update(fts_config=settings.fts_config, query=_websearch_query(keywords))
+            elif keywords:
+                params.update(_trigram_params(keywords))
+            
+            # FTS binds the whole keyword list as one query, so one statement serves any count
+            n_terms = min(len(keywords), 1) if fts else len(keywords)
+            statement = _unified_recall_sql(has_embedding, n_terms, bool(target_category), n_matched)
+            with metrics.timer("recall.single_statement"):
+                if has_embedding:
+                    # HNSW scans stop after ef_search rows, which must cover the over-fetch
+                    scanned = params.get("vector_candidates", self.topk)
+                    self.db.execute(UNIFIED_SCAN_SQL, {
+                        "ef_search": ef_search_setting(scanned),
+                        "probes": str(settings.review_ivfflat_probes)
+                    })
+                result = self.db.execute(statement, params).all()
+            
+            items = []
+            for row in result:
+                item = Candidate(row.asin, row.category, float(row.similarity), row.recall_path, row)
+                item.score = float(row.score)
+                items.append(item)
+            logger.info(f"Single-statement recall returned {len(items)} items")
+            return items
+        except Exception as e:
+            logger.error(f"Error in single-statement recall: {e}")
+            raise
+    
+    def _multi_path_stages(self, user_query: str, query_embedding: np.ndarray, keywords: List[str], target_category: Optional[str] = None, vector_overfetch: Optional[int] = None):
+        """Recall and fusion logic shared by the sync and async engines.
+        
+        A generator that yields stages of independent recall tasks
+        ({name: (method, args, kwargs)}), receives their results keyed by name,
+        and returns the fused, hydrated top-N. The driver decides how a stage runs.
+        """
+        # Candidates keyed by ASIN; scores are fused once all paths have reported
+        pool = CandidatePool()
+        
+        logger.info(f"Multi-path recommendation for category: {target_category if target_category else 'Any'}")
+        
+        # Stage 1: the vector, keyword and review paths only depend on the query,
+        # so they run concurrently; results are fused below in the fixed path order
+        stage1 = {}
+        if len(query_embedding):
+            # The category predicate runs inside the vector queries, so these paths
+            # return a full top-k of in-category items instead of a post-filtered few
+            stage1["vector"] = ("search_similar_items", (query_embedding,), {"limit": self.topk, "category": target_category, "overfetch": vector_overfetch})
+            stage1["review"] = ("search_by_review_embedding", (query_embedding,), {"limit": self.REVIEW_RECALL_LIMIT, "category": target_category})
+        else:
+            logger.info("Skipping vector search: no embedding available")
+        if keywords:
+            logger.info(f"Path 2: Keyword search with {len(keywords)} keywords")
+            stage1["keyword"] = ("keyword_search", (keywords,), {"limit": self.KEYWORD_RECALL_LIMIT})
+        stage1_results = yield stage1
+        
+        # Path 1: Vector similarity search (main path), added with high weight
+        vector_results = stage1_results.get("vector", [])
+        logger.info(f"Vector path returned {len(vector_results)} items")
+        pool.add(vector_results, *PATH_WEIGHTS["vector"])
+        
+        # Path 2: Keyword search
+        keyword_results = stage1_results.get("keyword", [])
+        # Filter by category if specified
+        if target_category:
+            keyword_results = [item for item in keyword_results if item.category == target_category]
+        logger.info(f"Keyword path returned {len(keyword_results)} items")
+        # Keyword search has high priority when embedding fails; items already
+        # recalled by the vector path get a boost for the keyword match
+        pool.add(keyword_results, *PATH_WEIGHTS["keyword"])
+        
+        # Stage 2: the category path depends on stage 1 results
+        top_category = None
+        category_weights = PATH_WEIGHTS["category"]
+        if not vector_results and keyword_results:
+            # Try to extract category from keyword results
+            categories = {}
+            for item in keyword_results[:5]:
+                cat = item.category
+                if cat:
+                    categories[cat] = categories.get(cat, 0) + 1
+            if categories:
+                # Ties go to the larger category, which has more fallback candidates
+                top_category = max(categories, key=lambda cat: (categories[cat], category_registry.count(cat)))
+                category_weights = PATH_WEIGHTS["keyword_category"]
+        elif vector_results:
+            top_category = vector_results[0].category
+        
+        stage2 = {}
+        if top_category:
+            logger.info(f"Path 3: Category search for {top_category}")
+            stage2["category"] = ("category_search", (top_category,), {"limit": self.CATEGORY_RECALL_LIMIT})
+        stage2_results = yield stage2
+        
+        # Path 3: Category search (category extracted from vector or keyword results)
+        if top_category:
+            category_results = stage2_results.get("category", [])
+            # Apply category filter if specified
+            if target_category:
+                category_results = [item for item in category_results if item.category == target_category]
+            logger.info(f"Category path returned {len(category_results)} items")
+            pool.add(category_results, *category_weights)
+        
+        # Path 4: Review embedding search, boosting items already recalled
+        if len(query_embedding):
+            review_results = stage1_results.get("review", [])
+            logger.info(f"Review embedding path returned {len(review_results)} items")
+            pool.add(review_results, *PATH_WEIGHTS["review_embedding"])
+        
+        # Path 5: Category-wide fallback (before generic popular items)
+        # When specific category is detected but no good results yet, search whole category
+        if len(pool) < self.topn * 2 and target_category:
+            logger.info(f"Path 5: Category fallback search for {target_category} (current candidates: {len(pool)})")
+            fallback_stage = {"category_fallback": ("category_search", (target_category,), {"limit": self.topn * 3})}
+            category_fallback = (yield fallback_stage)["category_fallback"]
+            logger.info(f"Category fallback returned {len(category_fallback)} items")
+            pool.add(category_fallback, *PATH_WEIGHTS["category_fallback"])
+        
+        # Path 6: Popular items (final fallback when we have very few results)
+        if len(pool) < self.topn * 2:
+            logger.info(f"Path 6: Popular items fallback (current candidates: {len(pool)})")
+            popular_stage = {"popular": ("popular_items", (), {"limit": min(20, self.topn * 2)})}
+            popular_results = (yield popular_stage)["popular"]
+            # Apply category filter if specified
+            if target_category:
+                popular_results = [item for item in popular_results if item.category == target_category]
+            logger.info(f"Popular path returned {len(popular_results)} items")
+            pool.add(popular_results, *PATH_WEIGHTS["popular"])
+        
+        logger.info(f"Total candidates after multi-path recall: {len(pool)}")
+        logger.info(f"Recall path distribution: {pool.path_counts()}")
+        
+        # Fuse path scores and keep the top-N by partial selection
+        top_items = pool.fuse(self.topn)
+        
+        # Late materialization: only the winners are loaded with full item rows
+        if any(item.row is None for item in top_items):
+            top_items = (yield {"hydrate": ("hydrate_candidates", (top_items,), {})})["hydrate"]
+        return top_items
+    
     def understand_query(self, user_query: str) -> Tuple[str, List[str]]:
         """Use LLM to understand user query and extract intent"""
         # Fast path: skip LLM if disabled for performance
         if not getattr(settings, "enable_llm_intent", True):
             keywords = self._extract_keywords_fallback(user_query)
             return user_query, keywords
-        system_prompt = """你是一个专业的电商推荐系统助手。分析用户的自然语言查询，理解其潜在需求。
-        
-        请以JSON格式返回（必须是有效的JSON）：
-        {
-            "intent": "用户的核心需求描述（1-2句话，中文）",
-            "keywords": ["关键词1", "关键词2", ...]
-        }
-        
-        只返回JSON，不要其他任何内容。"""
         
         try:
-            response = ollama_client.generate_text(user_query, system_prompt, temperature=0.3)
-            logger.info(f"LLM response for query understanding: {response[:100]}...")
-            
-            # Parse JSON response
-            import json
-            import re
+            def compute():
+                response = ollama_client.generate_text(user_query, INTENT_SYSTEM_PROMPT, temperature=0.3)
+                return self._parse_understanding(user_query, response)
             
-            # Try to extract JSON from response (in case LLM adds extra text)
-            try:
-                # First try direct parsing
-                data = json.loads(response)
-            except json.JSONDecodeError:
-                # Try to extract JSON block from response
-                json_match = re.search(r'\{[^{}]*\}', response, re.DOTALL)
-                if json_match:
-                    data = json.loads(json_match.group())
-                else:
-                    raise ValueError(f"Could not parse JSON from response: {response}")
-            
-            intent = data.get("intent", user_query)
-            keywords = data.get("keywords", [])
-            
-            # Validate and clean keywords
-            if not isinstance(keywords, list):
-                keywords = []
-            keywords = [kw for kw in keywords if isinstance(kw, str) and kw.strip()]
-            
-            # If keywords are empty, extract them from query directly
-            if not keywords:
-                keywords = self._extract_keywords_fallback(user_query)
-            
-            logger.info(f"Query understanding result - Intent: {intent}, Keywords: {keywords}")
-            return intent, keywords
+            intent, keywords = self._cached_llm_result("intent", INTENT_SYSTEM_PROMPT, user_query, compute)
+            return intent, list(keywords)
         except Exception as e:
             logger.error(f"Error understanding query: {e}")
             # Fallback: use query as-is and extract keywords
             keywords = self._extract_keywords_fallback(user_query)
             return user_query, keywords
     
+    def _cached_llm_result(self, kind: str, system_prompt: str, user_query: str, compute: Callable[[], Any]) -> Any:
+        """Serve an LLM result from the cache, computing it on a miss"""
+        if not settings.llm_cache_enabled:
+            return compute()
+        return llm_result_cache.get_or_compute(_llm_cache_key(kind, system_prompt, user_query), compute)
+    
+    def _parse_understanding(self, user_query: str, response: str) -> Tuple[str, List[str]]:
+        """Parse the intent/keywords JSON returned by the LLM"""
+        logger.info(f"LLM response for query understanding: {response[:100]}...")
+        
+        # Try to extract JSON from response (in case LLM adds extra text)
+        try:
+            # First try direct parsing
+            data = json.loads(response)
+        except json.JSONDecodeError:
+            # Try to extract JSON block from response
+            json_match = re.search(r'\{[^{}]*\}', response, re.DOTALL)
+            if json_match:
+                data = json.loads(json_match.group())
+            else:
+                raise ValueError(f"Could not parse JSON from response: {response}")
+        
+        intent = data.get("intent", user_query)
+        keywords = data.get("keywords", [])
+        
+        # Validate and clean keywords
+        if not isinstance(keywords, list):
+            keywords = []
+        keywords = [kw for kw in keywords if isinstance(kw, str) and kw.strip()]
+        
+        # If keywords are empty, extract them from query directly
+        if not keywords:
+            keywords = self._extract_keywords_fallback(user_query)
+        
+        logger.info(f"Query understanding result - Intent: {intent}, Keywords: {keywords}")
+        return intent, keywords
+    
     def _extract_keywords_fallback(self, query: str) -> List[str]:
         """Fallback method to extract keywords from query without LLM"""
         # Simple keyword extraction: split by common delimiters
@@ -554,7 +1333,7 @@ class RecommendationEngine:
         """Detect product category from user query using LLM or keyword matching"""
         try:
             # First try category mapping using keywords
-            detected_category = self._category_mapping_from_keywords(keywords)
+            detected_category = self._resolve_mapped_category(self._category_mapping_from_keywords(keywords))
             if detected_category:
                 logger.info(f"Category detected from keywords: {detected_category}")
                 return detected_category
@@ -562,38 +1341,37 @@ class RecommendationEngine:
             # If keyword matching fails, use LLM to detect category
             if not getattr(settings, "enable_llm_category_fallback", True):
                 return None
-            system_prompt = """你是一个电商产品分类助手。根据用户的查询，识别出用户想要购买的产品类别。
-            
-            可能的类别包括：
-            - Electronics: 电子产品、电脑、手机等
-            - Home_and_Kitchen: 家庭和厨房用品
-            - Books: 书籍
-            - Clothing: 服装鞋帽
-            - Sports: 运动户外
-            - Toys: 玩具游戏
-            - Beauty: 美妆个护
-            - Automotive: 汽车用品
-            - Pet_Supplies: 宠物用品
-            - Software: 软件
-            - Office_Products: 办公用品
-            
-            请只返回一个类别名称，不要其他内容。如果无法确定，返回 'General'。"""
-            
-            response = ollama_client.generate_text(user_query, system_prompt, temperature=0.2)
-            category = response.strip().upper()
             
-            # Validate category exists in database
-            if self._validate_category(category):
-                logger.info(f"Category detected from LLM: {category}")
-                return category
+            def compute():
+                return ollama_client.generate_text(user_query, CATEGORY_SYSTEM_PROMPT, temperature=0.2)
             
-            logger.info(f"LLM returned invalid category: {category}")
-            return None
+            response = self._cached_llm_result("category", CATEGORY_SYSTEM_PROMPT, user_query, compute)
+            return self._resolve_llm_category(response)
             
         except Exception as e:
             logger.warning(f"Error detecting category: {e}")
             return None
     
+    def _resolve_llm_category(self, response: str) -> Optional[str]:
+        """Normalize the LLM's category answer and keep it only if it exists"""
+        # The registry matches case- and separator-insensitively and returns the stored name
+        category = category_registry.resolve(response.strip())
+        if category:
+            logger.info(f"Category detected from LLM: {category}")
+            return category
+        
+        logger.info(f"LLM returned invalid category: {response.strip()}")
+        return None
+    
+    def _resolve_mapped_category(self, category: Optional[str]) -> Optional[str]:
+        """Canonical name of a keyword-mapped category, dropped if the catalog lacks it"""
+        if not category or not category_registry.ready:
+            return category
+        resolved = category_registry.resolve(category)
+        if not resolved:
+            logger.info(f"Mapped category '{category}' has no items, ignoring it")
+        return resolved
+    
     def _category_mapping_from_keywords(self, keywords: List[str]) -> Optional[str]:
         """Map keywords to product categories"""
         # Build keyword-category mappings (Chinese keywords + English equivalents)
@@ -656,67 +1434,68 @@ class RecommendationEngine:
         
         return None
     
-    def _validate_category(self, category: str) -> bool:
-        """Check if category exists in database"""
-        try:
-            from sqlalchemy import text
-            result = self.db.execute(
-                text("SELECT COUNT(*) FROM lmrc.items WHERE category = :cat"),
-                {"cat": category}
-            )
-            count = result.scalar()
-            return count > 0
-        except Exception as e:
-            logger.warning(f"Error validating category '{category}': {e}")
-            return False
+    def plan_query(self, user_query: str) -> QueryPlan:
+        """Understand the query, detect its category and embed it - once per request"""
+        # Step 1: Understand the query
+        intent, keywords = self.understand_query(user_query)
+        logger.info(f"Query intent: {intent}, keywords: {keywords}")
+        
+        # Step 1b: Detect product category from query
+        target_category = self.detect_category(user_query, keywords)
+        logger.info(f"Detected category: {target_category}")
+        
+        # Step 2: Create embedding for the query
+        # Use the original query if intent understanding failed
+        text_to_embed = intent if intent != user_query else user_query
+        
+        query_embedding = NO_EMBEDDING
+        if getattr(settings, "enable_embeddings", True):
+            try:
+                query_embedding = ollama_client.embed_text(text_to_embed)
+                if not len(query_embedding):
+                    raise ValueError("Empty embedding returned")
+                logger.info(f"Embedding created successfully, dimension: {len(query_embedding)}")
+            except Exception as e:
+                logger.warning(f"Failed to create embedding for '{text_to_embed}': {e}")
+                logger.info("Falling back to keyword-only search")
+                # If embedding fails, try with original query
+                try:
+                    query_embedding = ollama_client.embed_text(user_query)
+                    if not len(query_embedding):
+                        logger.warning("Embedding for original query also failed, will rely on keyword search")
+                        query_embedding = NO_EMBEDDING
+                except:
+                    logger.warning("All embedding attempts failed, will rely on keyword search")
+                    query_embedding = NO_EMBEDDING
+        else:
+            logger.info("Embeddings disabled by config; using keyword search only")
+        
+        return QueryPlan(
+            query=user_query,
+            intent=intent,
+            keywords=keywords,
+            category=target_category,
+            embedding=query_embedding
+        )
     
-    def generate_recommendations(self, user_query: str) -> List[Dict[str, Any]]:
+    def generate_recommendations(self, user_query: str, plan: Optional[QueryPlan] = None) -> List[Dict[str, Any]]:
         """Generate recommendations based on user query using multi-path recall with category detection"""
         try:
-            # Step 1: Understand the query
-            intent, keywords = self.understand_query(user_query)
-            logger.info(f"Query intent: {intent}, keywords: {keywords}")
-            
-            # Step 1b: Detect product category from query
-            target_category = self.detect_category(user_query, keywords)
-            logger.info(f"Detected category: {target_category}")
-            
-            # Step 2: Create embedding for the query
-            # Use the original query if intent understanding failed
-            text_to_embed = intent if intent != user_query else user_query
-            
-            query_embedding: List[float] = []
-            if getattr(settings, "enable_embeddings", True):
-                try:
-                    query_embedding = ollama_client.embed_text(text_to_embed)
-                    if not query_embedding:
-                        raise ValueError("Empty embedding returned")
-                    logger.info(f"Embedding created successfully, dimension: {len(query_embedding)}")
-                except Exception as e:
-                    logger.warning(f"Failed to create embedding for '{text_to_embed}': {e}")
-                    logger.info("Falling back to keyword-only search")
-                    # If embedding fails, try with original query
-                    try:
-                        query_embedding = ollama_client.embed_text(user_query)
-                        if not query_embedding:
-                            logger.warning("Embedding for original query also failed, will rely on keyword search")
-                            query_embedding = []
-                    except:
-                        logger.warning("All embedding attempts failed, will rely on keyword search")
-                        query_embedding = []
-            else:
-                logger.info("Embeddings disabled by config; using keyword search only")
+            # Reuse the caller's plan so intent/category/embedding are only computed once
+            if plan is None:
+                plan = self.plan_query(user_query)
             
             # Step 3: Multi-path recall (vector + keyword + category + popular)
             # Pass the detected category for filtering
-            top_items = self.multi_path_recommend(user_query, query_embedding, keywords, target_category)
+            top_items = self.multi_path_recommend(user_query, plan.embedding, plan.keywords, plan.category, plan.vector_overfetch)
             logger.info(f"Multi-path recall returned {len(top_items)} items")
             
             if not top_items:
                 logger.warning("Multi-path recall returned no items, returning popular items")
-                top_items = self.popular_items(limit=self.topn)
+                top_items = self.hydrate_candidates(self.popular_items(limit=self.topn))
             
-            return top_items
+            # Only the returned items are materialized as dicts
+            return candidates_to_dicts(top_items)
         except Exception as e:
             logger.error(f"Error generating recommendations: {e}")
             raise
@@ -742,3 +1521,165 @@ class RecommendationEngine:
         except Exception as e:
             logger.error(f"Error getting item details: {e}")
             raise
+
+
+class AsyncRecommendationEngine:
+    """Coroutine API over RecommendationEngine for the async request path.
+    
+    LLM and embedding calls go through the async Ollama client; SQL runs on an
+    AsyncSession, with the shared sync recall code executed via run_sync. Recall
+    stages fan out over separate sessions with asyncio.gather.
+    """
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.topk = settings.retrieve_topk
+        self.topn = settings.return_topn
+    
+    async def _call(self, method: str, *args, **kwargs) -> Any:
+        """Run a sync engine method on this request's session"""
+        return await self.db.run_sync(
+            lambda session: getattr(RecommendationEngine(session), method)(*args, **kwargs)
+        )
+    
+    async def _recall(self, name: str, method: str, args: tuple, kwargs: dict) -> Any:
+        """Run one recall path on its own session; failures yield no candidates"""
+        try:
+            if not settings.recall_concurrency:
+                return await self._call(method, *args, **kwargs)
+            async with AsyncSessionLocal() as session:
+                return await asyncio.wait_for(
+                    session.run_sync(
+                        lambda s: getattr(RecommendationEngine(s), method)(*args, **kwargs)
+                    ),
+                    timeout=settings.recall_timeout_s
+                )
+        except Exception as e:
+            logger.warning(f"Recall path '{name}' failed: {e}")
+            return []
+    
+    async def _cached_llm_result(self, kind: str, system_prompt: str, user_query: str, compute: Callable[[], Any]) -> Any:
+        """Serve an LLM result from the cache, computing it on a miss"""
+        if not settings.llm_cache_enabled:
+            return await compute()
+        return await llm_result_cache.aget_or_compute(_llm_cache_key(kind, system_prompt, user_query), compute)
+    
+    async def understand_query(self, user_query: str) -> Tuple[str, List[str]]:
+        """Use LLM to understand user query and extract intent"""
+        sync_engine = RecommendationEngine(None)
+        if not getattr(settings, "enable_llm_intent", True):
+            return user_query, sync_engine._extract_keywords_fallback(user_query)
+        
+        try:
+            async def compute():
+                response = await async_ollama_client.generate_text(user_query, INTENT_SYSTEM_PROMPT, temperature=0.3)
+                return sync_engine._parse_understanding(user_query, response)
+            
+            intent, keywords = await self._cached_llm_result("intent", INTENT_SYSTEM_PROMPT, user_query, compute)
+            return intent, list(keywords)
+        except Exception as e:
+            logger.error(f"Error understanding query: {e}")
+            return user_query, sync_engine._extract_keywords_fallback(user_query)
+    
+    async def detect_category(self, user_query: str, keywords: List[str]) -> Optional[str]:
+        """Detect product category from user query using LLM or keyword matching"""
+        try:
+            if not category_registry.ready:
+                # The first catalog load is a blocking GROUP BY over lmrc.items
+                await asyncio.get_running_loop().run_in_executor(None, category_registry.ensure_fresh)
+            engine = RecommendationEngine(None)
+            detected_category = engine._resolve_mapped_category(engine._category_mapping_from_keywords(keywords))
+            if detected_category:
+                logger.info(f"Category detected from keywords: {detected_category}")
+                return detected_category
+            
+            if not getattr(settings, "enable_llm_category_fallback", True):
+                return None
+            
+            async def compute():
+                return await async_ollama_client.generate_text(user_query, CATEGORY_SYSTEM_PROMPT, temperature=0.2)
+            
+            response = await self._cached_llm_result("category", CATEGORY_SYSTEM_PROMPT, user_query, compute)
+            return RecommendationEngine(None)._resolve_llm_category(response)
+        except Exception as e:
+            logger.warning(f"Error detecting category: {e}")
+            return None
+    
+    async def plan_query(self, user_query: str) -> QueryPlan:
+        """Understand the query, detect its category and embed it - once per request"""
+        intent, keywords = await self.understand_query(user_query)
+        target_category = await self.detect_category(user_query, keywords)
+        
+        query_embedding = NO_EMBEDDING
+        if getattr(settings, "enable_embeddings", True):
+            # Embed the intent first, then fall back to the raw query
+            texts = [intent] if intent == user_query else [intent, user_query]
+            for text_to_embed in texts:
+                try:
+                    query_embedding = await async_ollama_client.embed_text(text_to_embed)
+                    if len(query_embedding):
+                        break
+                except Exception as e:
+                    logger.warning(f"Failed to create embedding for '{text_to_embed}': {e}")
+            if not len(query_embedding):
+                logger.warning("All embedding attempts failed, will rely on keyword search")
+                query_embedding = NO_EMBEDDING
+        
+        return QueryPlan(
+            query=user_query,
+            intent=intent,
+            keywords=keywords,
+            category=target_category,
+            embedding=query_embedding
+        )
+    
+    async def multi_path_recommend(self, user_query: str, query_embedding: np.ndarray, keywords: List[str], target_category: Optional[str] = None, vector_overfetch: Optional[int] = None) -> List[Candidate]:
+        """Multi-path recall with each stage's paths awaited concurrently.
+        
+        Without recall_concurrency every path shares the request's AsyncSession,
+        which allows one operation at a time, so the paths are awaited in turn.
+        """
+        if RecommendationEngine(None)._use_single_statement(vector_overfetch):
+            try:
+                return await self._call("single_statement_recall", query_embedding, keywords, target_category)
+            except Exception as e:
+                logger.warning(f"Single-statement recall failed, falling back to multi-path recall: {e}")
+                await self.db.rollback()
+        stages = RecommendationEngine(None)._multi_path_stages(user_query, query_embedding, keywords, target_category, vector_overfetch)
+        try:
+            stage = next(stages)
+            while True:
+                names = list(stage)
+                if settings.recall_concurrency:
+                    results = await asyncio.gather(*(
+                        self._recall(name, *stage[name]) for name in names
+                    ))
+                else:
+                    results = [await self._recall(name, *stage[name]) for name in names]
+                stage = stages.send(dict(zip(names, results)))
+        except StopIteration as done:
+            return done.value
+        except Exception as e:
+            logger.error(f"Error in multi-path recommend: {e}")
+            raise
+    
+    async def generate_recommendations(self, user_query: str, plan: Optional[QueryPlan] = None) -> List[Dict[str, Any]]:
+        """Generate recommendations based on user query"""
+        try:
+            if plan is None:
+                plan = await self.plan_query(user_query)
+            
+            top_items = await self.multi_path_recommend(user_query, plan.embedding, plan.keywords, plan.category, plan.vector_overfetch)
+            if not top_items:
+                logger.warning("Multi-path recall returned no items, returning popular items")
+                top_items = await self._call("popular_items", limit=self.topn)
+                top_items = await self._call("hydrate_candidates", top_items)
+            
+            return candidates_to_dicts(top_items)
+        except Exception as e:
+            logger.error(f"Error generating recommendations: {e}")
+            raise
+    
+    async def get_item_details(self, asin: str) -> Dict[str, Any]:
+        """Get detailed information about an item"""
+        return await self._call("get_item_details", asin)
@@ -0,0 +1,257 @@
+"""Dimensionality-reduced item embeddings for coarse vector search.
+
+An offline job fits a projection of the 768-dim item embeddings down to
+settings.reduced_dim dimensions - PCA, or Matryoshka truncation for models
+trained for it such as nomic-embed-text v1.5 - stores the projected vectors in
+lmrc.item_embeddings.embedding_reduced with their own HNSW index, and reports
+build time, index size and recall@k against full-vector search.
+vector_search_mode="reduced" then projects each query embedding with the saved
+projection and reranks the reduced index's candidates with the full vectors.
+
+The column only exists once the job has run, so it is not mapped on
+ItemEmbedding.
+
+Usage:
+    python -m backend.reduced_index build      # fit, backfill, index, evaluate
+    python -m backend.reduced_index recall     # re-measure recall@k and latency
+"""
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sqlalchemy import select, text
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+REDUCED_INDEX = "idx_item_embeddings_reduced"
+
+
+def _as_array(embedding) -> np.ndarray:
+    if hasattr(embedding, "to_numpy"):  # halfvec columns load as HalfVector
+        embedding = embedding.to_numpy()
+    return np.asarray(embedding, dtype=np.float32)
+
+
+class Projection:
+    """Linear map to the reduced space; outputs are unit-normalized for cosine search"""
+
+    def __init__(self, method: str, mean: np.ndarray, components: np.ndarray):
+        self.method = method
+        self.mean = mean.astype(np.float32)
+        self.components = components.astype(np.float32)
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[1]
+
+    @classmethod
+    def matryoshka(cls, full_dim: int, dim: int) -> "Projection":
+        """Keep the leading dimensions (Matryoshka-trained embeddings)"""
+        return cls("matryoshka", np.zeros(full_dim), np.eye(full_dim, dim))
+
+    @classmethod
+    def fit_pca(cls, sample: np.ndarray, dim: int) -> "Projection":
+        """Top principal components of a sample of embeddings"""
+        mean = sample.mean(axis=0)
+        _, singular, vt = np.linalg.svd(sample - mean, full_matrices=False)
+        explained = (singular[:dim] ** 2).sum() / (singular ** 2).sum()
+        logger.info(f"PCA to {dim} dims keeps {explained:.1%} of the sample variance")
+        return cls("pca", mean, vt[:dim].T)
+
+    def project(self, vectors: np.ndarray) -> np.ndarray:
+        reduced = (vectors - self.mean) @ self.components
+        norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+        return reduced / np.where(norms == 0, 1.0, norms)
+
+    def save(self, path: str):
+        np.savez(path, method=np.array(self.method), mean=self.mean, components=self.components)
+
+    @classmethod
+    def load(cls, path: str) -> "Projection":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(str(data["method"]), data["mean"], data["components"])
+
+
+_projection: Optional[Projection] = None
+_projection_lock = threading.Lock()
+
+
+def get_projection() -> Projection:
+    """Projection used at query time, loaded once per process"""
+    global _projection
+    if _projection is None:
+        with _projection_lock:
+            if _projection is None:
+                if settings.reduced_projection_path:
+                    _projection = Projection.load(settings.reduced_projection_path)
+                elif settings.reduced_method == "matryoshka":
+                    _projection = Projection.matryoshka(settings.embed_dim, settings.reduced_dim)
+                else:
+                    raise RuntimeError("vector_search_mode='reduced' with PCA requires reduced_projection_path")
+    return _projection
+
+
+def fit_projection(db, sample_size: int = 50000) -> Projection:
+    """Fit the configured projection on a random sample of item embeddings"""
+    if settings.reduced_method == "matryoshka":
+        return Projection.matryoshka(settings.embed_dim, settings.reduced_dim)
+    from backend.models import ItemEmbedding
+    from sqlalchemy import func
+    rows = db.execute(
+        select(ItemEmbedding.embedding).order_by(func.random()).limit(sample_size)
+    ).scalars()
+    sample = np.stack([_as_array(embedding) for embedding in rows])
+    db.rollback()  # end the read transaction before build_reduced_index runs DDL on the table
+    return Projection.fit_pca(sample, settings.reduced_dim)
+
+
+def build_reduced_index(db, projection: Projection) -> Dict[str, Any]:
+    """Backfill embedding_reduced in keyset batches and build its HNSW index"""
+    from backend.database import engine
+    from backend.models import ItemEmbedding
+    stats: Dict[str, Any] = {"method": projection.method, "dim": projection.dim}
+    column_type = f"vector({projection.dim})"
+    update = text(f"""
+        UPDATE lmrc.item_embeddings
+        SET embedding_reduced = CAST(:reduced AS {column_type})
+        WHERE asin = :asin
+    """)
+
+    # The DDL below runs on its own connection and would wait behind any open
+    # transaction of this session on lmrc.item_embeddings
+    db.rollback()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS lmrc.{REDUCED_INDEX}"))
+        # Re-running with a different dimension replaces the column
+        conn.execute(text("ALTER TABLE lmrc.item_embeddings DROP COLUMN IF EXISTS embedding_reduced"))
+        conn.execute(text(f"ALTER TABLE lmrc.item_embeddings ADD COLUMN embedding_reduced {column_type}"))
+
+        start = time.perf_counter()
+        after, converted = "", 0
+        while True:
+            rows = db.execute(
+                select(ItemEmbedding.asin, ItemEmbedding.embedding)
+                .where(ItemEmbedding.asin > after)
+                .order_by(ItemEmbedding.asin)
+                .limit(settings.migration_batch_size)
+            ).all()
+            db.rollback()  # end the read transaction between batches
+            if not rows:
+                break
+            reduced = projection.project(np.stack([_as_array(row.embedding) for row in rows]))
+            conn.execute(update, [
+                {"asin": row.asin, "reduced": vector}
+                for row, vector in zip(rows, reduced)
+            ])
+            converted += len(rows)
+            after = rows[-1].asin
+            logger.info(f"{converted} reduced embeddings written")
+        stats["backfill_seconds"] = round(time.perf_counter() - start, 1)
+
+        start = time.perf_counter()
+        conn.execute(text(
+            f"CREATE INDEX CONCURRENTLY {REDUCED_INDEX} ON lmrc.item_embeddings "
+            f"USING hnsw (embedding_reduced vector_cosine_ops)"
+        ))
+        stats["index_build_seconds"] = round(time.perf_counter() - start, 1)
+        sizes = conn.execute(text("""
+            SELECT
+                pg_relation_size(to_regclass('lmrc.idx_item_embeddings_hnsw')) as full_bytes,
+                pg_relation_size(to_regclass(:reduced_index)) as reduced_bytes
+        """), {"reduced_index": f"lmrc.{REDUCED_INDEX}"}).one()
+        stats["full_index_bytes"] = sizes.full_bytes
+        stats["reduced_index_bytes"] = sizes.reduced_bytes
+    return stats
+
+
+def evaluate_recall(db, k: int = 10, n_queries: int = 100) -> Dict[str, Any]:
+    """recall@k and mean latency of reduced search vs. full-vector HNSW search.
+
+    Queries are stored item embeddings; each query's own item is excluded.
+    The reduced search gets the same ef_search and candidate cap as the
+    engine, so the reported recall is that of the configured over-fetch.
+    """
+    from backend.models import ItemEmbedding
+    from backend.recommendation_engine import (
+        EF_SEARCH_SQL, HNSW_MAX_EF_SEARCH, REDUCED_RECALL_SQL, VECTOR_RECALL_SQL, ef_search_setting
+    )
+    from sqlalchemy import func
+    projection = get_projection()
+    queries = db.execute(
+        select(ItemEmbedding.asin, ItemEmbedding.embedding).order_by(func.random()).limit(n_queries)
+    ).all()
+
+    candidates = min((k + 1) * settings.reduced_overfetch, HNSW_MAX_EF_SEARCH)
+    db.rollback()  # the ef_search setting below is transaction-local
+
+    hits, total = 0, 0
+    full_seconds, reduced_seconds = 0.0, 0.0
+    for row in queries:
+        vector = _as_array(row.embedding)
+        params = {"embedding": vector, "limit": k + 1}
+
+        start = time.perf_counter()
+        expected = [r.asin for r in db.execute(VECTOR_RECALL_SQL, params) if r.asin != row.asin][:k]
+        full_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        db.execute(EF_SEARCH_SQL, {"ef_search": ef_search_setting(candidates)})
+        found = [r.asin for r in db.execute(REDUCED_RECALL_SQL, dict(
+            params,
+            reduced=projection.project(vector),
+            candidates=candidates
+        )) if r.asin != row.asin][:k]
+        reduced_seconds += time.perf_counter() - start
+        # End the transaction so the widened ef_search does not apply to the next full search
+        db.rollback()
+
+        hits += len(set(expected) & set(found))
+        total += len(expected)
+
+    count = max(len(queries), 1)
+    return {
+        f"recall@{k}": round(hits / total, 4) if total else 0.0,
+        "queries": len(queries),
+        "full_ms": round(full_seconds / count * 1000, 2),
+        "reduced_ms": round(reduced_seconds / count * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or evaluate the reduced-dimension item index")
+    parser.add_argument("command", choices=["build", "recall"])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from backend.database import SessionLocal
+    db = SessionLocal()
+    try:
+        report: Dict[str, Any] = {}
+        if args.command == "build":
+            global _projection
+            _projection = fit_projection(db)
+            if settings.reduced_projection_path:
+                _projection.save(settings.reduced_projection_path)
+            elif _projection.method == "pca":
+                logger.warning("reduced_projection_path is not set; the PCA projection will not be saved")
+            report.update(build_reduced_index(db, _projection))
+        report.update(evaluate_recall(db, k=args.k, n_queries=args.queries))
+        print(json.dumps(report, indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 """Pydantic schemas for API requests/responses"""
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 
 
@@ -23,6 +23,8 @@ class RecommendationRequest(BaseModel):
     query: str
     session_id: Optional[str] = None
     user_id: Optional[str] = None
+    # Candidates per result for two-stage vector search; trades latency for recall
+    vector_overfetch: Optional[int] = Field(default=None, ge=1, le=100)
 
 
 class RecommendationResponse(BaseModel):
@@ -0,0 +1,241 @@
+"""Precomputed per-category and global top-N candidate lists.
+
+Category and popular recall return the same rows for every query, so they are
+computed in the background and served from memory. A snapshot is one list of
+item rows plus int32 index arrays into it (per category, and the global
+popular list); refreshes build a new snapshot and swap it in atomically. Rows
+are copied into plain ItemRow tuples (floats instead of Decimals, one shared
+string per category name) so the snapshot's size depends only on the columns,
+and they also serve as a hydration cache for recall winners that happen to be
+in a list.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import text
+from backend.config import settings
+from backend.models import POPULAR_ITEMS_PREDICATE, RATED_ITEMS_PREDICATE
+
+logger = logging.getLogger(__name__)
+
+
+class ItemRow(NamedTuple):
+    """Compact copy of an item row with the attributes Candidate.to_dict reads"""
+    asin: str
+    title: str
+    category: Optional[str]
+    brand: Optional[str]
+    price: Optional[float]
+    rating_avg: Optional[float]
+    rating_count: Optional[int]
+    category_path: Optional[List[str]]
+    attributes: Optional[Dict[str, Any]]
+
+
+ITEM_COLUMNS = ", ".join(ItemRow._fields)
+
+# Same ordering as CATEGORY_RECALL_SQL, for every category in one pass
+CATEGORY_TOPN_SQL = text(f"""
+    SELECT {ITEM_COLUMNS}
+    FROM (
+        SELECT
+            {ITEM_COLUMNS},
+            ROW_NUMBER() OVER (
+                PARTITION BY i.category
+                ORDER BY i.rating_avg DESC, i.rating_count DESC
+            ) as rnk
+        FROM lmrc.items i
+        WHERE i.category IS NOT NULL
+            AND {RATED_ITEMS_PREDICATE}
+    ) ranked
+    WHERE ranked.rnk <= :k
+    ORDER BY ranked.category, ranked.rnk
+""")
+
+# Same ordering as POPULAR_RECALL_SQL
+POPULAR_TOPN_SQL = text(f"""
+    SELECT {ITEM_COLUMNS}
+    FROM lmrc.items i
+    WHERE {POPULAR_ITEMS_PREDICATE}
+    ORDER BY i.rating_count DESC, i.rating_avg DESC
+    LIMIT :k
+""")
+
+# Cumulative write counter of lmrc.items, used to detect catalog changes cheaply
+CATALOG_VERSION_SQL = text("""
+    SELECT n_tup_ins + n_tup_upd + n_tup_del
+    FROM pg_stat_user_tables
+    WHERE relid = CAST('lmrc.items' AS regclass)
+""")
+
+
+class _Snapshot:
+    """Immutable top-N lists sharing one row table"""
+
+    __slots__ = ("rows", "row_ids", "by_category", "popular", "built_at")
+
+    def __init__(self, rows: List[ItemRow], row_ids: Dict[str, int], by_category: Dict[str, np.ndarray], popular: np.ndarray):
+        self.rows = rows
+        self.row_ids = row_ids
+        self.by_category = by_category
+        self.popular = popular
+        self.built_at = time.time()
+
+
+class TopNStore:
+    """In-memory top-K items per category and globally, refreshed in the background"""
+
+    def __init__(self, k: Optional[int] = None):
+        self.k = k or settings.topn_store_k
+        self._snapshot: Optional[_Snapshot] = None
+        self._catalog_version: Optional[int] = None
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refreshes = 0
+        self.refresh_seconds = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    def refresh(self, db=None):
+        """Rebuild the lists from the database and swap them in"""
+        from backend.database import SessionLocal
+        with self._refresh_lock:
+            own_session = db is None
+            db = db or SessionLocal()
+            try:
+                start = time.perf_counter()
+                version = db.execute(CATALOG_VERSION_SQL).scalar()
+                rows: List[ItemRow] = []
+                row_ids: Dict[str, int] = {}
+                members: Dict[str, List[int]] = {}
+                categories: Dict[str, str] = {}
+
+                def add(row) -> int:
+                    row_id = row_ids.get(row.asin)
+                    if row_id is None:
+                        row_id = row_ids[row.asin] = len(rows)
+                        category = categories.setdefault(row.category, row.category) if row.category else None
+                        rows.append(ItemRow(
+                            row.asin,
+                            row.title,
+                            category,
+                            row.brand,
+                            float(row.price) if row.price is not None else None,
+                            float(row.rating_avg) if row.rating_avg is not None else None,
+                            row.rating_count,
+                            row.category_path,
+                            row.attributes
+                        ))
+                    return row_id
+
+                for row in db.execute(CATEGORY_TOPN_SQL, {"k": self.k}):
+                    members.setdefault(row.category, []).append(add(row))
+                popular = [add(row) for row in db.execute(POPULAR_TOPN_SQL, {"k": self.k})]
+
+                self._snapshot = _Snapshot(
+                    rows,
+                    row_ids,
+                    {category: np.array(ids, dtype=np.int32) for category, ids in members.items()},
+                    np.array(popular, dtype=np.int32)
+                )
+                self._catalog_version = version
+                self.refreshes += 1
+                self.refresh_seconds = time.perf_counter() - start
+                self.last_error = None
+                logger.info(
+                    f"Top-N store refreshed: {len(members)} categories, {len(rows)} rows "
+                    f"in {self.refresh_seconds:.1f}s"
+                )
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Error refreshing top-N store: {e}")
+                if own_session:
+                    db.rollback()
+            finally:
+                if own_session:
+                    db.close()
+
+    def _catalog_changed(self) -> bool:
+        from backend.database import SessionLocal
+        db = SessionLocal()
+        try:
+            return db.execute(CATALOG_VERSION_SQL).scalar() != self._catalog_version
+        except Exception as e:
+            logger.warning(f"Could not read catalog version: {e}")
+            return False
+        finally:
+            db.close()
+
+    def _run(self):
+        self.refresh()
+        while not self._stop.wait(settings.topn_check_interval_s):
+            if self.age_s() >= settings.topn_refresh_s or self._catalog_changed():
+                self.refresh()
+
+    def start(self):
+        """Build the lists in a background thread and keep them fresh"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="topn-store", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def age_s(self) -> float:
+        snapshot = self._snapshot
+        return time.time() - snapshot.built_at if snapshot else float("inf")
+
+    def category(self, category: str, limit: int) -> Optional[List[ItemRow]]:
+        """Top rows of a category, or None when the store cannot answer"""
+        snapshot = self._snapshot
+        if snapshot is None or limit > self.k:
+            return None
+        ids = snapshot.by_category.get(category)
+        return [snapshot.rows[i] for i in ids[:limit]] if ids is not None else []
+
+    def popular(self, limit: int) -> Optional[List[ItemRow]]:
+        """Top global popular rows, or None when the store cannot answer"""
+        snapshot = self._snapshot
+        if snapshot is None or limit > self.k:
+            return None
+        return [snapshot.rows[i] for i in snapshot.popular[:limit]]
+
+    def rows_by_asin(self, asins: List[str]) -> Dict[str, ItemRow]:
+        """Item rows held by the store for any of `asins`"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {}
+        found = {}
+        for asin in asins:
+            row_id = snapshot.row_ids.get(asin)
+            if row_id is not None:
+                found[asin] = snapshot.rows[row_id]
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        """Size, refresh time and staleness"""
+        snapshot = self._snapshot
+        return {
+            "ready": snapshot is not None,
+            "k": self.k,
+            "categories": len(snapshot.by_category) if snapshot else 0,
+            "rows": len(snapshot.rows) if snapshot else 0,
+            "refreshed_at": snapshot.built_at if snapshot else None,
+            "age_s": round(self.age_s(), 1) if snapshot else None,
+            "refreshes": self.refreshes,
+            "refresh_seconds": round(self.refresh_seconds, 3),
+            "last_error": self.last_error
+        }
+
+
+# Global store instance
+topn_store = TopNStore()
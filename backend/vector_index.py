@@ -0,0 +1,570 @@
+"""In-process vector index over item and review embeddings.
+
+Embeddings are exported once to a raw float32 file and opened with np.memmap,
+so every worker process maps the same page-cache pages instead of holding its
+own copy. Queries are served by blocked matrix products, either over the whole
+matrix ("flat") or over the closest inverted lists of a k-means coarse
+quantizer ("ivf").
+
+With vector_quantization set, searches scan compact int8 or product-quantized
+codes instead (asymmetric distance: the query stays float32), then rerank the
+best candidates exactly against the float32 matrix. Only the reranked rows of
+the float32 file are paged in, so the resident set is dominated by the codes.
+
+Each build writes a new versioned directory (<dir>/<kind>.<timestamp>) and then
+atomically repoints the <dir>/<kind> symlink at it, so files that workers have
+mapped are never rewritten. Workers notice the new target within
+vector_index_check_interval_s and reopen the index.
+
+Usage:
+    python -m backend.vector_index build --kind items
+    python -m backend.vector_index build --kind reviews
+    python -m backend.vector_index stats --kind items
+    python -m backend.vector_index recall --kind items --k 10
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sqlalchemy import select
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_KINDS = ("items", "reviews")
+
+# Rows scored per matrix product; bounds the temporary score buffer
+_BLOCK_ROWS = 65536
+# int8 rows widened to float32 per matrix product; keeps the temporary copy of
+# the codes near 12 MB at 768 dims instead of a full float32 block
+_INT8_SCORE_ROWS = 4096
+# Snapshot versions kept on disk: the current one and its predecessor, for
+# workers that resolved the old link just before a swap
+_KEEP_VERSIONS = 2
+
+
+def _snapshot_path(directory: str, kind: str) -> Path:
+    """Version directory the <directory>/<kind> link currently points to"""
+    return (Path(directory) / kind).resolve()
+
+
+def _versions(directory: Path, kind: str) -> List[Path]:
+    """Snapshot version directories of a kind, oldest first"""
+    versions = [path for path in directory.glob(f"{kind}.*") if path.suffix[1:].isdigit() and path.is_dir()]
+    return sorted(versions, key=lambda path: int(path.suffix[1:]))
+
+
+def _publish(directory: Path, kind: str, version: Path):
+    """Atomically point <directory>/<kind> at a finished version and drop old versions"""
+    link = directory / kind
+    if link.is_dir() and not link.is_symlink():
+        # Snapshot from before versioned builds: keep it as the oldest version
+        link.rename(directory / f"{kind}.0")
+    staging = directory / f".{kind}.link"
+    if staging.is_symlink():
+        staging.unlink()
+    os.symlink(version.name, staging)
+    os.replace(staging, link)
+    # Unlinked files stay valid for processes that still map them
+    for old in _versions(directory, kind)[:-_KEEP_VERSIONS]:
+        if old != version:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    """Unit-normalize rows so a dot product is the cosine similarity"""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first"""
+    if len(scores) > k:
+        top = np.argpartition(-scores, k)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def _kmeans(sample: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means centroids for the IVF coarse quantizer"""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        filled = np.bincount(assign, minlength=n_clusters) > 0
+        # Empty clusters keep their previous centroid
+        centroids[filled] = _normalize(sums[filled])
+    return centroids
+
+
+class Int8Quantizer:
+    """Symmetric per-dimension scalar quantization to int8 (4x smaller)"""
+
+    name = "int8"
+    code_dtype = np.int8
+
+    def __init__(self, scale: Optional[np.ndarray] = None):
+        self.scale = scale
+
+    def code_width(self, dim: int) -> int:
+        return dim
+
+    def train(self, sample: np.ndarray):
+        self.scale = np.maximum(np.abs(sample).max(axis=0), 1e-6).astype(np.float32) / 127.0
+
+    def encode(self, block: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(block / self.scale), -127, 127).astype(np.int8)
+
+    def prepare(self, query: np.ndarray) -> np.ndarray:
+        # Folding the scale into the query keeps scoring a single matrix product
+        return query * self.scale
+
+    def score(self, codes: np.ndarray, prepared: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _INT8_SCORE_ROWS):
+            chunk = codes[start:start + _INT8_SCORE_ROWS]
+            np.matmul(chunk.astype(np.float32), prepared, out=scores[start:start + len(chunk)])
+        return scores
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"scale": self.scale}
+
+
+class ProductQuantizer:
+    """Product quantization: one byte per subspace, scored from lookup tables"""
+
+    name = "pq"
+    code_dtype = np.uint8
+
+    def __init__(self, codebooks: Optional[np.ndarray] = None, subspaces: Optional[int] = None):
+        self.codebooks = codebooks
+        self.subspaces = len(codebooks) if codebooks is not None else subspaces
+
+    def code_width(self, dim: int) -> int:
+        return self.subspaces
+
+    def train(self, sample: np.ndarray):
+        dim = sample.shape[1]
+        if dim % self.subspaces:
+            raise ValueError(f"embed_dim {dim} is not divisible by pq_subspaces {self.subspaces}")
+        sub_dim = dim // self.subspaces
+        n_centroids = min(256, len(sample))
+        rng = np.random.default_rng(0)
+        codebooks = np.zeros((self.subspaces, 256, sub_dim), dtype=np.float32)
+        for m in range(self.subspaces):
+            part = sample[:, m * sub_dim:(m + 1) * sub_dim]
+            centroids = part[rng.choice(len(part), n_centroids, replace=False)].copy()
+            for _ in range(10):
+                assign = self._nearest(part, centroids)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, part)
+                counts = np.bincount(assign, minlength=n_centroids)
+                filled = counts > 0
+                centroids[filled] = sums[filled] / counts[filled, None]
+            codebooks[m, :n_centroids] = centroids
+        self.codebooks = codebooks
+
+    @staticmethod
+    def _nearest(part: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+        return np.argmax(part @ centroids.T - 0.5 * (centroids ** 2).sum(axis=1), axis=1)
+
+    def encode(self, block: np.ndarray) -> np.ndarray:
+        sub_dim = self.codebooks.shape[2]
+        return np.stack([
+            self._nearest(block[:, m * sub_dim:(m + 1) * sub_dim], self.codebooks[m])
+            for m in range(self.subspaces)
+        ], axis=1).astype(np.uint8)
+
+    def prepare(self, query: np.ndarray) -> np.ndarray:
+        # Lookup table of query-subvector x centroid inner products, (subspaces, 256)
+        sub_dim = self.codebooks.shape[2]
+        return np.einsum("mkd,md->mk", self.codebooks, query.reshape(self.subspaces, sub_dim))
+
+    def score(self, codes: np.ndarray, prepared: np.ndarray) -> np.ndarray:
+        return prepared[np.arange(self.subspaces), codes].sum(axis=1)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"codebooks": self.codebooks}
+
+
+def _make_quantizer(name: str, arrays: Optional[Dict[str, np.ndarray]] = None):
+    arrays = arrays or {}
+    if name == "int8":
+        return Int8Quantizer(arrays.get("scale"))
+    if name == "pq":
+        return ProductQuantizer(arrays.get("codebooks"), settings.pq_subspaces)
+    raise ValueError(f"Unknown vector_quantization '{name}'")
+
+
+class VectorIndex:
+    """Memory-mapped embedding matrix with flat or IVF search, optionally over quantized codes"""
+
+    def __init__(self, kind: str, vectors: np.ndarray, asins: List[str], categories: List[Optional[str]],
+                 centroids: Optional[np.ndarray] = None, list_order: Optional[np.ndarray] = None,
+                 list_offsets: Optional[np.ndarray] = None, quantizer=None, codes: Optional[np.ndarray] = None):
+        self.kind = kind
+        self.vectors = vectors
+        self.asins = asins
+        self.category_names = sorted({c for c in categories if c is not None})
+        self.category_codes = {name: i for i, name in enumerate(self.category_names)}
+        # -1 marks rows without a category
+        self.row_category = np.array([self.category_codes.get(c, -1) for c in categories], dtype=np.int32)
+        self._asin_rows: Optional[Dict[str, int]] = None
+        self.centroids = centroids
+        self.list_order = list_order
+        self.list_offsets = list_offsets
+        self.quantizer = quantizer
+        self.codes = codes
+        self._category_rows: Dict[int, np.ndarray] = {}
+        self.measured_recall: Dict[str, float] = {}
+        self.load_seconds = 0.0
+        # Snapshot version this index was opened from, and when that was last checked
+        self.path: Optional[Path] = None
+        self.checked_at = 0.0
+
+    @property
+    def index_type(self) -> str:
+        return "ivf" if self.centroids is not None else "flat"
+
+    # -- querying ---------------------------------------------------------
+
+    def _candidate_rows(self, query: np.ndarray, nprobe: int, code: Optional[int] = None,
+                        needed: int = 0) -> Optional[np.ndarray]:
+        """Rows in the nprobe closest inverted lists, within a category if given (None means every row).
+
+        When the probed lists hold fewer than `needed` rows of the category, all
+        of the category's rows are returned instead: a narrow category's items
+        mostly sit in lists that were not probed.
+        """
+        if self.centroids is None:
+            return None
+        lists = _top_k(self.centroids @ query, min(nprobe, len(self.centroids)))
+        rows = np.concatenate([
+            self.list_order[self.list_offsets[i]:self.list_offsets[i + 1]] for i in lists
+        ])
+        if code is None:
+            return rows
+        rows = rows[self.row_category[rows] == code]
+        return rows if len(rows) >= needed else self._rows_in_category(code)
+
+    def _rows_in_category(self, code: int) -> np.ndarray:
+        rows = self._category_rows.get(code)
+        if rows is None:
+            rows = self._category_rows[code] = np.flatnonzero(self.row_category == code)
+        return rows
+
+    def search_batch(self, queries: np.ndarray, limit: int, category: Optional[str] = None,
+                     nprobe: Optional[int] = None) -> List[List[Tuple[str, float]]]:
+        """Top (asin, cosine similarity) pairs for each query row"""
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        code = None
+        if category is not None:
+            code = self.category_codes.get(category)
+            if code is None:
+                return [[] for _ in queries]
+        nprobe = nprobe or settings.ivf_nprobe
+
+        if self.quantizer is not None:
+            return [self._search_quantized(query, limit, code, nprobe) for query in queries]
+
+        results = []
+        if self.centroids is None:
+            # Flat: one blocked matrix product serves every query in the batch
+            best_rows = [np.zeros(0, dtype=np.int64) for _ in queries]
+            best_scores = [np.zeros(0, dtype=np.float32) for _ in queries]
+            for start in range(0, len(self.vectors), _BLOCK_ROWS):
+                block = np.asarray(self.vectors[start:start + _BLOCK_ROWS])
+                scores = queries @ block.T
+                if code is not None:
+                    scores[:, self.row_category[start:start + len(block)] != code] = -np.inf
+                for q in range(len(queries)):
+                    top = _top_k(scores[q], limit)
+                    rows = np.concatenate([best_rows[q], top + start])
+                    merged = np.concatenate([best_scores[q], scores[q][top]])
+                    keep = _top_k(merged, limit)
+                    best_rows[q], best_scores[q] = rows[keep], merged[keep]
+            for rows, scores in zip(best_rows, best_scores):
+                results.append([
+                    (self.asins[r], float(s)) for r, s in zip(rows, scores) if np.isfinite(s)
+                ])
+            return results
+
+        for query in queries:
+            rows = np.sort(self._candidate_rows(query, nprobe, code, limit))  # sequential page access on the mmap
+            scores = np.asarray(self.vectors[rows]) @ query
+            top = _top_k(scores, limit)
+            results.append([(self.asins[rows[i]], float(scores[i])) for i in top])
+        return results
+
+    def _search_quantized(self, query: np.ndarray, limit: int, code: Optional[int], nprobe: int) -> List[Tuple[str, float]]:
+        """Approximate scores from the codes, then exact rerank of the best candidates"""
+        prepared = self.quantizer.prepare(query)
+        n_candidates = limit * settings.vector_rerank_factor
+        rows = self._candidate_rows(query, nprobe, code, limit)
+        if rows is None:
+            cand_rows, cand_scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+            for start in range(0, len(self.codes), _BLOCK_ROWS):
+                scores = self.quantizer.score(np.asarray(self.codes[start:start + _BLOCK_ROWS]), prepared)
+                if code is not None:
+                    scores[self.row_category[start:start + len(scores)] != code] = -np.inf
+                top = _top_k(scores, n_candidates)
+                cand_rows = np.concatenate([cand_rows, top + start])
+                cand_scores = np.concatenate([cand_scores, scores[top]])
+                keep = _top_k(cand_scores, n_candidates)
+                cand_rows, cand_scores = cand_rows[keep], cand_scores[keep]
+            cand_rows = cand_rows[np.isfinite(cand_scores)]
+        else:
+            rows = np.sort(rows)
+            scores = self.quantizer.score(np.asarray(self.codes[rows]), prepared)
+            cand_rows = rows[_top_k(scores, n_candidates)]
+
+        cand_rows = np.sort(cand_rows)
+        exact = np.asarray(self.vectors[cand_rows]) @ query
+        top = _top_k(exact, limit)
+        return [(self.asins[cand_rows[i]], float(exact[i])) for i in top]
+
+    def search(self, query: List[float], limit: int, category: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Top (asin, cosine similarity) pairs for one query"""
+        return self.search_batch(np.asarray(query, dtype=np.float32), limit, category)[0]
+
+    def category_of(self, asin: str) -> Optional[str]:
+        """Category stored with an indexed asin (None if unknown)"""
+        if self._asin_rows is None:
+            self._asin_rows = {a: row for row, a in enumerate(self.asins)}
+        row = self._asin_rows.get(asin)
+        code = self.row_category[row] if row is not None else -1
+        return self.category_names[code] if code >= 0 else None
+
+    def is_stale(self, directory: str) -> bool:
+        """Whether a newer snapshot has been published since this index was opened"""
+        return self.path is not None and _snapshot_path(directory, self.kind) != self.path
+
+    # -- building and persistence -----------------------------------------
+
+    @staticmethod
+    def _source(kind: str):
+        from backend.models import Item, ItemEmbedding, ReviewSummary
+        if kind == "items":
+            return (
+                select(ItemEmbedding.asin, ItemEmbedding.embedding, Item.category)
+                .join(Item, Item.asin == ItemEmbedding.asin)
+            )
+        return (
+            select(ReviewSummary.asin, ReviewSummary.embedding, Item.category)
+            .join(Item, Item.asin == ReviewSummary.asin)
+            .where(ReviewSummary.embedding.isnot(None))
+        )
+
+    @classmethod
+    def build(cls, db, kind: str, directory: str, index_type: Optional[str] = None) -> "VectorIndex":
+        """Export embeddings from PostgreSQL into a new snapshot version, publish and open it"""
+        from sqlalchemy import func
+        start = time.perf_counter()
+        path = Path(directory) / f"{kind}.{time.time_ns()}"
+        path.mkdir(parents=True)
+        source = cls._source(kind)
+        count = db.execute(select(func.count()).select_from(source.subquery())).scalar()
+        dim = settings.embed_dim
+
+        vectors = np.memmap(path / "vectors.f32", dtype=np.float32, mode="w+", shape=(max(count, 1), dim))
+        asins: List[str] = []
+        categories: List[Optional[str]] = []
+        for row in db.execute(source, execution_options={"yield_per": 10000}):
+            if len(asins) >= count:
+                break
+            embedding = row.embedding
+            if hasattr(embedding, "to_numpy"):  # halfvec columns load as HalfVector
+                embedding = embedding.to_numpy()
+            vectors[len(asins)] = _normalize(np.asarray(embedding, dtype=np.float32))
+            asins.append(row.asin)
+            categories.append(row.category)
+        vectors.flush()
+        del vectors
+
+        meta = {"dim": dim, "rows": len(asins), "asins": asins, "categories": categories}
+        (path / "meta.json").write_text(json.dumps(meta))
+
+        if (index_type or settings.vector_index_type) == "ivf" and asins:
+            matrix = np.memmap(path / "vectors.f32", dtype=np.float32, mode="r", shape=(len(asins), dim))
+            n_lists = min(settings.ivf_nlist, len(asins))
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(rng.choice(len(asins), min(len(asins), n_lists * 64), replace=False))
+            centroids = _kmeans(np.asarray(matrix[sample_rows]), n_lists)
+            assign = np.concatenate([
+                np.argmax(np.asarray(matrix[s:s + _BLOCK_ROWS]) @ centroids.T, axis=1)
+                for s in range(0, len(asins), _BLOCK_ROWS)
+            ])
+            list_order = np.argsort(assign, kind="stable").astype(np.int64)
+            list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+            np.cumsum(np.bincount(assign, minlength=n_lists), out=list_offsets[1:])
+            np.savez(path / "ivf.npz", centroids=centroids, list_order=list_order, list_offsets=list_offsets)
+
+        if settings.vector_quantization != "none" and asins:
+            cls._quantize(path, len(asins), dim)
+
+        logger.info(f"Vector index '{kind}' exported: {len(asins)} rows in {time.perf_counter() - start:.1f}s")
+        index = cls.open(path, kind)
+        if index.quantizer is not None:
+            # Record what quantization costs against exact search on this data
+            index.measured_recall = evaluate_recall(index)
+            meta["recall"] = index.measured_recall
+            (path / "meta.json").write_text(json.dumps(meta))
+            logger.info(f"Vector index '{kind}' {index.quantizer.name} recall: {index.measured_recall}")
+        _publish(Path(directory), kind, path)
+        logger.info(f"Vector index '{kind}' published as {path.name}")
+        return index
+
+    @staticmethod
+    def _quantize(path: Path, rows: int, dim: int):
+        """Train the configured quantizer on a sample and encode every row"""
+        matrix = np.memmap(path / "vectors.f32", dtype=np.float32, mode="r", shape=(rows, dim))
+        quantizer = _make_quantizer(settings.vector_quantization)
+        rng = np.random.default_rng(1)
+        sample_rows = np.sort(rng.choice(rows, min(rows, 65536), replace=False))
+        quantizer.train(np.asarray(matrix[sample_rows]))
+
+        codes = np.memmap(path / "codes.bin", dtype=quantizer.code_dtype, mode="w+",
+                          shape=(rows, quantizer.code_width(dim)))
+        for start in range(0, rows, _BLOCK_ROWS):
+            codes[start:start + _BLOCK_ROWS] = quantizer.encode(np.asarray(matrix[start:start + _BLOCK_ROWS]))
+        codes.flush()
+        np.savez(path / "quantizer.npz", name=np.array(quantizer.name), **quantizer.arrays())
+
+    @classmethod
+    def load(cls, directory: str, kind: str) -> "VectorIndex":
+        """Open the current snapshot of a kind"""
+        return cls.open(_snapshot_path(directory, kind), kind)
+
+    @classmethod
+    def open(cls, path: Path, kind: str) -> "VectorIndex":
+        """Open one snapshot version read-only; the OS shares its pages across processes"""
+        start = time.perf_counter()
+        meta = json.loads((path / "meta.json").read_text())
+        vectors = np.memmap(path / "vectors.f32", dtype=np.float32, mode="r", shape=(meta["rows"], meta["dim"]))
+        ivf = {}
+        if (path / "ivf.npz").exists():
+            with np.load(path / "ivf.npz", allow_pickle=False) as data:
+                ivf = {name: data[name] for name in ("centroids", "list_order", "list_offsets")}
+        quantizer, codes = None, None
+        if (path / "quantizer.npz").exists():
+            with np.load(path / "quantizer.npz", allow_pickle=False) as data:
+                quantizer = _make_quantizer(str(data["name"]), {k: data[k] for k in data.files if k != "name"})
+            codes = np.memmap(path / "codes.bin", dtype=quantizer.code_dtype, mode="r",
+                              shape=(meta["rows"], quantizer.code_width(meta["dim"])))
+        index = cls(kind, vectors, meta["asins"], meta["categories"], quantizer=quantizer, codes=codes, **ivf)
+        index.measured_recall = meta.get("recall", {})
+        index.path = path
+        index.load_seconds = time.perf_counter() - start
+        logger.info(f"Vector index '{kind}' ({index.index_type}) loaded in {index.load_seconds:.1f}s")
+        return index
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and layout of the index"""
+        return {
+            "type": self.index_type,
+            "rows": len(self.asins),
+            "dim": int(self.vectors.shape[1]),
+            "mapped_bytes": int(self.vectors.nbytes),
+            "ivf_lists": len(self.centroids) if self.centroids is not None else 0,
+            "quantization": self.quantizer.name if self.quantizer is not None else "none",
+            "code_bytes": int(self.codes.nbytes) if self.codes is not None else 0,
+            "recall": self.measured_recall,
+            "snapshot": self.path.name if self.path is not None else None,
+            "load_seconds": round(self.load_seconds, 3)
+        }
+
+
+def evaluate_recall(index: VectorIndex, k: int = 10, n_queries: int = 200, seed: int = 2) -> Dict[str, float]:
+    """recall@k of the index's configured search against exact flat search.
+
+    Queries are stored rows, so each query's own row is excluded from both
+    result lists to avoid inflating the number.
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(index.asins), min(n_queries, len(index.asins)), replace=False))
+    queries = np.asarray(index.vectors[rows])
+    exact = VectorIndex(index.kind, index.vectors, index.asins, [None] * len(index.asins))
+    truths = exact.search_batch(queries, k + 1)
+    hits = 0
+    total = 0
+    for row, query, truth in zip(rows, queries, truths):
+        own = index.asins[row]
+        expected = [asin for asin, _ in truth if asin != own][:k]
+        found = [asin for asin, _ in index.search(query, k + 1) if asin != own][:k]
+        hits += len(set(expected) & set(found))
+        total += len(expected)
+    return {f"recall@{k}": round(hits / total, 4) if total else 0.0, "queries": len(rows)}
+
+
+_indexes: Dict[str, VectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_vector_index(kind: str) -> VectorIndex:
+    """Process-wide index of the given kind, opened from settings.vector_index_dir.
+
+    Reopened when a rebuild has published a new snapshot; searches already
+    running keep the previous index, whose mapped files stay valid.
+    """
+    index = _indexes.get(kind)
+    if index is not None and time.monotonic() - index.checked_at < settings.vector_index_check_interval_s:
+        return index
+    with _indexes_lock:
+        index = _indexes.get(kind)
+        if index is None or index.is_stale(settings.vector_index_dir):
+            if not settings.vector_index_dir:
+                raise RuntimeError("vector_backend='memory' requires vector_index_dir")
+            index = _indexes[kind] = VectorIndex.load(settings.vector_index_dir, kind)
+        index.checked_at = time.monotonic()
+    return index
+
+
+def loaded_vector_indexes() -> Dict[str, Dict[str, Any]]:
+    """Stats of the indexes opened so far"""
+    return {kind: index.stats() for kind, index in _indexes.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the in-process vector index")
+    parser.add_argument("command", choices=["build", "stats", "recall"])
+    parser.add_argument("--k", type=int, default=10, help="k for the recall command")
+    parser.add_argument("--kind", choices=INDEX_KINDS, default="items")
+    parser.add_argument("--dir", default=settings.vector_index_dir, help="snapshot directory")
+    parser.add_argument("--type", choices=["flat", "ivf"], default=None, help="defaults to vector_index_type")
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("--dir is required when vector_index_dir is not configured")
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "build":
+        from backend.database import SessionLocal
+        db = SessionLocal()
+        try:
+            index = VectorIndex.build(db, args.kind, args.dir, args.type)
+        finally:
+            db.close()
+    else:
+        index = VectorIndex.load(args.dir, args.kind)
+        if args.command == "recall":
+            index.measured_recall = evaluate_recall(index, k=args.k)
+    print(json.dumps(index.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
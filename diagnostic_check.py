@@ -3,6 +3,7 @@
 import sys
 import logging
 from backend.database import init_db, get_db
+from backend.candidate import candidates_to_dicts
 from backend.recommendation_engine import RecommendationEngine
 from backend.ollama_client import ollama_client
 from sqlalchemy import text
@@ -77,7 +78,7 @@ def test_keyword_search():
         
         for keywords in test_keywords:
             print(f"\nSearching for keywords: {keywords}")
-            results = rec_engine.keyword_search(keywords, limit=5)
+            results = candidates_to_dicts(rec_engine.hydrate_candidates(rec_engine.keyword_search(keywords, limit=5)))
             print(f"  Found {len(results)} results")
             for i, item in enumerate(results[:3], 1):
                 print(f"    [{i}] {item['title'][:40]}...")
@@ -120,8 +121,8 @@ def test_full_recommendation_flow():
             print("\n[Step 2] Embedding Generation:")
             try:
                 embedding = ollama_client.embed_text(intent if intent != query else query)
-                print(f"  Embedding dimension: {len(embedding) if embedding else 0}")
-                print(f"  Valid: {'✓' if embedding else '✗'}")
+                print(f"  Embedding dimension: {len(embedding)}")
+                print(f"  Valid: {'✓' if len(embedding) else '✗'}")
             except Exception as e:
                 print(f"  Error: {e}")
                 embedding = []
@@ -49,8 +49,8 @@ def test_recommendations():
                 print("\n[2] Embedding Generation:")
                 from backend.ollama_client import ollama_client
                 embedding = ollama_client.embed_text(intent if intent != query else query)
-                print(f"   Embedding dimension: {len(embedding) if embedding else 0}")
-                print(f"   Embedding valid: {bool(embedding)}")
+                print(f"   Embedding dimension: {len(embedding)}")
+                print(f"   Embedding valid: {len(embedding) > 0}")
                 
                 # Test recommendations
                 print("\n[3] Recommendations:")
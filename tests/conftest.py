@@ -0,0 +1,29 @@
+"""Unit tests for the DB-free building blocks (fusion, indexes, caches).
+
+Run with `python -m pytest tests`; the root-level test_*.py scripts need a
+live database and Ollama and are not part of this suite.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class FakeClock:
+    """Stands in for a module's `time` import; tests advance `now` by hand"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,86 @@
+"""BM25 index scoring, incremental updates and snapshots"""
+import pytest
+
+from backend.bm25_index import BM25Index, tokenize
+
+ROWS = [
+    ("A1", "Wireless Bluetooth Speaker", "Electronics"),
+    ("A2", "Bluetooth Headphones with Mic", "Electronics"),
+    ("A3", "Chef Knife 8 inch", "Home_and_Kitchen"),
+    ("A4", "Python Programming Book", "Books"),
+    ("A5", "Portable Speaker Stand", "Electronics"),
+]
+
+
+def _scores(index, keywords, category=None):
+    return {asin: score for asin, score, _ in index.search(keywords, 10, category)}
+
+
+def test_tokenize_splits_words_and_cjk_characters():
+    assert tokenize("USB-C 充电器 2m") == ["usb", "c", "充", "电", "器", "2m"]
+    assert tokenize("") == []
+
+
+def test_search_ranks_matching_documents():
+    index = BM25Index.build(ROWS)
+    hits = index.search(["bluetooth speaker"], 10)
+
+    assert hits[0][0] == "A1"  # matches both terms
+    assert {asin for asin, _, _ in hits} == {"A1", "A2", "A5"}
+    assert hits[0][2] == "Electronics"
+    assert index.search(["nonexistent"], 10) == []
+
+
+def test_search_filters_by_category():
+    index = BM25Index.build(ROWS)
+
+    assert set(_scores(index, ["speaker", "knife"], "Home_and_Kitchen")) == {"A3"}
+    assert index.search(["speaker"], 10, "Unknown") == []
+
+
+def test_upsert_scores_like_a_rebuild():
+    index = BM25Index.build(ROWS)
+    index.upsert("A2", "Noise Cancelling Headphones", "Electronics")
+    index.upsert("A6", "Bluetooth Car Adapter", "Automotive")
+    rebuilt = BM25Index.build([
+        ROWS[0], ("A2", "Noise Cancelling Headphones", "Electronics"), *ROWS[2:],
+        ("A6", "Bluetooth Car Adapter", "Automotive"),
+    ])
+
+    for keywords in (["bluetooth"], ["headphones"], ["speaker adapter"]):
+        assert _scores(index, keywords) == pytest.approx(_scores(rebuilt, keywords))
+
+
+def test_removed_documents_do_not_count_towards_document_frequency():
+    index = BM25Index.build(ROWS)
+    index.remove("A2")
+    rebuilt = BM25Index.build([row for row in ROWS if row[0] != "A2"])
+
+    assert "A2" not in _scores(index, ["bluetooth"])
+    assert _scores(index, ["bluetooth"]) == pytest.approx(_scores(rebuilt, ["bluetooth"]))
+
+
+def test_compact_drops_tombstoned_postings():
+    index = BM25Index.build(ROWS)
+    before = index.stats()["postings"]
+    index.upsert("A4", "Python Cookbook", "Books")
+    index.compact()
+
+    assert index.stats()["postings"] == before - 3 + 2
+    assert index.stats()["delta_terms"] == 0
+    assert set(_scores(index, ["python"])) == {"A4"}
+
+
+def test_snapshot_round_trip(tmp_path):
+    index = BM25Index.build(ROWS)
+    index.upsert("A6", "Bluetooth Car Adapter", "Automotive")
+    index.remove("A3")
+    path = str(tmp_path / "bm25.npz")
+    index.save(path)
+
+    loaded = BM25Index.load(path)
+
+    assert loaded.live_docs == index.live_docs
+    assert loaded.snapshot_mtime is not None
+    for keywords in (["bluetooth"], ["knife"], ["car"]):
+        assert _scores(loaded, keywords) == pytest.approx(_scores(index, keywords))
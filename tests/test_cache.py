@@ -0,0 +1,114 @@
+"""In-process caches: LRU/TTL, persistent embeddings, stale-while-revalidate"""
+import numpy as np
+import pytest
+
+from backend import cache
+from backend.cache import EmbeddingCache, StaleWhileRevalidateCache, TTLCache, normalize_text
+
+
+@pytest.fixture(autouse=True)
+def fake_time(clock, monkeypatch):
+    monkeypatch.setattr(cache, "time", clock)
+
+
+def test_normalize_text():
+    assert normalize_text("  ＰＣ   laptop\n") == "PC laptop"
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    store = TTLCache(max_entries=2, ttl_s=60)
+    store.set("a", 1)
+    store.set("b", 2)
+    assert store.get("a") == 1
+    store.set("c", 3)
+
+    assert store.get("b") is None
+    assert store.get("a") == 1 and store.get("c") == 3
+    assert store.stats()["evictions"] == 1
+
+
+def test_ttl_cache_expires_entries(clock):
+    store = TTLCache(max_entries=10, ttl_s=60)
+    store.set("a", 1)
+    clock.now += 61
+
+    assert store.get("a") is None
+    assert store.stats()["expirations"] == 1
+
+
+def test_embedding_cache_persists_across_instances(tmp_path, clock):
+    path = str(tmp_path / "embeddings.sqlite")
+    stored = EmbeddingCache(10, 3600, path).put("model", " hello  world ", [0.5, 0.25])
+
+    restarted = EmbeddingCache(10, 3600, path)
+
+    assert stored.dtype == np.float32
+    np.testing.assert_array_equal(restarted.get("model", "hello world"), stored)
+    assert restarted.persistent_hits == 1
+    assert restarted.get("other-model", "hello world") is None
+    clock.now += 3601
+    assert EmbeddingCache(10, 3600, path).get("model", "hello world") is None
+
+
+def test_cached_embeddings_are_read_only_copies(tmp_path):
+    cache_ = EmbeddingCache(10, 3600, str(tmp_path / "embeddings.sqlite"))
+    source = np.array([0.5, 0.25], dtype=np.float32)
+    stored = cache_.put("model", "text", source)
+    source[0] = 9.0
+
+    with pytest.raises(ValueError):
+        stored /= 2
+    assert cache_.get("model", "text").tolist() == [0.5, 0.25]
+    assert not EmbeddingCache(10, 3600, str(tmp_path / "embeddings.sqlite")).get("model", "text").flags.writeable
+
+
+def test_persistent_tier_drops_expired_and_oldest_rows(tmp_path, clock, monkeypatch):
+    path = str(tmp_path / "embeddings.sqlite")
+    monkeypatch.setattr(EmbeddingCache, "PRUNE_EVERY", 3)
+    first = EmbeddingCache(10, 3600, path, persist_max_entries=2)
+    for i in range(3):
+        clock.now += 1
+        first.put("model", f"text {i}", [float(i)])
+
+    assert first.stats()["persistent_pruned"] == 1
+    restarted = EmbeddingCache(10, 3600, path, persist_max_entries=2)
+    assert restarted.get("model", "text 0") is None
+    assert restarted.get("model", "text 2") is not None
+
+    clock.now += 3601
+    expired = EmbeddingCache(10, 3600, path)
+    assert expired.stats()["persistent_pruned"] == 2
+    assert expired._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 0
+
+
+def test_swr_cache_computes_once_while_fresh(clock):
+    store = StaleWhileRevalidateCache(10, ttl_s=60, stale_ttl_s=60)
+    calls = []
+
+    assert store.get_or_compute("k", lambda: calls.append(1) or "value") == "value"
+    assert store.get_or_compute("k", lambda: calls.append(1) or "other") == "value"
+    assert len(calls) == 1
+
+
+def test_swr_cache_serves_stale_entries_while_refreshing(clock):
+    store = StaleWhileRevalidateCache(10, ttl_s=60, stale_ttl_s=60)
+    store.get_or_compute("k", lambda: "old")
+    clock.now += 90
+
+    assert store.get_or_compute("k", lambda: "new") == "old"
+    store._refresh_pool.shutdown(wait=True)
+    assert store.get_or_compute("k", lambda: "unused") == "new"
+    assert store.stats()["refreshes"] == 1
+
+
+def test_swr_cache_does_not_cache_failures(clock):
+    store = StaleWhileRevalidateCache(10, ttl_s=60, stale_ttl_s=60)
+    store.get_or_compute("k", lambda: "old")
+    clock.now += 200
+
+    def fail():
+        raise RuntimeError("llm down")
+
+    with pytest.raises(RuntimeError):
+        store.get_or_compute("k", fail)
+    assert store.get_or_compute("k", lambda: "new") == "new"
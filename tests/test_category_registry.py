@@ -0,0 +1,73 @@
+"""Category catalog lookups and load-failure backoff"""
+from types import SimpleNamespace
+
+import pytest
+
+from backend import category_registry as registry_module
+from backend.category_registry import CategoryRegistry, category_key
+
+
+class FakeSession:
+    def __init__(self, rows=None, error=None):
+        self.rows = rows or []
+        self.error = error
+        self.queries = 0
+
+    def execute(self, statement):
+        self.queries += 1
+        if self.error:
+            raise self.error
+        return self.rows
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fake_time(clock, monkeypatch):
+    monkeypatch.setattr(registry_module, "time", clock)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = FakeSession()
+    import backend.database
+    monkeypatch.setattr(backend.database, "SessionLocal", lambda: session)
+    return session
+
+
+def test_category_key_ignores_case_and_separators():
+    assert category_key("HOME AND KITCHEN") == category_key("Home_and_Kitchen") == "home_and_kitchen"
+
+
+def test_resolves_names_and_counts(clock):
+    registry = CategoryRegistry()
+    registry.refresh(FakeSession([
+        SimpleNamespace(category="Books", item_count=3),
+        SimpleNamespace(category="Home_and_Kitchen", item_count=1),
+    ]))
+
+    assert registry.resolve("home and kitchen") == "Home_and_Kitchen"
+    assert registry.count("Books") == 3
+    assert not registry.exists("Toys")
+    assert registry.distribution() == {"Books": 0.75, "Home_and_Kitchen": 0.25}
+
+
+def test_failed_load_is_not_retried_until_the_refresh_interval(clock, session, monkeypatch):
+    monkeypatch.setattr(registry_module.settings, "category_registry_ttl_s", 600)
+    session.error = RuntimeError("db down")
+    registry = CategoryRegistry()
+
+    assert registry.resolve("Books") is None
+    assert registry.resolve("Books") is None
+    assert session.queries == 1
+
+    clock.now += 601
+    session.error = None
+    session.rows = [SimpleNamespace(category="Books", item_count=2)]
+    assert registry.resolve("Books") == "Books"
+    assert session.queries == 2
+    assert registry.failed_at is None
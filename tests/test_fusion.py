@@ -0,0 +1,101 @@
+"""CandidatePool fusion against the per-item scoring loop it replaced"""
+import numpy as np
+import pytest
+
+from backend.candidate import Candidate
+from backend.fusion import PATH_WEIGHTS, CandidatePool, rrf_fusion, top_n
+
+
+def legacy_scores(paths):
+    """The dict-based loop multi_path_recommend used before CandidatePool"""
+    all_candidates = []
+    by_asin = {}
+    for path, results in paths:
+        sim_weight, rank_weight, boost = PATH_WEIGHTS[path]
+        for idx, (asin, similarity) in enumerate(results):
+            if asin not in by_asin:
+                item = {"asin": asin, "score": similarity * sim_weight + (1 - idx / max(len(results), 1)) * rank_weight}
+                all_candidates.append(item)
+                by_asin[asin] = item
+            elif boost:
+                by_asin[asin]["score"] = min(1.0, by_asin[asin]["score"] + boost)
+    all_candidates.sort(key=lambda x: x["score"], reverse=True)
+    return [(item["asin"], item["score"]) for item in all_candidates]
+
+
+def make_pool(paths) -> CandidatePool:
+    pool = CandidatePool()
+    for path, results in paths:
+        pool.add([Candidate(asin, None, similarity, path) for asin, similarity in results], *PATH_WEIGHTS[path])
+    return pool
+
+
+@pytest.mark.parametrize("paths", [
+    # Overlapping paths: keyword and review hits boost earlier candidates
+    [
+        ("vector", [("A", 0.91), ("B", 0.85), ("C", 0.40)]),
+        ("keyword", [("C", 0.70), ("D", 0.65), ("A", 0.60)]),
+        ("review_embedding", [("D", 0.80), ("E", 0.50)]),
+        ("popular", [("F", 0.30), ("B", 0.20)]),
+    ],
+    # Repeated boosts are capped at 1.0
+    [
+        ("vector", [("A", 0.99), ("B", 0.98)]),
+        ("keyword", [("A", 0.9), ("B", 0.9)]),
+        ("category", [("A", 0.9), ("B", 0.9)]),
+        ("review_embedding", [("A", 0.9)]),
+    ],
+    # Equal scores keep the order candidates were first added in
+    [
+        ("category", [("A", 0.5), ("B", 0.5)]),
+        ("category_fallback", [("C", 0.5), ("D", 0.5)]),
+        ("popular", [("E", 0.0)]),
+    ],
+    # Empty paths in between
+    [("vector", []), ("keyword", [("A", 0.4)]), ("category", []), ("popular", [("B", 0.4), ("A", 0.1)])],
+], ids=["overlap", "capped-boost", "ties", "empty-paths"])
+@pytest.mark.parametrize("limit", [1, 3, 20])
+def test_weighted_fusion_matches_legacy_loop(paths, limit):
+    expected = legacy_scores(paths)[:limit]
+
+    fused = make_pool(paths).fuse(limit, "weighted")
+
+    assert [item.asin for item in fused] == [asin for asin, _ in expected]
+    np.testing.assert_allclose([item.score for item in fused], [score for _, score in expected], rtol=0, atol=1e-12)
+
+
+def test_fuse_keeps_first_appearance_metadata():
+    pool = make_pool([
+        ("vector", [("A", 0.9), ("B", 0.5)]),
+        ("keyword", [("B", 0.7), ("C", 0.6)]),
+    ])
+    fused = {item.asin: item for item in pool.fuse(10, "weighted")}
+
+    assert fused["B"].recall_path == "vector"
+    assert fused["B"].similarity == 0.5
+    assert pool.path_counts() == {"vector": 2, "keyword": 1}
+
+
+def test_rrf_fusion_sums_weighted_reciprocal_ranks(monkeypatch):
+    from backend.config import settings
+    monkeypatch.setattr(settings, "rrf_k", 60)
+    pool = CandidatePool()
+    pool.add([Candidate("A", None, 0.9, "vector"), Candidate("B", None, 0.8, "vector")], 0.6, 0.4)
+    pool.add([Candidate("B", None, 0.7, "keyword")], 0.7, 0.3, 0.3)
+
+    scores = rrf_fusion(pool)
+
+    assert scores[0] == pytest.approx(1.0 / 61)
+    assert scores[1] == pytest.approx(1.0 / 62 + 1.0 / 61)
+
+
+def test_empty_pool_fuses_to_nothing():
+    assert CandidatePool().fuse(5) == []
+
+
+def test_top_n_orders_best_first_and_breaks_ties_by_insertion():
+    scores = np.array([0.5, 0.9, 0.5, 0.1, 0.9, 0.5])
+
+    assert top_n(scores, 3).tolist() == [1, 4, 0]
+    assert top_n(scores, 4).tolist() == [1, 4, 0, 2]
+    assert top_n(scores, 10).tolist() == [1, 4, 0, 2, 5, 3]
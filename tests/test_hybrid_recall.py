@@ -0,0 +1,62 @@
+"""Shape and parameters of the single-statement vector + full-text RRF recall"""
+import re
+from types import SimpleNamespace
+
+import numpy as np
+
+from backend.config import settings
+from backend.recommendation_engine import EF_SEARCH_SQL, HYBRID_RECALL_SQL, RecommendationEngine
+
+
+class RecordingSession:
+    """Records executed statements and returns canned rows for the recall query"""
+
+    def __init__(self, rows=(), error=None):
+        self.rows = list(rows)
+        self.error = error
+        self.executed = []
+        self.rolled_back = False
+
+    def execute(self, statement, params=None):
+        self.executed.append((statement, params))
+        if statement is HYBRID_RECALL_SQL:
+            if self.error:
+                raise self.error
+            return self.rows
+        return []
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+def test_sql_fuses_both_sides_with_reciprocal_rank():
+    sql = " ".join(str(HYBRID_RECALL_SQL).split())
+
+    assert re.search(r"WITH vec AS \(.*\), lex AS \(.*\), fused AS \(", sql)
+    assert "SELECT * FROM vec UNION ALL SELECT * FROM lex" in sql
+    assert "SUM(1.0 / (:rrf_k + u.rnk))" in sql
+    # Both sides are bounded by the same candidate count before fusion
+    assert sql.count("LIMIT :candidates") == 2
+
+
+def test_binds_every_parameter_and_widens_ef_search():
+    session = RecordingSession([SimpleNamespace(asin="A1", category="Books", rrf_score=0.03)])
+    engine = RecommendationEngine(session)
+
+    hits = engine.hybrid_search(np.ones(4, dtype=np.float32), ["usb cable", "charger"], limit=120)
+
+    (ef_statement, ef_params), (statement, params) = session.executed
+    assert ef_statement is EF_SEARCH_SQL and ef_params == {"ef_search": "120"}
+    assert statement is HYBRID_RECALL_SQL
+    assert set(params) == set(HYBRID_RECALL_SQL.compile().params)
+    assert params["query"] == '"usb cable" or charger'
+    assert params["candidates"] == params["limit"] == 120
+    assert params["rrf_k"] == settings.rrf_k
+    assert [(hit.asin, hit.category, hit.recall_path) for hit in hits] == [("A1", "Books", "hybrid")]
+
+
+def test_failure_rolls_back_and_returns_no_candidates():
+    session = RecordingSession(error=RuntimeError("column search_tsv does not exist"))
+
+    assert RecommendationEngine(session).hybrid_search(np.ones(4, dtype=np.float32), ["usb"]) == []
+    assert session.rolled_back
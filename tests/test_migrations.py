@@ -0,0 +1,40 @@
+"""Startup check that embedding columns match the configured vector_storage"""
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from backend.migrations import check_embedding_storage
+from backend.models import EMBEDDING_SQL_TYPE
+
+
+class FakeEngine:
+    """Answers the column-type query with a fixed type per table"""
+
+    def __init__(self, types=None, error=None):
+        self.types = types or {}
+        self.error = error
+
+    @contextmanager
+    def connect(self):
+        if self.error:
+            raise self.error
+        yield SimpleNamespace(execute=lambda statement, params: SimpleNamespace(
+            scalar=lambda: self.types.get(params["table"])
+        ))
+
+
+def test_matching_or_missing_columns_pass():
+    check_embedding_storage(FakeEngine({"lmrc.item_embeddings": EMBEDDING_SQL_TYPE}))
+
+
+def test_unconverted_column_refuses_to_start():
+    other = "halfvec(768)" if EMBEDDING_SQL_TYPE.startswith("vector") else "vector(768)"
+    engine = FakeEngine({"lmrc.item_embeddings": EMBEDDING_SQL_TYPE, "lmrc.reviews_summary": other})
+
+    with pytest.raises(RuntimeError, match=r"lmrc.reviews_summary.embedding is .*backend.migrations"):
+        check_embedding_storage(engine)
+
+
+def test_unreachable_database_is_not_fatal():
+    check_embedding_storage(FakeEngine(error=OSError("connection refused")))
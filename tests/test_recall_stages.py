@@ -0,0 +1,65 @@
+"""Recall stage execution: the shared stage deadline and which paths each stage runs"""
+import time
+
+import numpy as np
+import pytest
+
+from backend.candidate import Candidate
+from backend.config import settings
+from backend.recall_executor import RecallExecutor
+from backend.recommendation_engine import RecommendationEngine
+
+
+def test_stage_timeout_is_one_deadline_for_all_paths(monkeypatch):
+    monkeypatch.setattr(settings, "recall_concurrency", True)
+    monkeypatch.setattr(settings, "recall_timeout_s", 0.2)
+    executor = RecallExecutor(max_workers=4)
+
+    def slow():
+        time.sleep(1)
+        return ["late"]
+
+    def fail():
+        raise RuntimeError("db down")
+
+    start = time.perf_counter()
+    results = executor.run({"a": slow, "b": slow, "c": lambda: ["ok"], "d": fail})
+    elapsed = time.perf_counter() - start
+    executor.shutdown()
+
+    assert results == {"a": [], "b": [], "c": ["ok"], "d": []}
+    assert elapsed < 0.8
+
+
+def run_stages(results_by_path, target_category):
+    """Drive _multi_path_stages with canned results; return the paths each stage asked for"""
+    engine = RecommendationEngine(None)
+    stages = engine._multi_path_stages("query", np.ones(4, dtype=np.float32), ["word"], target_category, None)
+    requested = []
+    try:
+        stage = next(stages)
+        while True:
+            requested.append(sorted(stage))
+            stage = stages.send({
+                name: args[0] if name == "hydrate" else results_by_path.get(name, [])
+                for name, (_, args, _) in stage.items()
+            })
+    except StopIteration as done:
+        return requested, done.value
+
+
+def candidates(path, n, category="Books"):
+    return [Candidate(f"{path}{i}", category, 0.9 - i / 100, path, row=object()) for i in range(n)]
+
+
+@pytest.mark.parametrize("n_vector, expect_fallback", [(40, False), (3, True)])
+def test_category_fallback_runs_only_when_candidates_are_short(n_vector, expect_fallback):
+    requested, top = run_stages({
+        "vector": candidates("v", n_vector),
+        "category_fallback": candidates("f", 20),
+        "popular": candidates("p", 10),
+    }, "Books")
+
+    assert requested[:2] == [["keyword", "review", "vector"], ["category"]]
+    assert (["category_fallback"] in requested) == expect_fallback
+    assert len(top) == settings.return_topn
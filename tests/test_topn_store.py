@@ -0,0 +1,61 @@
+"""Top-N store snapshots: compact rows, per-category and popular lists"""
+from decimal import Decimal
+from types import SimpleNamespace
+
+from backend.candidate import Candidate
+from backend.topn_store import CATALOG_VERSION_SQL, CATEGORY_TOPN_SQL, ItemRow, TopNStore
+
+
+def item(asin, category, rating, count):
+    return SimpleNamespace(
+        asin=asin, title=f"Title {asin}", category=category, brand=None, price=Decimal("9.99"),
+        rating_avg=Decimal(rating), rating_count=count, category_path=[category], attributes={}
+    )
+
+
+class FakeSession:
+    def __init__(self, by_category, popular):
+        self.by_category = by_category
+        self.popular = popular
+
+    def execute(self, statement, params=None):
+        if statement is CATALOG_VERSION_SQL:
+            return SimpleNamespace(scalar=lambda: 7)
+        return self.by_category if statement is CATEGORY_TOPN_SQL else self.popular
+
+
+def make_store():
+    books = [item("B1", "Books", "4.9", 10), item("B2", "Books", "4.5", 50)]
+    toys = [item("T1", "Toys", "4.8", 3)]
+    store = TopNStore(k=5)
+    # B2 is in both lists and stored once
+    store.refresh(FakeSession(books + toys, [item("B2", "Books", "4.5", 50), item("P1", "Toys", "3.0", 900)]))
+    return store
+
+
+def test_rows_are_compact_tuples():
+    store = make_store()
+    row = store.rows_by_asin(["B1"])["B1"]
+
+    assert type(row) is ItemRow
+    assert row.price == 9.99 and type(row.price) is float
+    assert store.stats()["rows"] == 4
+    assert store.category("Books", 1)[0].category is store.category("Books", 2)[1].category
+
+
+def test_serves_lists_within_k():
+    store = make_store()
+
+    assert [row.asin for row in store.category("Books", 5)] == ["B1", "B2"]
+    assert store.category("Garden", 5) == []
+    assert [row.asin for row in store.popular(2)] == ["B2", "P1"]
+    assert store.popular(6) is None
+
+
+def test_rows_render_like_database_rows():
+    row = make_store().rows_by_asin(["T1"])["T1"]
+
+    rendered = Candidate("T1", "Toys", 0.96, "category", row).to_dict()
+
+    assert rendered["price"] == 9.99 and rendered["rating_avg"] == 4.8
+    assert rendered["category_path"] == ["Toys"]
@@ -0,0 +1,137 @@
+"""In-process vector index: exact and IVF search, int8 and PQ codes"""
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from backend import vector_index
+from backend.config import settings
+from backend.vector_index import Int8Quantizer, ProductQuantizer, VectorIndex, _kmeans, _normalize, evaluate_recall
+
+DIM = 16
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    vectors = _normalize(rng.normal(size=(600, DIM)).astype(np.float32))
+    asins = [f"A{i:04d}" for i in range(len(vectors))]
+    # A narrow category of 8 rows next to a large one
+    categories = ["Small" if i % 75 == 0 else "Large" for i in range(len(vectors))]
+    return vectors, asins, categories
+
+
+def _ivf(vectors, n_lists=20, seed=0):
+    centroids = _kmeans(vectors, n_lists, seed=seed)
+    assign = np.argmax(vectors @ centroids.T, axis=1)
+    list_order = np.argsort(assign, kind="stable").astype(np.int64)
+    list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(assign, minlength=n_lists), out=list_offsets[1:])
+    return {"centroids": centroids, "list_order": list_order, "list_offsets": list_offsets}
+
+
+def test_flat_search_is_exact(data):
+    vectors, asins, categories = data
+    index = VectorIndex("items", vectors, asins, categories)
+    query = vectors[7]
+
+    hits = index.search(query, 5)
+    expected = np.argsort(-(vectors @ query), kind="stable")[:5]
+
+    assert [asin for asin, _ in hits] == [asins[i] for i in expected]
+    assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_flat_search_filters_by_category(data):
+    vectors, asins, categories = data
+    index = VectorIndex("items", vectors, asins, categories)
+
+    hits = index.search(vectors[1], 20, "Small")
+
+    assert len(hits) == 8
+    assert all(index.category_of(asin) == "Small" for asin, _ in hits)
+    assert index.search(vectors[1], 5, "Unknown") == []
+
+
+def test_ivf_fills_narrow_categories_beyond_the_probed_lists(data, monkeypatch):
+    vectors, asins, categories = data
+    monkeypatch.setattr(settings, "ivf_nprobe", 1)
+    index = VectorIndex("items", vectors, asins, categories, **_ivf(vectors))
+    exact = VectorIndex("items", vectors, asins, categories)
+
+    for row in (1, 2, 3):
+        hits = index.search(vectors[row], 5, "Small")
+        assert [asin for asin, _ in hits] == [asin for asin, _ in exact.search(vectors[row], 5, "Small")]
+
+
+def test_ivf_recall_against_flat(data, monkeypatch):
+    vectors, asins, categories = data
+    monkeypatch.setattr(settings, "ivf_nprobe", 10)
+    index = VectorIndex("items", vectors, asins, categories, **_ivf(vectors))
+
+    assert evaluate_recall(index, k=10, n_queries=50)["recall@10"] >= 0.8
+
+
+def test_int8_scores_approximate_inner_products(data):
+    vectors, _, _ = data
+    quantizer = Int8Quantizer()
+    quantizer.train(vectors)
+    codes = quantizer.encode(vectors)
+    query = vectors[3]
+
+    approx = quantizer.score(codes, quantizer.prepare(query))
+
+    np.testing.assert_allclose(approx, vectors @ query, atol=0.05)
+
+
+def test_int8_scores_in_bounded_chunks(monkeypatch):
+    monkeypatch.setattr(vector_index, "_INT8_SCORE_ROWS", 1000)
+    rng = np.random.default_rng(1)
+    codes = rng.integers(-127, 128, size=(20000, 256), dtype=np.int8)
+    prepared = rng.normal(size=256).astype(np.float32)
+    quantizer = Int8Quantizer()
+
+    tracemalloc.start()
+    scores = quantizer.score(codes, prepared)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    np.testing.assert_allclose(scores, codes.astype(np.float32) @ prepared, rtol=1e-5)
+    # One float32 chunk (1 MB) plus the scores, not a float32 copy of all codes (20 MB)
+    assert peak < 3 * 1000 * 256 * 4
+
+
+def test_pq_codes_and_scores(data):
+    vectors, _, _ = data
+    quantizer = ProductQuantizer(subspaces=4)
+    quantizer.train(vectors)
+    codes = quantizer.encode(vectors)
+    query = vectors[3]
+
+    approx = quantizer.score(codes, quantizer.prepare(query))
+
+    assert codes.shape == (len(vectors), 4) and codes.dtype == np.uint8
+    assert np.corrcoef(approx, vectors @ query)[0, 1] > 0.8
+
+
+def test_pq_rejects_indivisible_dimensions(data):
+    vectors, _, _ = data
+    with pytest.raises(ValueError):
+        ProductQuantizer(subspaces=5).train(vectors)
+
+
+@pytest.mark.parametrize("quantizer", [Int8Quantizer(), ProductQuantizer(subspaces=8)], ids=["int8", "pq"])
+def test_quantized_search_reranks_exactly(data, quantizer, monkeypatch):
+    vectors, asins, categories = data
+    monkeypatch.setattr(settings, "vector_rerank_factor", 8)
+    quantizer.train(vectors)
+    codes = quantizer.encode(vectors)
+    index = VectorIndex("items", vectors, asins, categories, quantizer=quantizer, codes=codes)
+
+    hits = index.search(vectors[11], 5)
+
+    assert hits[0][0] == asins[11]
+    # Reranked scores are exact cosine similarities
+    for asin, score in hits:
+        assert score == pytest.approx(float(vectors[asins.index(asin)] @ vectors[11]), abs=1e-5)
+    assert evaluate_recall(index, k=5, n_queries=50)["recall@5"] >= 0.8